@@ -0,0 +1,706 @@
+"""video_forensics_v3 단위 테스트
+
+영상/네트워크 없이 돌아가는 NumPy 경로만 검증한다.
+(video_forensics_v3 import에 필요한 librosa, python-docx, yt-dlp가 없으면 건너뜀)
+"""
+
+import asyncio
+import errno
+import hashlib
+import http.server
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+for _module in ("scipy", "librosa", "docx", "yt_dlp"):
+    pytest.importorskip(_module)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import video_forensics_v3 as vf  # noqa: E402
+
+
+def _textured_frames(count=4, seed=0, shape=(240, 320)):
+    """블록 DCT 계수가 고르게 퍼지는 질감 프레임"""
+    rng = np.random.default_rng(seed)
+    return [np.clip(cv2.GaussianBlur(128 + rng.normal(0, 40, shape), (0, 0), 1.5), 0, 255).astype(np.uint8)
+            for _ in range(count)]
+
+
+def _jpeg(gray, quality):
+    ok, encoded = cv2.imencode('.jpg', gray, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    assert ok
+    return cv2.imdecode(encoded, cv2.IMREAD_GRAYSCALE)
+
+
+def _compression_result(frames):
+    analyzer = vf.CompressionArtifactAnalyzer()
+    for index, frame in enumerate(frames):
+        analyzer.process(index, None, frame)
+    return analyzer.result()
+
+
+def test_double_quantization_separates_single_and_double_jpeg():
+    frames = _textured_frames()
+    single = _compression_result([_jpeg(frame, 80) for frame in frames])
+    double = _compression_result([_jpeg(_jpeg(frame, 50), 80) for frame in frames])
+
+    # 품질 80 휘도 테이블의 저주파 스텝은 4~6 - 반올림 잡음(±1)에 끌려가지 않아야 함
+    assert single['quant_step_estimate'] == pytest.approx(5, abs=1)
+    assert double['double_quantization'] > 5 * single['double_quantization']
+
+
+def test_double_quantization_ignores_uncompressed_frames():
+    result = _compression_result(_textured_frames())
+    assert result['quant_step_estimate'] == 1.0
+    assert result['double_quantization'] == 0.0
+
+
+def _random_hashes(rng, count):
+    return rng.integers(0, 2 ** 63, size=count, dtype=np.int64).astype(np.uint64)
+
+
+def _flip_bits(hashes, bits):
+    mask = np.uint64(sum(1 << b for b in bits))
+    return hashes ^ mask
+
+
+def test_frame_hash_index_splits_runs_by_sampling_interval():
+    rng = np.random.default_rng(1)
+    ref_hashes = _random_hashes(rng, 100)
+    ref_times = np.arange(100) * 0.1
+    index = vf.FrameHashIndex()
+    index.add('ref', ref_hashes, ref_times)
+
+    # 0.1초 간격 타겟: 레퍼런스 10~29, 무관한 10프레임(1초), 레퍼런스 40~59 (둘 다 +1초 오프셋)
+    target = np.concatenate([ref_hashes[10:30], _random_hashes(rng, 10), ref_hashes[40:60]])
+    target_times = np.arange(target.size) * 0.1
+    matches = index.query(target, target_times)
+
+    assert [(m['frames'], round(m['target_start'], 1), round(m['target_end'], 1)) for m in matches] == \
+        [(20, 0.0, 1.9), (20, 3.0, 4.9)]
+    assert all(m['reference'] == 'ref' and m['offset'] == pytest.approx(1.0, abs=0.05) for m in matches)
+
+
+def test_frame_hash_index_keeps_nearest_candidate_per_target_frame():
+    rng = np.random.default_rng(2)
+    exact = _random_hashes(rng, 30)
+    times = np.arange(30) * 0.5
+    # 같은 오프셋 구간에 6비트 다른 근접 복제본을 먼저 넣어 후보 순서상 앞에 오게 함
+    index = vf.FrameHashIndex()
+    index.add('ref', np.concatenate([_flip_bits(exact, range(6)), exact]),
+              np.concatenate([times + 0.05, times]))
+
+    matches = index.query(exact, times)
+
+    assert len(matches) == 1
+    assert matches[0]['frames'] == 30
+    assert matches[0]['similarity'] == 1.0
+
+
+def test_similarity_matrix_refines_target_row_with_shift_aware_pce():
+    rng = np.random.default_rng(3)
+    sensor = rng.standard_normal((64, 64)).astype(np.float32)
+    # 타겟은 같은 센서 지문이 (3, 5)픽셀 이동된 사본 - 영이동 NCC로는 놓침
+    target = np.roll(sensor, (3, 5), axis=(0, 1)) + 0.5 * rng.standard_normal((64, 64)).astype(np.float32)
+    unrelated = rng.standard_normal((64, 64)).astype(np.float32)
+    fingerprints = [target, sensor, unrelated]
+    analyses = [{}, {}, {}]
+
+    coarse = vf.similarity_matrix(analyses, fingerprints)['features']['prnu']
+    refined = vf.similarity_matrix(analyses, fingerprints, refine_rows=[0])['features']['prnu']
+
+    assert coarse[0, 1] < 0.5
+    assert refined[0, 1] > 0.99 and refined[1, 0] == refined[0, 1]
+    assert refined[0, 2] < 0.5
+    # 타겟 행 밖의 쌍은 행렬 근사 그대로
+    assert refined[1, 2] == coarse[1, 2]
+
+
+class _FakeForensics:
+    """ReferenceLibrary.ingest용 - 파일 이름별로 고정된 특징 반환"""
+
+    def __init__(self, features_by_name):
+        self.features_by_name = features_by_name
+
+    def analyze_with_features(self, video_path):
+        return {'generation_score': 0.0}, self.features_by_name[os.path.basename(video_path)]
+
+
+def test_reference_library_discards_tail_of_interrupted_ingest(tmp_path):
+    rng = np.random.default_rng(4)
+    features = {}
+    for name, count in (('a.mp4', 5), ('b.mp4', 7)):
+        (tmp_path / name).write_bytes(name.encode() * 100)
+        features[name] = {'frame_phash': _random_hashes(rng, count),
+                          'frame_phash_times': np.arange(count, dtype=np.float32)}
+    forensics = _FakeForensics(features)
+    library_dir = str(tmp_path / 'library')
+
+    vf.ReferenceLibrary(library_dir).ingest(forensics, str(tmp_path / 'a.mp4'))
+    # 메타데이터 커밋 전에 중단된 수집 흉내: 특징 파일마다 길이가 다른 꼬리
+    for suffix, garbage in (('vectors.f32', 10), ('signatures.u16', 3), ('frame_hashes.u64', 20)):
+        with open(os.path.join(library_dir, suffix), 'ab') as f:
+            f.write(b'\xff' * garbage)
+
+    library = vf.ReferenceLibrary(library_dir)
+    library.ingest(forensics, str(tmp_path / 'b.mp4'))
+
+    results = library.query(features['b.mp4'], top_k=2)
+    by_title = {r['title']: r for r in results}
+    assert set(by_title) == {'a.mp4', 'b.mp4'}
+    assert by_title['b.mp4']['similarity'] == pytest.approx(1.0, abs=1e-5)
+    for name in ('a.mp4', 'b.mp4'):
+        np.testing.assert_array_equal(by_title[name]['features']['frame_phash'], features[name]['frame_phash'])
+        np.testing.assert_array_equal(by_title[name]['features']['frame_phash_times'],
+                                      features[name]['frame_phash_times'])
+
+
+def test_decoded_frame_cache_round_trips_native_tiles(tmp_path):
+    video = tmp_path / 'clip.mp4'
+    video.write_bytes(b'not really a video' * 10)
+    cache = vf.DecodedFrameCache(str(tmp_path / 'frames'), frame_height=90, codec_motion=True)
+    info = {'fps': 30.0, 'frame_count': 4}
+
+    rng = np.random.default_rng(5)
+    grays = [rng.integers(0, 256, (90, 160), dtype=np.uint8) for _ in range(4)]
+    tiles = [rng.integers(0, 256, (64, 48), dtype=np.uint8) for _ in range(4)]
+    writer = cache.writer(str(video), 's2', info, capacity=8, burst=2)
+    for position in range(2):
+        writer.new_segment()
+        for offset in range(2):
+            i = position * 2 + offset
+            writer.append(i, offset, grays[i], i / 30, tiles[i], motion=0.5 * i)
+    writer.commit()
+
+    meta = cache.lookup(str(video), 's2')
+    assert cache.covers(meta, max_frames=0, burst=2)
+    items = [item for item in cache.replay(meta, max_frames=0, burst=2) if item is not None]
+    assert [item[0] for item in items] == [0, 1, 2, 3]
+    for (index, offset, frame, gray, timestamp, native, motion) in items:
+        assert frame is None
+        np.testing.assert_array_equal(gray, grays[index])
+        np.testing.assert_array_equal(native, tiles[index])
+        assert motion == 0.5 * index
+    # 특징 캐시 API(get/put)는 프레임 캐시에 없음
+    assert not hasattr(cache, 'put')
+
+
+def test_motion_analyzer_prefers_codec_vectors_over_optical_flow():
+    analyzer = vf.MotionAnalyzer()
+    analyzer.begin({'fps': 30.0, 'frame_count': 4})
+    frame = np.zeros((90, 160), dtype=np.uint8)
+    for index, value in enumerate([1.0, 1.2, 0.8]):
+        analyzer.codec_motion(index, value)
+        analyzer.process(index, None, frame)
+    assert analyzer.series() == [1.0, 1.2, 0.8]
+    assert analyzer.result()['method'] == 'codec_mv'
+
+
+def test_keyframe_times_are_scanned_once_per_file(tmp_path):
+    video = tmp_path / 'clip.mp4'
+    video.write_bytes(b'frames' * 10)
+    forensics = vf.AdvancedVideoForensics.__new__(vf.AdvancedVideoForensics)
+    forensics._probe_memo = {}
+    scans = []
+
+    def packets(video_path, entries="pts,dts,size,flags"):
+        scans.append(video_path)
+        yield {'pts_time': '4.0', 'flags': 'K__'}
+        yield {'pts_time': '0.0', 'flags': 'K__'}
+        yield {'pts_time': '2.0', 'flags': '___'}
+
+    forensics.iter_video_packets = packets
+    assert forensics.sample_timestamps(str(video), 8.0, 2) == [0.0, 4.0]
+    assert forensics.list_keyframe_times(str(video)) == [0.0, 4.0]
+    assert len(scans) == 1
+    # 파일이 바뀌면 다시 스캔
+    video.write_bytes(b'frames' * 20)
+    forensics.list_keyframe_times(str(video))
+    assert len(scans) == 2
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="shebang 스크립트로 가짜 ffprobe 실행")
+def test_packet_stream_survives_noisy_ffprobe_stderr(tmp_path, monkeypatch):
+    # 파이프 버퍼(64KB)보다 많은 경고를 stderr에 쓴 뒤 패킷을 출력하는 가짜 ffprobe
+    fake = tmp_path / 'ffprobe'
+    fake.write_text(f"#!{sys.executable}\n"
+                    "import sys\n"
+                    "sys.stderr.write('warning: broken packet\\n' * 20000)\n"
+                    "sys.stderr.flush()\n"
+                    "for i in range(3):\n"
+                    "    print(f'pts_time={i}.0|flags=K_')\n")
+    fake.chmod(0o755)
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ.get('PATH', ''))
+    forensics = vf.AdvancedVideoForensics.__new__(vf.AdvancedVideoForensics)
+    packets = list(forensics.iter_video_packets('clip.mp4', "pts_time,flags"))
+    assert [p['pts_time'] for p in packets] == ['0.0', '1.0', '2.0']
+
+
+def _tone_sequence(seconds, sr=8000, seed=0):
+    """0.1초마다 바뀌는 무작위 화음 + 약한 잡음 (스펙트로그램 피크가 뚜렷한 신호)"""
+    rng = np.random.default_rng(seed)
+    step = sr // 10
+    t = np.arange(step) / sr
+    pieces = [sum(np.sin(2 * np.pi * f * t) for f in rng.uniform(200, 3500, 3)) for _ in range(int(seconds * 10))]
+    signal = np.concatenate(pieces) + rng.normal(0, 0.05, step * int(seconds * 10))
+    return signal.astype(np.float32)
+
+
+def _landmarks(hasher, samples, chunk=4096):
+    chunks = (samples[i:i + chunk] for i in range(0, samples.size, chunk))
+    hashes, times = zip(*hasher.hash_stream(chunks))
+    return np.concatenate(hashes), np.concatenate(times)
+
+
+def test_audio_landmarks_locate_sub_clip_offset():
+    hasher = vf.AudioLandmarkHasher()
+    reference = _tone_sequence(12)
+    other = _tone_sequence(12, seed=1)
+    start = hasher.hop * 125  # 4초 (hop 정렬)
+    clip = reference[start:start + 4 * hasher.sr]
+
+    index = vf.AudioFingerprintIndex(hasher.frame_seconds)
+    index.add('reference', *_landmarks(hasher, reference))
+    index.add('other', *_landmarks(hasher, other))
+    matches = index.query(*_landmarks(hasher, clip, chunk=1000))
+
+    assert matches[0]['reference'] == 'reference'
+    assert matches[0]['offset'] == pytest.approx(start / hasher.sr, abs=2 * hasher.frame_seconds)
+    assert all(match['reference'] != 'other' or match['votes'] < matches[0]['votes'] / 10 for match in matches)
+
+
+@pytest.mark.parametrize('split', [3, 4])
+def test_frame_analyzer_merge_matches_sequential_run(split):
+    rng = np.random.default_rng(6)
+    frames = [np.clip(128 + rng.normal(0, 30, (96, 128)), 0, 255).astype(np.uint8) for _ in range(7)]
+
+    for make in (lambda: vf.PRNUAnalyzer(tile_size=64, step=1),
+                 lambda: vf.CompressionArtifactAnalyzer(step=1)):
+        sequential, head, tail = make(), make(), make()
+        for index, frame in enumerate(frames):
+            sequential.process(index, None, frame)
+            (head if index < split else tail).process(index, None, frame)
+        head.merge(tail)
+        expected, merged = sequential.result(), head.result()
+        for key, value in expected.items():
+            if isinstance(value, np.ndarray):
+                np.testing.assert_allclose(merged[key], value, rtol=1e-5, atol=1e-6)
+            elif isinstance(value, (int, float, np.floating)):
+                assert merged[key] == pytest.approx(value, rel=1e-5, abs=1e-9), key
+
+
+def test_cluster_similar_links_pairs_transitively():
+    matrix = np.eye(6)
+    for i, j, value in ((0, 2, 0.9), (2, 5, 0.85), (1, 3, 0.95), (1, 4, 0.5)):
+        matrix[i, j] = matrix[j, i] = value
+    clusters = sorted(sorted(members) for members in vf.cluster_similar(matrix, threshold=0.8))
+    assert clusters == [[0, 2, 5], [1, 3]]
+
+
+class _FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """fixture 파일을 지연 시간과 함께 제공하는 로컬 HTTP 대역 (없는 파일은 404)"""
+
+    files = {}
+
+    def do_GET(self):
+        entry = self.files.get(self.path.lstrip('/'))
+        if entry is None:
+            self.send_error(404)
+            return
+        delay, body = entry
+        time.sleep(delay)
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fixture_server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_case_pipeline_overlaps_downloads_with_analysis(tmp_path, monkeypatch, fixture_server):
+    _FixtureHandler.files = {
+        'target.mp4': (0.05, b'target' * 100),
+        'slow.mp4': (0.6, b'slow' * 100),
+        'fast.mp4': (0.05, b'fast' * 100),
+    }
+    forensics = vf.AdvancedVideoForensics(base_dir=str(tmp_path), use_cache=False, profile=False)
+    events = []
+
+    def download(url, name_prefix="video", analysis_window=None):
+        # yt-dlp 대신 HTTP 대역에서 그대로 받는 다운로더 (파이프라인 스케줄링만 검증)
+        name = url.rsplit('/', 1)[1]
+        try:
+            with urllib.request.urlopen(url) as response:
+                body = response.read()
+        except urllib.error.HTTPError:
+            return None, None
+        path = os.path.join(forensics.video_dir, f"{name_prefix}_{name}")
+        with open(path, 'wb') as f:
+            f.write(body)
+        events.append(('downloaded', name, time.perf_counter()))
+        return path, {'url': url}
+
+    def analyze(options, video_path, partial=None):
+        name = os.path.basename(video_path).rsplit('_', 1)[1]
+        events.append(('analysis_start', name, time.perf_counter()))
+        time.sleep(0.2)
+        return {'generation_score': 0.0, 'name': name}, {}, []
+
+    matched = {}
+
+    def match(all_analyses, checkpoint=None):
+        matched.update(all_analyses)
+        return {'source_match': 'reference_1'}
+
+    forensics.download_video = download
+    forensics.match_analyses = match
+    monkeypatch.setattr(vf, '_analyze_video_worker', analyze)
+
+    references = [('url', f"{fixture_server}/slow.mp4"), ('url', f"{fixture_server}/missing.mp4"),
+                  ('url', f"{fixture_server}/fast.mp4")]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        outcome = asyncio.run(forensics.run_case_pipeline(
+            ('url', f"{fixture_server}/target.mp4"), references,
+            download_concurrency=2, workers=2, executor=executor))
+
+    times = {(kind, name): at for kind, name, at in events}
+    # 타겟 분석은 느린 레퍼런스 다운로드가 끝나기 전에 시작
+    assert times[('analysis_start', 'target.mp4')] < times[('downloaded', 'slow.mp4')]
+    assert times[('analysis_start', 'fast.mp4')] < times[('downloaded', 'slow.mp4')]
+    # 완료 순서와 무관하게 성공한 레퍼런스는 입력 순서로 번호 부여
+    assert list(matched) == ['target', 'reference_1', 'reference_2']
+    assert matched['reference_1']['analysis']['name'] == 'slow.mp4'
+    assert matched['reference_2']['analysis']['name'] == 'fast.mp4'
+    assert outcome['reference_inputs'] == [references[0], references[2]]
+
+
+def test_pool_workers_share_the_segment_worker_budget(tmp_path):
+    forensics = vf.AdvancedVideoForensics(base_dir=str(tmp_path), use_cache=False, profile=False,
+                                          segment_workers=8)
+    assert forensics.worker_options()['segment_workers'] == 8
+    assert forensics.worker_options(4)['segment_workers'] == 2
+    assert forensics.worker_options(16)['segment_workers'] == 1
+    # 구간 병렬 디코드는 모든 분석기가 병합을 지원할 때만
+    assert all(cls.mergeable for cls in (vf.CompressionArtifactAnalyzer, vf.PRNUAnalyzer, vf.MotionAnalyzer,
+                                         vf.FrameHashAnalyzer, vf.ScreenRecordingAnalyzer))
+    assert not vf.FrameAnalyzer.mergeable
+
+
+def test_stage_cpu_time_excludes_other_threads():
+    profiler = vf.StageProfiler()
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            sum(range(1000))
+
+    busy = threading.Thread(target=spin)
+    busy.start()
+    try:
+        with profiler.stage('idle'):
+            time.sleep(0.3)
+    finally:
+        stop.set()
+        busy.join()
+
+    args = profiler.events[0]['args']
+    assert args['cpu_ms'] < 50
+    assert 'process_bytes_read' in args and 'process_peak_rss_mb' in args
+    row, = profiler.summary()
+    assert set(row) >= {'process_bytes_read', 'process_peak_rss_mb'}
+
+
+def test_batch_hashes_handle_stacks_larger_than_four_frames():
+    frames = np.stack(_textured_frames(count=7, seed=8, shape=(90, 160)))
+    phash = vf.batch_phash(frames)
+    dhash = vf.batch_dhash(frames)
+    assert phash.shape == dhash.shape == (7,)
+    # 스택 일괄 계산 = 프레임 하나씩 계산
+    for i, frame in enumerate(frames):
+        assert vf.batch_phash(frame[None])[0] == phash[i]
+        assert vf.batch_dhash(frame[None])[0] == dhash[i]
+
+
+def test_batch_hash_bit_order_matches_imagehash():
+    imagehash = pytest.importorskip("imagehash")
+    Image = pytest.importorskip("PIL.Image")
+    rng = np.random.default_rng(9)
+    # 해시 입력 크기 그대로 주어 리사이즈 보간 차이 없이 비트 순서만 비교
+    thumbnails = rng.integers(0, 256, (6, 32, 32), dtype=np.uint8)
+    strips = rng.integers(0, 256, (6, 8, 9), dtype=np.uint8)
+    for value, thumbnail in zip(vf.batch_phash(thumbnails), thumbnails):
+        assert f"{int(value):016x}" == str(imagehash.phash(Image.fromarray(thumbnail)))
+    for value, strip in zip(vf.batch_dhash(strips), strips):
+        assert f"{int(value):016x}" == str(imagehash.dhash(Image.fromarray(strip)))
+
+
+def test_case_checkpoint_resumes_only_matching_records(tmp_path):
+    video = tmp_path / 'target.mp4'
+    video.write_bytes(b'video' * 10)
+    checkpoint = vf.CaseCheckpoint(str(tmp_path / 'case'), version='v1')
+    checkpoint.save_prepared('target', ('file', 'in.mp4'), str(video))
+    checkpoint.save_analysis('target', str(video), {'generation_score': 0.5},
+                             {'frame_phash': np.arange(3, dtype=np.uint64)})
+    checkpoint.save_stage('similarity', {'target': {'path': str(video)}}, {'score': 1})
+
+    resumed = vf.CaseCheckpoint(str(tmp_path / 'case'), version='v1')
+    assert resumed.prepared('target', ('file', 'in.mp4'))['path'] == str(video)
+    assert resumed.prepared('target', ('file', 'other.mp4')) is None
+    assert resumed.analysis('target', str(video)) == {'generation_score': 0.5}
+    np.testing.assert_array_equal(resumed.features('target')['frame_phash'], np.arange(3))
+    assert resumed.stage('similarity', {'target': {'path': str(video)}}) == (True, {'score': 1})
+    assert resumed.stage('similarity', {'target': {'path': 'elsewhere.mp4'}}) == (False, None)
+    # 분석 설정 버전이 바뀌면 분석/단계 결과 모두 재계산
+    upgraded = vf.CaseCheckpoint(str(tmp_path / 'case'), version='v2')
+    assert upgraded.analysis('target', str(video)) is None
+    assert upgraded.stage('similarity', {'target': {'path': str(video)}}) == (False, None)
+
+
+def test_run_batch_reruns_case_when_its_inputs_change(tmp_path):
+    forensics = vf.AdvancedVideoForensics(base_dir=str(tmp_path), use_cache=False, profile=False)
+    runs = []
+
+    async def pipeline(target, references, **kwargs):
+        runs.append((target, list(references)))
+        return {'results': {}}
+
+    forensics.run_case_pipeline = pipeline
+    forensics.save_case_outputs = lambda name, case, outcome: {'status': 'ok', 'references': len(case['references'])}
+
+    case = {'name': 'case1', 'target': ('url', 'https://example.com/t'),
+            'references': [('url', 'https://example.com/a')]}
+    assert asyncio.run(forensics.run_batch([case], workers=1))['case1']['status'] == 'ok'
+    asyncio.run(forensics.run_batch([case], workers=1))
+    assert len(runs) == 1  # 같은 입력은 완료 기록 재사용
+
+    changed = dict(case, references=case['references'] + [('url', 'https://example.com/b')])
+    assert asyncio.run(forensics.run_batch([changed], workers=1))['case1']['references'] == 2
+    asyncio.run(forensics.run_batch([dict(changed, analysis_window=30)], workers=1))
+    assert len(runs) == 3
+
+
+def test_sampled_mode_downloads_references_in_full(tmp_path):
+    forensics = vf.AdvancedVideoForensics(base_dir=str(tmp_path), use_cache=False, profile=False,
+                                          sample_count=16)
+    windows = []
+
+    def prepare(input_data, name_prefix="video", analysis_window=None):
+        windows.append(analysis_window)
+        return None, None
+
+    forensics.process_video_input = prepare
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        asyncio.run(forensics.run_case_pipeline(('url', 'target'), [('url', 'a'), ('url', 'b')],
+                                                analysis_window=35, executor=executor))
+    # 층화 샘플링은 전체 길이가 필요 - 구간 다운로드 후 전체를 다시 받지 않음
+    assert windows == [None, None, None]
+
+
+def test_audio_matches_flag_window_limited_references(tmp_path):
+    forensics = vf.AdvancedVideoForensics(base_dir=str(tmp_path), use_cache=False, profile=False)
+    hasher = vf.AudioLandmarkHasher()
+    reference = _tone_sequence(10, seed=2)
+    hashes, times = _landmarks(hasher, reference)
+    clip_hashes, clip_times = _landmarks(hasher, reference[hasher.hop * 40:hasher.hop * 40 + 4 * hasher.sr])
+
+    def entry(window):
+        return {'path': 'unused.mp4', 'features': {
+            'audio_landmarks': hashes, 'audio_landmark_times': times,
+            'audio_landmark_window': np.float32(window)}}
+
+    all_analyses = {
+        'target': {'path': 'target.mp4', 'features': {'audio_landmarks': clip_hashes,
+                                                      'audio_landmark_times': clip_times}},
+        'reference_1': entry(35),
+        'reference_2': entry(0),
+    }
+    matches = {match['reference']: match for match in forensics.find_audio_matches(all_analyses)}
+    assert matches['reference_1']['window_limited'] and matches['reference_1']['reference_window'] == 35
+    assert not matches['reference_2']['window_limited']
+
+
+def test_analysis_version_separates_decode_backends(tmp_path):
+    versions = {backend: vf.AdvancedVideoForensics(base_dir=str(tmp_path), use_cache=False, profile=False,
+                                                   decode_backend=backend).analysis_version
+                for backend in ('opencv', 'ffmpeg')}
+    assert versions['opencv'] != versions['ffmpeg']
+    # auto는 실제로 선택된 백엔드로 기록
+    auto = vf.AdvancedVideoForensics(base_dir=str(tmp_path), use_cache=False, profile=False)
+    assert auto.analysis_version.endswith(f"-{auto.decode_backend}")
+
+
+def test_load_case_manifest_accepts_json_yaml_list_and_dict_forms(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    cases = [
+        {'name': 'case 1', 'target': 'https://example.com/t', 'references': [
+            'clip.mp4', {'url': 'https://example.com/r'}, {'path': 'ref.mp4'}], 'analysis_window': 20},
+        {'name': 'case 1', 'target': {'path': 'target.mp4'}},
+        {'target': 'other.mp4', 'references': []},
+    ]
+    json_path = tmp_path / 'cases.json'
+    json_path.write_text(vf.json.dumps({'cases': cases}), encoding='utf-8')
+    yaml_path = tmp_path / 'cases.yaml'
+    yaml_path.write_text(yaml.safe_dump(cases), encoding='utf-8')
+
+    for path in (json_path, yaml_path):
+        loaded = vf.load_case_manifest(str(path))
+        assert [case['name'] for case in loaded] == ['case_1', 'case_1_2', 'case_003']
+        assert loaded[0]['target'] == ('url', 'https://example.com/t')
+        assert loaded[0]['references'] == [('file', os.path.abspath('clip.mp4')),
+                                           ('url', 'https://example.com/r'),
+                                           ('file', os.path.abspath('ref.mp4'))]
+        assert loaded[0]['analysis_window'] == 20
+        # 생략하면 명령줄 --analysis-window를 따르도록 키 자체가 없음
+        assert 'analysis_window' not in loaded[1]
+        assert loaded[1]['target'] == ('file', os.path.abspath('target.mp4'))
+
+
+@pytest.mark.parametrize('case', [
+    {'name': 'a', 'references': ['r.mp4']},
+    {'name': 'a', 'target': {'title': 'no location'}},
+    {'name': 'a', 'target': 't.mp4', 'references': [{'url': ''}]},
+])
+def test_load_case_manifest_rejects_inputs_without_location(tmp_path, case):
+    path = tmp_path / 'cases.json'
+    path.write_text(vf.json.dumps([case]), encoding='utf-8')
+    with pytest.raises(ValueError):
+        vf.load_case_manifest(str(path))
+
+
+def test_feature_cache_round_trips_analysis_and_features(tmp_path):
+    video = tmp_path / 'clip.mp4'
+    video.write_bytes(b'frame data' * 1000)
+    cache = vf.FeatureCache(str(tmp_path / 'cache'), version='v1')
+    assert cache.get(str(video)) is None
+
+    analysis = {'generation_score': np.float32(0.25), 'gop_structure': {'gop_sizes': np.arange(3)}}
+    features = {'prnu': np.ones((4, 4), np.float32), 'frame_phash': np.arange(5, dtype=np.uint64)}
+    cache.put(str(video), analysis, features)
+
+    loaded, loaded_features = vf.FeatureCache(str(tmp_path / 'cache'), version='v1').get(str(video))
+    assert loaded == {'generation_score': 0.25, 'gop_structure': {'gop_sizes': [0, 1, 2]}}
+    assert set(loaded_features) == {'prnu', 'frame_phash'}
+    np.testing.assert_array_equal(loaded_features['prnu'], features['prnu'])
+    assert loaded_features['frame_phash'].dtype == np.uint64
+    # 분석기 버전이나 파일 내용이 바뀌면 다른 키
+    assert vf.FeatureCache(str(tmp_path / 'cache'), version='v2').get(str(video)) is None
+    video.write_bytes(b'other data' * 1000)
+    assert cache.get(str(video)) is None
+
+
+def test_feature_cache_evicts_least_recently_used_entries(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache = vf.FeatureCache(str(cache_dir), max_bytes=10 ** 9, version='v1')
+    videos = []
+    for i in range(3):
+        video = tmp_path / f'clip{i}.mp4'
+        video.write_bytes(bytes([i]) * 1000)
+        cache.put(str(video), {'index': i}, {'values': np.zeros(2000, np.float32)})
+        videos.append(str(video))
+        # 접근 시각을 명시해 mtime 해상도와 무관하게 순서 고정
+        for path in cache._paths(cache.key_for(str(video))):
+            os.utime(path, (1000 + i, 1000 + i))
+
+    # clip0을 다시 읽으면 가장 최근 사용 항목이 되어 살아남음
+    assert cache.get(videos[0])[0] == {'index': 0}
+    entry_bytes = sum(os.path.getsize(p) for p in cache._paths(cache.key_for(videos[0])))
+    cache.max_bytes = entry_bytes * 2
+    cache.evict()
+
+    assert cache.get(videos[1]) is None
+    assert cache.get(videos[0])[0] == {'index': 0}
+    assert cache.get(videos[2])[0] == {'index': 2}
+    assert len(os.listdir(cache_dir)) == 4
+
+
+def _ingest_log(forensics):
+    with open(os.path.join(forensics.evidence_dir, "ingest_log.jsonl"), encoding='utf-8') as f:
+        return [vf.json.loads(line) for line in f]
+
+
+@pytest.fixture
+def evidence_file(tmp_path):
+    source = tmp_path / 'source' / 'evidence.mp4'
+    source.parent.mkdir()
+    source.write_bytes(np.random.default_rng(10).integers(0, 256, 50000, dtype=np.uint8).tobytes())
+    return source, hashlib.sha256(source.read_bytes()).hexdigest()
+
+
+def _no_reflink(src, dst):
+    raise OSError(errno.EOPNOTSUPP, "reflink not supported")
+
+
+@pytest.mark.parametrize('mode, method', [('inplace', 'inplace'), ('copy', 'copy'), ('link', 'hardlink')])
+def test_ingest_local_file_modes_record_source_and_sha256(tmp_path, monkeypatch, evidence_file, mode, method):
+    source, digest = evidence_file
+    monkeypatch.setattr(vf, '_reflink', _no_reflink)
+    forensics = vf.AdvancedVideoForensics(base_dir=str(tmp_path / 'work'), use_cache=False, profile=False,
+                                          local_ingest=mode)
+
+    path, used, sha256 = forensics.ingest_local_file(str(source), 'target')
+
+    assert (used, sha256) == (method, digest)
+    if mode == 'inplace':
+        assert path == str(source)
+    else:
+        assert os.path.dirname(path) == forensics.video_dir
+        assert os.path.samefile(path, source) == (mode == 'link')
+    record, = _ingest_log(forensics)
+    assert (record['source'], record['path'], record['method'], record['sha256']) == (str(source), path, method, digest)
+    assert record['size'] == source.stat().st_size
+
+
+def test_ingest_local_file_copies_across_filesystems(tmp_path, monkeypatch, evidence_file):
+    source, digest = evidence_file
+    monkeypatch.setattr(vf, '_reflink', _no_reflink)
+
+    def cross_device_link(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(vf.os, 'link', cross_device_link)
+    forensics = vf.AdvancedVideoForensics(base_dir=str(tmp_path / 'work'), use_cache=False, profile=False)
+
+    path, method, sha256 = forensics.ingest_local_file(str(source), 'target')
+
+    assert (method, sha256) == ('copy', digest)
+    assert open(path, 'rb').read() == source.read_bytes()
+    assert not os.path.samefile(path, source)
+    assert os.listdir(forensics.video_dir) == [os.path.basename(path)]  # 임시 파일 없음
+    assert _ingest_log(forensics)[0]['method'] == 'copy'
+
+
+def test_chunked_copy_hashes_every_chunk_and_cleans_up_on_failure(tmp_path, monkeypatch, evidence_file):
+    source, digest = evidence_file
+    target = tmp_path / 'copy.mp4'
+    assert vf.copy_with_progress(str(source), str(target), chunk_size=4096) == digest
+    assert target.read_bytes() == source.read_bytes()
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(vf.shutil, 'copystat', fail)
+    with pytest.raises(OSError):
+        vf.copy_with_progress(str(source), str(tmp_path / 'broken.mp4'), chunk_size=4096)
+    assert sorted(os.listdir(tmp_path)) == ['copy.mp4', 'source']
@@ -0,0 +1,350 @@
+"""
+영상 포렌식 벤치마크 (video_forensics_v3)
+- 합성 영상 생성 (cv2.VideoWriter + ffmpeg, 네트워크 불필요)
+- N세대 재인코딩 래더 / 화면 녹화 유사 클립
+- 분석기별 처리량(frames/s, videos/min)과 영상별 프로세스 최대 메모리 측정
+- JSON 기준선 저장 및 비교 (회귀 감지)
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from video_forensics_v3 import (
+    ANALYZER_VERSION, AdvancedVideoForensics, StageProfiler,
+    _init_analysis_worker, _analyze_video_worker
+)
+
+
+RESOLUTIONS = {
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+}
+
+# 처리량 지표 (값이 작아지면 회귀, 영상 단위/find_source만 판정)
+THROUGHPUT_KEYS = ('frames_per_s', 'videos_per_min')
+
+
+def _has_ffmpeg():
+    return shutil.which('ffmpeg') is not None
+
+
+def _run_ffmpeg(args):
+    subprocess.run(['ffmpeg', '-v', 'error', '-nostdin', '-y'] + args, check=True)
+
+
+def _mux_tone(video_path, seconds, out_path, frequency=440):
+    """합성 오디오(주파수 스윕 + 잡음)를 붙여 H.264/AAC로 인코딩"""
+    _run_ffmpeg([
+        '-i', video_path,
+        '-f', 'lavfi', '-i', f"sine=frequency={frequency}:beep_factor=4:duration={seconds}",
+        '-f', 'lavfi', '-i', f"anoisesrc=color=pink:amplitude=0.05:duration={seconds}",
+        '-filter_complex', '[1:a][2:a]amix=inputs=2[a]',
+        '-map', '0:v', '-map', '[a]', '-shortest',
+        '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '16', '-g', '30',
+        '-c:a', 'aac', '-b:a', '192k', out_path
+    ])
+
+
+def synthesize_camera_clip(path, size, seconds=6, fps=30, seed=0):
+    """카메라 촬영 유사 합성 영상 - 움직이는 장면 + 고정 센서 패턴 잡음(PRNU 대용)"""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    sensor = rng.normal(0, 3, (height, width, 1)).astype(np.float32)
+
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    raw_path = path + '.raw.avi' if _has_ffmpeg() else path
+    writer = cv2.VideoWriter(raw_path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+
+    for i in range(int(seconds * fps)):
+        t = i / fps
+        base = 128 + 60 * np.sin(x / width * 6 + t * 1.5) * np.cos(y / height * 4 - t)
+        frame = np.repeat(base[..., None], 3, axis=2)
+        frame[..., 1] += 30 * np.sin(t + x / 97)
+        # 움직이는 물체 (움직임 벡터, 구간 해시용)
+        cx = int((0.2 + 0.6 * ((t * 0.15) % 1)) * width)
+        cy = int((0.5 + 0.25 * np.sin(t)) * height)
+        frame = np.clip(frame + sensor + rng.normal(0, 2, frame.shape), 0, 255).astype(np.uint8)
+        cv2.circle(frame, (cx, cy), height // 8, (40, 200, 240), -1)
+        cv2.rectangle(frame, (width - cx, height // 5), (width - cx + width // 10, height // 3),
+                      (200, 60, 60), -1)
+        writer.write(frame)
+    writer.release()
+
+    if raw_path != path:
+        _mux_tone(raw_path, seconds, path)
+        os.remove(raw_path)
+    return path
+
+
+def synthesize_screen_recording(path, size, seconds=6, fps=30, seed=1):
+    """화면 녹화 유사 클립 - 평탄한 UI 패널, 텍스트 줄, 이동하는 커서"""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    raw_path = path + '.raw.avi' if _has_ffmpeg() else path
+    writer = cv2.VideoWriter(raw_path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+
+    desktop = np.full((height, width, 3), 235, dtype=np.uint8)
+    cv2.rectangle(desktop, (0, 0), (width, height // 24), (60, 60, 60), -1)            # 상단 바
+    cv2.rectangle(desktop, (0, height - height // 20), (width, height), (40, 40, 40), -1)  # 작업 표시줄
+    cv2.rectangle(desktop, (width // 10, height // 8), (width * 9 // 10, height * 7 // 8), (255, 255, 255), -1)
+    for row in range(height // 6, height * 5 // 6, height // 30):
+        line_width = int(width * rng.uniform(0.3, 0.7))
+        cv2.putText(desktop, 'lorem ipsum ' * (line_width // (width // 12)), (width // 8, row),
+                    cv2.FONT_HERSHEY_SIMPLEX, height / 1440, (30, 30, 30), max(1, height // 720))
+
+    for i in range(int(seconds * fps)):
+        t = i / fps
+        frame = desktop.copy()
+        cursor_x = int(width * (0.3 + 0.4 * np.sin(t * 0.8) ** 2))
+        cursor_y = int(height * (0.3 + 0.3 * np.cos(t * 0.6) ** 2))
+        scale = height // 45
+        cursor = np.array([[0, 0], [0, 3 * scale], [scale, 2 * scale], [2 * scale, 2 * scale]]) + [cursor_x, cursor_y]
+        cv2.fillPoly(frame, [cursor.astype(np.int32)], (0, 0, 0))
+        # 스크롤 (간헐적 장면 변화)
+        if int(t) % 3 == 2:
+            frame = np.roll(frame, -int((t % 1) * height // 10), axis=0)
+        writer.write(frame)
+    writer.release()
+
+    if raw_path != path:
+        _mux_tone(raw_path, seconds, path, frequency=660)
+        os.remove(raw_path)
+    return path
+
+
+def build_generation_ladder(source_path, generations, work_dir):
+    """source를 N번 재인코딩한 세대 래더 [원본, 1세대, ..., N세대]
+
+    세대마다 CRF와 GOP 길이를 바꿔 재압축 흔적(블록, 이중 양자화, GOP 분산)이 쌓이게 한다.
+    """
+    ladder = [source_path]
+    if not _has_ffmpeg():
+        print("   ⚠️ ffmpeg 없음 - 세대 래더 생략")
+        return ladder
+
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    for gen in range(1, generations + 1):
+        out_path = os.path.join(work_dir, f"{stem}_gen{gen}.mp4")
+        _run_ffmpeg([
+            '-i', ladder[-1],
+            '-c:v', 'libx264', '-preset', 'veryfast', '-crf', str(20 + 3 * gen),
+            '-g', str(24 + 7 * gen), '-c:a', 'aac', '-b:a', f"{max(64, 192 - 32 * gen)}k",
+            out_path
+        ])
+        ladder.append(out_path)
+    return ladder
+
+
+def _profile_metrics(events, wall):
+    """계측 이벤트 -> 분석기별 처리량 + 영상 단위 메모리
+
+    최대 RSS는 프로세스 최고 수위라 분석기별로 나눌 수 없다. 영상마다 새 워커 프로세스에서
+    분석하므로(benchmark_analysis) 영상 하나를 분석한 프로세스의 최대 RSS로만 보고한다.
+    """
+    profiler = StageProfiler()
+    profiler.extend(events)
+    analyzers = {}
+    frames_decoded = 0
+    peak_rss = 0.0
+    for row in profiler.summary():
+        peak_rss = max(peak_rss, row['process_peak_rss_mb'])
+        if row['stage'] in ('frame_pipeline', 'codec_motion_decode'):
+            frames_decoded += row['frames']
+        analyzers[row['stage']] = {
+            'wall_s': round(row['wall_s'], 4),
+            'cpu_s': round(row['cpu_s'], 4),
+            'frames': row['frames'],
+            'frames_per_s': round(row['frames'] / row['wall_s'], 2) if row['frames'] and row['wall_s'] else 0
+        }
+    return {
+        'wall_s': round(wall, 4),
+        'frames_per_s': round(frames_decoded / wall, 2) if wall else 0,
+        'process_peak_rss_mb': round(peak_rss, 1),
+        'analyzers': analyzers
+    }
+
+
+def benchmark_analysis(forensics, video_paths):
+    """영상마다 새 워커 프로세스에서 comprehensive_analysis 측정 (프로세스별 최대 RSS 분리)"""
+    results = {}
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1,
+                             initializer=_init_analysis_worker) as executor:
+        for path in video_paths:
+            name = os.path.basename(path)
+            print(f"   ⏱️ {name}")
+            start = time.perf_counter()
+            analysis, _, events = executor.submit(
+                _analyze_video_worker, forensics.worker_options(), path).result()
+            metrics = _profile_metrics(events, time.perf_counter() - start)
+            metrics['generation_score'] = round(float(analysis['generation_score']), 4)
+            results[name] = metrics
+    return results
+
+
+def benchmark_find_source(forensics, ladder, workers):
+    """마지막 세대를 타겟, 나머지를 레퍼런스로 find_source_video 측정 + 정답 여부"""
+    target, references = ladder[-1], ladder[:-1]
+    forensics.profiler = StageProfiler()
+    start = time.perf_counter()
+    results = forensics.find_source_video(target, references, workers=workers)
+    wall = time.perf_counter() - start
+
+    ranking = [name for name, _ in results['generation_ranking']]
+    return {
+        'wall_s': round(wall, 4),
+        'videos_per_min': round(len(ladder) / wall * 60, 2) if wall else 0,
+        # 직전 세대가 소스, reference_1(원본)이 가장 원본에 가까워야 정답
+        'source_correct': results['source_match'] == f"reference_{len(references)}",
+        'original_correct': bool(ranking) and ranking[0] == 'reference_1',
+        'generation_ranking': ranking
+    }
+
+
+def compare_baseline(baseline, current, tolerance):
+    """기준선 대비 처리량이 tolerance 비율 이상 떨어진 지표 목록
+
+    회귀 판정은 영상 단위 frames_per_s와 find_source의 videos_per_min만 본다. 분석기별 행은
+    몇 프레임을 몇 ms에 처리하는 수준이라 측정 잡음이 허용 범위를 쉽게 넘는다 (참고용).
+    """
+    regressions = []
+
+    def check(path, base, cur):
+        for key in THROUGHPUT_KEYS:
+            value = base.get(key)
+            if key in cur and value and cur[key] < value * (1 - tolerance):
+                regressions.append({
+                    'metric': '.'.join(path + [key]),
+                    'baseline': value,
+                    'current': cur[key],
+                    'change': round(cur[key] / value - 1, 4)
+                })
+
+    for res_name, base_case in baseline.get('cases', {}).items():
+        cur_case = current.get('cases', {}).get(res_name)
+        if not cur_case:
+            continue
+        for name, base_metrics in base_case.get('analysis', {}).items():
+            if name in cur_case.get('analysis', {}):
+                check([res_name, 'analysis', name], base_metrics, cur_case['analysis'][name])
+        if 'find_source' in base_case and 'find_source' in cur_case:
+            base_fs, cur_fs = base_case['find_source'], cur_case['find_source']
+            check([res_name, 'find_source'], base_fs, cur_fs)
+            for key in ('source_correct', 'original_correct'):
+                if base_fs.get(key) and not cur_fs.get(key):
+                    regressions.append({'metric': f"{res_name}.find_source.{key}",
+                                        'baseline': base_fs[key], 'current': cur_fs.get(key)})
+    return regressions
+
+
+def run_benchmark(resolutions, generations, seconds, fps, work_dir, workers, sample_count=None):
+    os.makedirs(work_dir, exist_ok=True)
+    forensics = AdvancedVideoForensics(base_dir=work_dir, use_cache=False, sample_count=sample_count)
+
+    report = {
+        'meta': {
+            'analyzer_version': ANALYZER_VERSION,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'opencv': cv2.__version__,
+            'ffmpeg': _has_ffmpeg(),
+            'seconds': seconds,
+            'fps': fps,
+            'generations': generations,
+            'sample_count': sample_count
+        },
+        'cases': {}
+    }
+
+    for res_name in resolutions:
+        size = RESOLUTIONS[res_name]
+        print(f"\n🎬 {res_name} {size[0]}x{size[1]} 합성 영상 생성...")
+        camera = synthesize_camera_clip(os.path.join(work_dir, f"camera_{res_name}.mp4"), size, seconds, fps)
+        screen = synthesize_screen_recording(os.path.join(work_dir, f"screen_{res_name}.mp4"), size, seconds, fps)
+        ladder = build_generation_ladder(camera, generations, work_dir)
+
+        print(f"📊 {res_name} 분석 벤치마크...")
+        case = {'analysis': benchmark_analysis(forensics, ladder + [screen])}
+        if len(ladder) > 1:
+            case['find_source'] = benchmark_find_source(forensics, ladder, workers)
+        report['cases'][res_name] = case
+
+    return report
+
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print("📈 벤치마크 결과")
+    print("=" * 60)
+    for res_name, case in report['cases'].items():
+        print(f"\n[{res_name}]")
+        for name, metrics in case['analysis'].items():
+            print(f"   {name:<28}{metrics['wall_s']:>8.2f}s {metrics['frames_per_s']:>8.1f} fps "
+                  f"{metrics['process_peak_rss_mb']:>7.0f}MB(프로세스 최대)  세대점수 {metrics['generation_score']:.3f}")
+        if 'find_source' in case:
+            fs = case['find_source']
+            print(f"   find_source_video: {fs['wall_s']:.2f}s ({fs['videos_per_min']:.1f} videos/min), "
+                  f"소스 {'✅' if fs['source_correct'] else '❌'}, 원본 {'✅' if fs['original_correct'] else '❌'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="영상 포렌식 벤치마크 (합성 영상, 오프라인)")
+    parser.add_argument('--resolutions', default='720p,1080p',
+                        help=f"쉼표 구분 ({', '.join(RESOLUTIONS)}) (기본 720p,1080p)")
+    parser.add_argument('--generations', type=int, default=3, help="재인코딩 세대 수 (기본 3)")
+    parser.add_argument('--seconds', type=float, default=6, help="합성 영상 길이 (기본 6초)")
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=1, help="find_source_video 병렬 워커 수")
+    parser.add_argument('--sample-frames', type=int, default=None, metavar='N')
+    parser.add_argument('--work-dir', default=os.path.join('output', 'benchmark'),
+                        help="합성 영상/결과 디렉터리")
+    parser.add_argument('--output', default=None, help="결과 JSON 경로 (기본 work-dir/benchmark_<시각>.json)")
+    parser.add_argument('--baseline', default=None, help="비교할 기준선 JSON")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="허용 처리량 감소 비율 (기본 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    resolutions = [r.strip().lower() for r in args.resolutions.split(',') if r.strip()]
+    unknown = [r for r in resolutions if r not in RESOLUTIONS]
+    if unknown:
+        parser.error(f"지원하지 않는 해상도: {', '.join(unknown)}")
+
+    report = run_benchmark(resolutions, args.generations, args.seconds, args.fps,
+                           args.work_dir, args.workers, args.sample_frames)
+    print_report(report)
+
+    output = args.output or os.path.join(
+        args.work_dir, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 결과 저장: {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('analyzer_version') != ANALYZER_VERSION:
+            print(f"⚠️ 기준선 분석기 버전 다름: {baseline.get('meta', {}).get('analyzer_version')} -> {ANALYZER_VERSION}")
+        regressions = compare_baseline(baseline, report, args.tolerance)
+        if regressions:
+            print(f"\n❌ 회귀 {len(regressions)}건 (허용 {args.tolerance * 100:.0f}%):")
+            for item in regressions:
+                print(f"   {item['metric']}: {item['baseline']} -> {item['current']}")
+            sys.exit(1)
+        print("\n✅ 기준선 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
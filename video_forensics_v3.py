@@ -10,28 +10,2059 @@ import cv2
 import numpy as np
 from datetime import datetime
 import os
+import sys
 import json
 import hashlib
 import subprocess
+import tempfile
 from collections import defaultdict
 import struct
-from scipy import signal, fftpack, stats
+import errno
+from scipy import signal, fftpack, stats, ndimage
 import librosa
-from tkinter import Tk, filedialog
 import shutil
+import argparse
+import asyncio
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # 라이브러리 imports
-from PIL import Image
-import imagehash
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 import yt_dlp
 
+# 파일 선택 대화상자 (대화형 모드 전용 - 헤드리스 서버에서는 없어도 됨)
+try:
+    from tkinter import Tk, filedialog
+except ImportError:
+    Tk = filedialog = None
+
+# 배치 매니페스트 YAML 지원 (선택 사항 - 없으면 JSON만)
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# 코덱 움직임 벡터 추출용 (선택 사항 - 없으면 Optical Flow로 대체)
+try:
+    import av
+except ImportError:
+    av = None
+
+# 단계별 계측용 (선택 사항 - 없으면 /proc, resource로 대체하거나 0으로 기록)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# 분석기 버전 - 분석 결과가 달라지는 변경 시 올려서 기존 캐시를 무효화
+ANALYZER_VERSION = "3.11"
+
+# 분석 전용 다운로드 구간 (초) - 오디오 30초 + 프레임 분석 여유분
+ANALYSIS_WINDOW_SECONDS = 35
+
+
+def _to_json_value(value):
+    """NumPy 값을 JSON 직렬화 가능한 값으로 변환"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"JSON 직렬화 불가: {type(value)}")
+
+
+def quick_content_hash(video_path, sample_size=4 * 1024 * 1024):
+    """빠른 내용 해시 - 전체를 읽지 않고 파일 크기와 앞/중간/끝 샘플만 해시"""
+    size = os.path.getsize(video_path)
+    h = hashlib.sha1()
+    h.update(str(size).encode())
+    with open(video_path, 'rb') as f:
+        if size <= sample_size * 3:
+            h.update(f.read())
+        else:
+            for pos in (0, size // 2 - sample_size // 2, size - sample_size):
+                f.seek(pos)
+                h.update(f.read(sample_size))
+    return h.hexdigest()
+
+
+def _bytes_read():
+    """현재 프로세스가 지금까지 읽은 바이트 수 (파일 + 파이프)"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if psutil is not None:
+        try:
+            return psutil.Process().io_counters().read_bytes
+        except Exception:
+            pass
+    return 0
+
+
+def _peak_rss_mb():
+    """현재 프로세스의 최대 상주 메모리 (MB)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux는 KB, macOS는 바이트 단위
+        return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 1024 ** 2
+    return 0.0
+
+
+def _child_cpu_seconds():
+    """종료된 자식 프로세스(ffmpeg/ffprobe)의 누적 CPU 시간"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class StageProfiler:
+    """분석 단계별 계측 - 벽시계/CPU 시간, 처리 프레임 수, 읽은 바이트, 최대 RSS
+
+    stage() 구간마다 Chrome trace 형식("ph": "X") 이벤트를 하나씩 기록한다.
+    cpu_ms는 구간을 실행한 스레드의 CPU 시간(time.thread_time)이라 동시에 도는 다른 스레드
+    (배치 모드의 다운로드/매칭 등)의 CPU가 섞이지 않는다. 디코더 내부 스레드를 포함한
+    프로세스 전체 CPU는 process_cpu_ms에 따로 남긴다. 읽은 바이트와 최대 RSS는 운영체제가
+    프로세스 단위로만 제공하므로 process_ 접두어를 붙인다 (동시 구간끼리 겹쳐 셈, 최대 RSS는
+    프로세스 최고 수위).
+    워커 프로세스의 이벤트는 extend()로 합치며, 이벤트의 pid로 프로세스가 구분된다.
+    save_trace()로 저장한 JSON은 chrome://tracing 또는 Perfetto에서 열 수 있다.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.events = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, video=None, **args):
+        """계측 구간 - yield한 dict에 'frames' 등 카운터를 더하면 이벤트에 함께 기록"""
+        counters = {'frames': 0}
+        if not self.enabled:
+            yield counters
+            return
+        start = time.time()
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        process_cpu = time.process_time()
+        child_cpu = _child_cpu_seconds()
+        read = _bytes_read()
+        try:
+            yield counters
+        finally:
+            self.record(name, video, start, time.perf_counter() - wall,
+                        time.thread_time() - cpu,
+                        process_cpu_ms=round((time.process_time() - process_cpu) * 1000, 1),
+                        child_cpu_ms=round((_child_cpu_seconds() - child_cpu) * 1000, 1),
+                        process_bytes_read=_bytes_read() - read, **counters, **args)
+
+    def record(self, name, video, start, wall, cpu, **args):
+        """이벤트 직접 기록 (start는 epoch 초, wall/cpu는 초, cpu는 호출 스레드 기준)"""
+        if not self.enabled:
+            return
+        event = {
+            'name': name,
+            'cat': 'forensics',
+            'ph': 'X',
+            'ts': int(start * 1e6),
+            'dur': max(int(wall * 1e6), 1),
+            'pid': os.getpid(),
+            'tid': threading.get_ident() % 2 ** 31,
+            'args': {
+                'video': os.path.basename(video) if video else None,
+                'cpu_ms': round(cpu * 1000, 1),
+                'process_peak_rss_mb': round(_peak_rss_mb(), 1),
+                **args
+            }
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def extend(self, events):
+        with self._lock:
+            self.events.extend(events)
+
+    def summary(self):
+        """단계 이름별 합계 (벽시계 시간 내림차순)"""
+        rows = {}
+        for event in self.events:
+            args = event['args']
+            row = rows.setdefault(event['name'], {
+                'stage': event['name'], 'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                'frames': 0, 'process_bytes_read': 0, 'process_peak_rss_mb': 0.0
+            })
+            row['calls'] += 1
+            row['wall_s'] += event['dur'] / 1e6
+            row['cpu_s'] += (args.get('cpu_ms', 0) + args.get('child_cpu_ms', 0)) / 1000
+            row['frames'] += args.get('frames', 0)
+            row['process_bytes_read'] += args.get('process_bytes_read', 0)
+            row['process_peak_rss_mb'] = max(row['process_peak_rss_mb'], args.get('process_peak_rss_mb', 0))
+        return sorted(rows.values(), key=lambda row: -row['wall_s'])
+
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        print("\n⏱️ 단계별 계측 요약")
+        print("   (CPU: 단계 실행 스레드 + ffmpeg 자식 프로세스, 읽기/RSS: 프로세스 전체)")
+        print(f"   {'단계':<28}{'횟수':>5}{'시간(s)':>10}{'CPU(s)':>10}{'프레임':>8}{'읽기(MB)':>10}{'RSS(MB)':>9}")
+        for row in rows:
+            print(f"   {row['stage']:<28}{row['calls']:>5}{row['wall_s']:>10.2f}{row['cpu_s']:>10.2f}"
+                  f"{row['frames']:>8}{row['process_bytes_read'] / 1024 ** 2:>10.1f}"
+                  f"{row['process_peak_rss_mb']:>9.0f}")
+
+    def save_trace(self, path):
+        """Chrome trace JSON 저장"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+class FeatureCache:
+    """내용 해시 기반 영구 특징 캐시 (크기 제한 LRU)
+
+    키 = 빠른 내용 해시(파일 크기 + 앞/중간/끝 샘플) + 분석기 버전.
+    항목마다 <key>.json(종합 분석 결과)과 <key>.npz(원시 특징 벡터)를 저장하고,
+    접근 시 mtime을 갱신해 LRU 순서로 사용한다. 항목이 독립 파일이라
+    여러 프로세스가 같은 캐시 디렉터리를 함께 써도 안전하다.
+    """
+
+    SAMPLE_SIZE = 4 * 1024 * 1024  # 해시용 샘플 크기 (앞/중간/끝 각 4MB)
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3, version=ANALYZER_VERSION):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = version
+        self._hash_memo = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def content_hash(self, video_path):
+        """빠른 내용 해시 - 전체를 읽지 않고 크기와 세 구간만 해시"""
+        stat = os.stat(video_path)
+        memo_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._hash_memo:
+            self._hash_memo[memo_key] = quick_content_hash(video_path, self.SAMPLE_SIZE)
+        return self._hash_memo[memo_key]
+
+    def key_for(self, video_path):
+        return f"{self.content_hash(video_path)}_{self.version}"
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.npz'
+
+    def get(self, video_path):
+        """캐시된 (analysis, features) 반환, 없으면 None"""
+        try:
+            json_path, npz_path = self._paths(self.key_for(video_path))
+            if not os.path.exists(json_path):
+                return None
+            
+            with open(json_path, 'r', encoding='utf-8') as f:
+                analysis = json.load(f)
+            
+            features = {}
+            if os.path.exists(npz_path):
+                with np.load(npz_path, allow_pickle=False) as data:
+                    features = {name: data[name] for name in data.files}
+                os.utime(npz_path)
+            
+            # LRU 접근 시각 갱신
+            os.utime(json_path)
+            return analysis, features
+        except Exception as e:
+            print(f"   ⚠️ 캐시 읽기 실패: {str(e)}")
+            return None
+
+    def put(self, video_path, analysis, features=None):
+        """분석 결과와 원시 특징 저장 후 용량 초과 시 LRU 제거"""
+        try:
+            json_path, npz_path = self._paths(self.key_for(video_path))
+            
+            # 임시 파일에 쓴 뒤 교체 (다른 프로세스가 반쯤 쓴 파일을 읽지 않도록)
+            if features:
+                tmp_npz = npz_path + f'.{os.getpid()}.tmp.npz'
+                np.savez(tmp_npz, **{name: np.asarray(value) for name, value in features.items()})
+                os.replace(tmp_npz, npz_path)
+            
+            tmp_json = json_path + f'.{os.getpid()}.tmp'
+            with open(tmp_json, 'w', encoding='utf-8') as f:
+                json.dump(analysis, f, ensure_ascii=False, default=_to_json_value)
+            os.replace(tmp_json, json_path)
+            
+            self.evict()
+        except Exception as e:
+            print(f"   ⚠️ 캐시 저장 실패: {str(e)}")
+
+    def evict(self):
+        """max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 제거"""
+        entries = {}
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if '.tmp' in name:
+                continue
+            path = os.path.join(self.cache_dir, name)
+            key = name.rsplit('.', 1)[0]
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = entries.setdefault(key, {'size': 0, 'mtime': 0, 'paths': []})
+            entry['size'] += stat.st_size
+            entry['mtime'] = max(entry['mtime'], stat.st_mtime)
+            entry['paths'].append(path)
+            total += stat.st_size
+        
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]['mtime']):
+            if total <= self.max_bytes:
+                break
+            for path in entry['paths']:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= entry['size']
+
+
+class DecodedFrameCache:
+    """디코딩된 분석 해상도 그레이스케일 프레임 캐시 (np.memmap, 크기 제한 LRU)
+
+    항목마다 <key>.u8(프레임 레코드)과 <key>.json(타임스탬프, 인덱스, 샘플 위치 경계,
+    영상 정보)을 저장한다. 레코드 하나는 분석 해상도 프레임(H x W)이고, frame_height로
+    축소한 경우 그 뒤에 원본 해상도 중앙 타일(PRNU용)이 이어진다. 읽기는 읽기 전용
+    memmap이라 같은 영상을 분석하는 여러 분석기와 워커 프로세스가 OS 페이지 캐시의
+    한 사본을 복사 없이 공유한다.
+    키 = 내용 해시 + 프레임 선택 방식(앞부분 연속 "seq" / 층화 샘플링 "sN") + 분석 해상도.
+    내용 해시 메모와 LRU 제거는 내부 FeatureCache 저장소에 맡긴다 (특징 get/put은 노출하지 않음).
+    """
+
+    def __init__(self, cache_dir, max_bytes=8 * 1024 ** 3, frame_height=None, codec_motion=False):
+        self.cache_dir = cache_dir
+        # 코덱 움직임 벡터를 함께 기록하는 백엔드(PyAV)의 항목은 따로 둠
+        self.version = f"r2-h{frame_height or 0}" + ("-mv" if codec_motion else "")
+        self._store = FeatureCache(cache_dir, max_bytes, version=self.version)
+
+    def key_for(self, video_path, mode):
+        return f"{self._store.content_hash(video_path)}_{mode}_{self.version}"
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.u8'
+
+    def evict(self):
+        self._store.evict()
+
+    def lookup(self, video_path, mode):
+        """캐시 항목 메타데이터 + 읽기 전용 memmap, 없으면 None"""
+        try:
+            json_path, data_path = self._paths(self.key_for(video_path, mode))
+            if not os.path.exists(json_path):
+                return None
+            with open(json_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            meta['frames'] = np.memmap(data_path, dtype=np.uint8, mode='r',
+                                       shape=(meta['count'], _record_bytes(meta)))
+            os.utime(json_path)
+            os.utime(data_path)
+            return meta
+        except Exception as e:
+            print(f"   ⚠️ 프레임 캐시 읽기 실패: {str(e)}")
+            return None
+
+    def covers(self, meta, max_frames, burst):
+        """캐시 항목이 요청한 프레임 범위를 모두 담고 있는지"""
+        if meta['mode'] == 'seq':
+            return meta['eof'] or meta['max_frames'] >= max_frames
+        return meta['burst'] >= burst
+
+    def replay(self, meta, max_frames, burst):
+        """캐시 프레임을 파이프라인 소스 형식으로 재생 (memmap 뷰, 복사 없음)"""
+        frames = meta['frames']
+        shape = tuple(meta['shape'])
+        split = int(np.prod(shape))
+        native_shape = tuple(meta['native_shape']) if meta['native_shape'] else None
+        segment_starts = set(meta['segment_starts'])
+        sequential = meta['mode'] == 'seq'
+        for i, (index, offset, timestamp) in enumerate(zip(meta['indices'], meta['offsets'],
+                                                           meta['timestamps'])):
+            if i in segment_starts:
+                yield None
+            if sequential and index >= max_frames:
+                break
+            if offset < burst:
+                record = frames[i]
+                native = record[split:].reshape(native_shape) if native_shape else None
+                yield index, offset, None, record[:split].reshape(shape), timestamp, native, meta['motion'][i]
+
+    def writer(self, video_path, mode, info, capacity, max_frames=0, burst=0):
+        return _FrameCacheWriter(self, self.key_for(video_path, mode), mode, info, capacity,
+                                 max_frames, burst)
+
+
+def _record_bytes(meta):
+    """프레임 캐시 레코드 크기 (분석 해상도 프레임 + 원본 해상도 타일)"""
+    return int(np.prod(meta['shape'])) + (int(np.prod(meta['native_shape'])) if meta['native_shape'] else 0)
+
+
+class _FrameCacheWriter:
+    """디코딩하면서 프레임을 임시 memmap에 기록하고, 완료 시 원자적으로 교체"""
+
+    def __init__(self, cache, key, mode, info, capacity, max_frames, burst):
+        self.cache = cache
+        self.json_path, self.data_path = cache._paths(key)
+        self.tmp_path = self.data_path + f'.{os.getpid()}.tmp'
+        self.capacity = max(int(capacity), 1)
+        self.frames = None
+        self.eof = False
+        self.meta = {
+            'mode': mode, 'info': {'fps': info['fps'], 'frame_count': info['frame_count']},
+            'max_frames': max_frames, 'burst': burst, 'count': 0, 'shape': None, 'native_shape': None,
+            'indices': [], 'offsets': [], 'timestamps': [], 'motion': [], 'segment_starts': []
+        }
+
+    def new_segment(self):
+        self.meta['segment_starts'].append(self.meta['count'])
+
+    def append(self, index, offset, gray, timestamp, native=None, motion=None):
+        if self.frames is None:
+            self.meta['shape'] = list(gray.shape)
+            self.meta['native_shape'] = list(native.shape) if native is not None else None
+            self.frames = np.memmap(self.tmp_path, dtype=np.uint8, mode='w+',
+                                    shape=(self.capacity, _record_bytes(self.meta)))
+        count = self.meta['count']
+        native_shape = list(native.shape) if native is not None else None
+        if (count >= self.capacity or list(gray.shape) != self.meta['shape']
+                or native_shape != self.meta['native_shape']):
+            return
+        split = gray.size
+        self.frames[count, :split] = gray.reshape(-1)
+        if native is not None:
+            self.frames[count, split:] = native.reshape(-1)
+        self.meta['indices'].append(int(index))
+        self.meta['offsets'].append(int(offset))
+        self.meta['timestamps'].append(float(timestamp))
+        self.meta['motion'].append(motion)
+        self.meta['count'] = count + 1
+
+    def commit(self):
+        if self.frames is None or not self.meta['count']:
+            self.abort()
+            return
+        self.meta['eof'] = self.eof
+        self.frames.flush()
+        del self.frames
+        self.frames = None
+        try:
+            # 실제 기록한 프레임 수만큼 잘라낸 뒤 교체 (다른 프로세스는 완성된 파일만 봄)
+            os.truncate(self.tmp_path, self.meta['count'] * _record_bytes(self.meta))
+            os.replace(self.tmp_path, self.data_path)
+            tmp_json = self.json_path + f'.{os.getpid()}.tmp'
+            with open(tmp_json, 'w', encoding='utf-8') as f:
+                json.dump(self.meta, f)
+            os.replace(tmp_json, self.json_path)
+            self.cache.evict()
+        except OSError as e:
+            print(f"   ⚠️ 프레임 캐시 저장 실패: {str(e)}")
+            self.abort()
+
+    def abort(self):
+        self.frames = None
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+# 축소 분석(frame_height)에서도 원본 해상도로 함께 전달하는 중앙 타일 크기 (PRNU용)
+NATIVE_TILE = 512
+
+
+class FrameAnalyzer:
+    """단일 디코드 파이프라인에 등록되는 프레임 분석기 기본 클래스
+
+    파이프라인은 영상을 한 번만 디코딩하고, 각 프레임을 등록된 분석기에 전달한다.
+    분석기는 begin()에서 필요한 프레임 수를 알리고, process()로 프레임을 받으며,
+    result()로 최종 결과를 반환한다.
+    """
+
+    name = "analyzer"
+    label = "분석기"
+    frames_per_sample = 1  # 샘플링 모드에서 샘플 위치마다 받을 연속 프레임 수
+    # True면 frame_height로 축소한 프레임 대신 원본 해상도 중앙 타일(NATIVE_TILE)을 gray로 받음
+    native_resolution = False
+    # True면 merge()를 구현해 구간 병렬 디코드에 참여 (하나라도 False면 순차 디코드)
+    mergeable = False
+
+    def begin(self, info):
+        """영상 정보(fps, frame_count, sampled)를 받고 필요한 프레임 수를 반환
+
+        샘플링 모드(info['sampled'])에서는 반환값과 wants()를 무시하고
+        모든 샘플 위치의 프레임을 전달한다.
+        """
+        return 0
+
+    def wants(self, index):
+        """해당 인덱스의 프레임이 필요한지 여부"""
+        return True
+
+    def new_segment(self):
+        """샘플링 모드에서 새 위치로 탐색했을 때 호출 (연속성 초기화용)"""
+        pass
+
+    def codec_motion(self, index, value):
+        """디코더가 내보낸 코덱 움직임 벡터 크기 (PyAV 백엔드, 블록 면적 가중 평균 픽셀)
+
+        같은 프레임의 process() 직전에 호출된다. 움직임 벡터가 없는 프레임(키프레임 등)에서는
+        호출되지 않는다.
+        """
+        pass
+
+    def process(self, index, frame, gray, timestamp=None):
+        """프레임 처리 (gray는 파이프라인이 한 번만 변환해 공유, timestamp는 초 단위)
+
+        프레임 캐시 재생과 ffmpeg 디코드 백엔드에서는 그레이스케일만 있으므로 frame이 None이다.
+        gray는 다음 프레임에서 덮어써지는 재사용 버퍼일 수 있으므로 보관하려면 복사해야 한다.
+        """
+        pass
+
+    def merge(self, other):
+        """뒤따르는 시간 구간을 처리한 같은 분석기의 상태를 합침 (구간 병렬 디코드용)
+
+        result() 전 누적 상태를 결합 법칙이 성립하는 방식(합계, 순서 연결, OR)으로 합쳐
+        한 프로세스에서 순서대로 처리한 것과 같은 상태를 만들어야 한다.
+        구현한 분석기는 mergeable = True로 표시한다.
+        """
+        raise NotImplementedError(f"{type(self).__name__}는 구간 병합을 지원하지 않음")
+
+    def result(self):
+        return None
+
+
+class CompressionArtifactAnalyzer(FrameAnalyzer):
+    """압축 아티팩트 분석 (블록 노이즈, 모스키토 노이즈, 양자화 손실, 이중 양자화)
+
+    프레임을 batch_size장씩 모아 (N, H/8, W/8, 8, 8) 블록으로 재배열하고,
+    8x8 DCT를 한 번의 행렬곱으로 계산한다. 저주파 AC 계수별 히스토그램을 누적해
+    양자화 스텝과 이중 양자화(재압축)의 주기적 히스토그램 흔적을 추정한다.
+    """
+
+    name = "compression_artifacts"
+    label = "압축 아티팩트"
+    mergeable = True
+
+    HIST_RANGE = 64  # 계수 히스토그램 범위 [-64, 64]
+    DQ_FREQS = [(0, 1), (1, 0), (1, 1), (0, 2), (2, 0), (1, 2), (2, 1), (2, 2), (0, 3), (3, 0)]
+
+    def __init__(self, max_frames=30, step=10, batch_size=16):
+        self.max_frames = max_frames
+        self.step = step
+        self.batch_size = batch_size
+        self.frames = 0
+        self.batch = []
+        self.histograms = np.zeros((len(self.DQ_FREQS), 2 * self.HIST_RANGE + 1), dtype=np.int64)
+        self.zero_coeffs = 0
+        self.total_coeffs = 0
+        self.artifacts = {
+            'block_score': 0,
+            'mosquito_score': 0,
+            'quantization_loss': 0
+        }
+
+    def begin(self, info):
+        return min(self.max_frames, info['frame_count'])
+
+    def wants(self, index):
+        return index % self.step == 0
+
+    def process(self, index, frame, gray, timestamp=None):
+        self.frames += 1
+
+        # 모스키토 노이즈 (에지 주변 잡음)
+        edges = cv2.Canny(gray, 50, 150)
+        dilated = cv2.dilate(edges, np.ones((3, 3)))
+        noise_area = cv2.bitwise_and(gray, gray, mask=dilated)
+        if np.any(noise_area > 0):
+            self.artifacts['mosquito_score'] += np.std(noise_area[noise_area > 0])
+
+        rows = gray.shape[0] // 8 * 8
+        cols = gray.shape[1] // 8 * 8
+        # gray는 재사용 버퍼일 수 있으므로 복사해 보관
+        self.batch.append(gray[:rows, :cols].copy())
+        if len(self.batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        """모인 프레임 배치의 블록 DCT 통계 누적"""
+        if not self.batch:
+            return
+        stack = np.stack(self.batch).astype(np.float32)
+        self.batch = []
+        n, rows, cols = stack.shape
+
+        # 블록 아티팩트
+        h_edges = np.abs(np.diff(stack[:, ::8, :], axis=1))
+        v_edges = np.abs(np.diff(stack[:, :, ::8], axis=2))
+        self.artifacts['block_score'] += (h_edges.mean(axis=(1, 2)) + v_edges.mean(axis=(1, 2))).sum()
+
+        # (N, H/8, W/8, 8, 8) 블록 -> 배치 DCT (정규직교, JPEG와 같은 -128 레벨 시프트)
+        blocks = (stack - 128).reshape(n, rows // 8, 8, cols // 8, 8).transpose(0, 1, 3, 2, 4)
+        d = _dct_matrix(8)
+        d[0] *= np.sqrt(1 / 32)
+        d[1:] *= np.sqrt(1 / 16)
+        coeffs = d @ blocks @ d.T
+
+        # 양자화 손실: 0으로 양자화된 AC 계수 비율
+        ac_zero = np.count_nonzero(np.abs(coeffs) < 0.5) - np.count_nonzero(np.abs(coeffs[..., 0, 0]) < 0.5)
+        self.zero_coeffs += ac_zero
+        self.total_coeffs += coeffs.size - coeffs[..., 0, 0].size
+
+        # 주파수별 계수 히스토그램
+        selected = np.stack([coeffs[..., u, v].ravel() for u, v in self.DQ_FREQS])
+        values = np.clip(np.rint(selected), -self.HIST_RANGE, self.HIST_RANGE).astype(np.int64) + self.HIST_RANGE
+        width = self.histograms.shape[1]
+        offsets = (np.arange(len(self.DQ_FREQS)) * width)[:, None]
+        self.histograms += np.bincount((values + offsets).ravel(),
+                                       minlength=self.histograms.size).reshape(self.histograms.shape)
+
+    def merge(self, other):
+        self._flush()
+        other._flush()
+        self.frames += other.frames
+        self.histograms += other.histograms
+        self.zero_coeffs += other.zero_coeffs
+        self.total_coeffs += other.total_coeffs
+        for key in ('block_score', 'mosquito_score'):
+            self.artifacts[key] += other.artifacts[key]
+
+    @staticmethod
+    def _lattice_mass(folded, q, tol):
+        """|c| >= 2 구간에서 q 배수에 정확히 놓인 질량과 ±tol 안에 놓인 질량"""
+        magnitudes = np.arange(1, folded.size + 1)
+        distance = np.minimum(magnitudes % q, q - magnitudes % q)
+        valid = magnitudes >= 2
+        return folded[valid & (distance == 0)].sum(), folded[valid & (distance <= tol)].sum()
+
+    def _double_quantization(self):
+        """계수 히스토그램에서 양자화 스텝과 이중 양자화 점수 추정
+
+        디코딩된 픽셀은 반올림/클리핑을 거치므로 재계산한 DCT 계수는 q 배수
+        주변 ±1로 번진다. 그래서 q >= 4는 |c| >= 2 질량의 90% 이상이 배수 ±1에,
+        60% 이상이 배수 자체에 놓여야 하고(피크 중심이 격자 위), q = 2, 3은 90%
+        이상이 정확한 배수에 놓여야 한다. 이를 만족하는 가장 큰 q를 마지막
+        양자화 스텝으로 본다 (|c| = 1은 모든 격자에 붙으므로 판정에서 제외).
+        q > 1일 때만 격자점(±tol 합산) 히스토그램에 주기적인 요철(이전 양자화의
+        흔적)이 있는지 FFT 피크로 측정한다 - q = 1이면 격자가 없어 단일 압축의
+        분포 자체를 재압축으로 오인하게 된다.
+        """
+        steps = []
+        scores = []
+        for hist in self.histograms:
+            folded = hist[self.HIST_RANGE + 1:] + hist[self.HIST_RANGE - 1::-1]  # |c| = 1..HIST_RANGE
+            total = folded[1:].sum()
+            if total < 100:
+                continue
+            q = 1
+            for candidate in range(2, 17):
+                tol = 1 if candidate >= 4 else 0
+                exact, near = self._lattice_mass(folded, candidate, tol)
+                if near >= 0.9 * total and exact >= (0.6 if tol else 0.9) * total:
+                    q = candidate
+            steps.append(q)
+            if q == 1:
+                continue
+
+            tol = 1 if q >= 4 else 0
+            padded = np.concatenate([[hist[self.HIST_RANGE]], folded])  # |c| = 0..HIST_RANGE
+            centers = np.arange(q, folded.size - tol + 1, q)
+            lattice = sum(padded[centers + k] for k in range(-tol, tol + 1)).astype(np.float64)
+            if lattice.size < 6:
+                continue
+            # 단조 감소 추세를 제거한 잔차의 주기 성분
+            trend = ndimage.uniform_filter1d(lattice, 3, mode='nearest')
+            spectrum = np.abs(np.fft.rfft(lattice - trend))
+            scores.append(spectrum[1:].max() / (lattice.sum() + 1e-10))
+
+        return {
+            'double_quantization': float(np.mean(scores)) if scores else 0.0,
+            'quant_step_estimate': float(np.median(steps)) if steps else 0.0
+        }
+
+    def result(self):
+        self._flush()
+        # 실제 처리한 프레임 수로 평균
+        divisor = max(self.frames, 1)
+        self.artifacts['block_score'] /= divisor
+        self.artifacts['mosquito_score'] /= divisor
+        self.artifacts['quantization_loss'] = self.zero_coeffs / max(self.total_coeffs, 1)
+        self.artifacts.update(self._double_quantization())
+        return self.artifacts
+
+
+def _haar_dwt2(x):
+    """2D Haar 웨이블릿 1단계 분해 (정규직교, 짝수 크기 입력)"""
+    a = x[0::2, 0::2]
+    b = x[0::2, 1::2]
+    c = x[1::2, 0::2]
+    d = x[1::2, 1::2]
+    return (a + b + c + d) / 2, ((a - b + c - d) / 2, (a + b - c - d) / 2, (a - b - c + d) / 2)
+
+
+def _haar_idwt2(ll, details):
+    """2D Haar 웨이블릿 1단계 복원"""
+    lh, hl, hh = details
+    out = np.empty((ll.shape[0] * 2, ll.shape[1] * 2), dtype=ll.dtype)
+    out[0::2, 0::2] = (ll + lh + hl + hh) / 2
+    out[0::2, 1::2] = (ll - lh + hl - hh) / 2
+    out[1::2, 0::2] = (ll + lh - hl - hh) / 2
+    out[1::2, 1::2] = (ll - lh - hl + hh) / 2
+    return out
+
+
+def wavelet_denoise(image, sigma=3.0, levels=2):
+    """웨이블릿 도메인 국소 Wiener 잡음 제거 (Mihcak 방식, PRNU 잔차 추출용)
+
+    각 상세 대역 계수의 국소 분산을 3x3/5x5 창 중 작은 값으로 추정하고
+    var / (var + sigma²) 비율로 축소한다. image 크기는 2**levels의 배수여야 한다.
+    """
+    sigma2 = sigma * sigma
+    ll = image
+    stack = []
+    for _ in range(levels):
+        ll, details = _haar_dwt2(ll)
+        shrunk = []
+        for band in details:
+            energy = band * band
+            local_var = np.minimum(cv2.blur(energy, (3, 3)), cv2.blur(energy, (5, 5)))
+            local_var = np.maximum(local_var - sigma2, 0)
+            shrunk.append(band * (local_var / (local_var + sigma2)))
+        stack.append(shrunk)
+    
+    for details in reversed(stack):
+        ll = _haar_idwt2(ll, details)
+    return ll
+
+
+def _zero_mean_prnu(k):
+    """행/열 평균 제거 - 센서 판독 회로 등 비고유 선형 패턴 억제"""
+    k = k - k.mean(axis=1, keepdims=True)
+    return k - k.mean(axis=0, keepdims=True)
+
+
+class PRNUAnalyzer(FrameAnalyzer):
+    """PRNU (Photo Response Non-Uniformity) 추출 - 카메라 센서 지문
+
+    프레임 중앙 타일(기본 512x512)에서 웨이블릿 잡음 제거 잔차 W를 구하고
+    최대우도 추정 K = Σ(W·I) / Σ(I²)로 float32 누적기에 쌓는다.
+    PRNU는 픽셀 위치에 고정된 패턴이므로 리사이즈 대신 크롭을 사용한다 - 분석 해상도를
+    낮춰도(frame_height) 파이프라인이 원본 해상도 중앙 타일을 넘겨준다.
+    짝/홀 프레임을 따로 누적해 두 절반 지문의 상관을 지문 강도로 사용한다.
+    """
+
+    name = "prnu"
+    label = "PRNU"
+    mergeable = True
+    native_resolution = True
+
+    def __init__(self, max_frames=100, step=2, tile_size=NATIVE_TILE, sigma=3.0, levels=2):
+        self.max_frames = max_frames
+        self.step = step
+        self.tile_size = tile_size
+        self.sigma = sigma
+        self.levels = levels
+        self.numerators = None
+        self.denominators = None
+        self.frames = 0
+
+    def begin(self, info):
+        return self.max_frames
+
+    def wants(self, index):
+        return index % self.step == 0
+
+    def _crop(self, gray):
+        # 중앙 타일 크롭 (웨이블릿 분해를 위해 2**levels 배수로 맞춤)
+        block = 2 ** self.levels
+        rows, cols = gray.shape
+        th = min(self.tile_size, rows) // block * block
+        tw = min(self.tile_size, cols) // block * block
+        top = (rows - th) // 2
+        left = (cols - tw) // 2
+        return gray[top:top + th, left:left + tw]
+
+    def process(self, index, frame, gray, timestamp=None):
+        tile = self._crop(gray).astype(np.float32)
+        if tile.size == 0:
+            return
+
+        # 웨이블릿 잡음 제거 잔차
+        residual = tile - wavelet_denoise(tile, self.sigma, self.levels)
+
+        # 포화 픽셀은 PRNU 정보가 없으므로 제외
+        weight = tile * (tile < 250)
+
+        if self.numerators is None:
+            self.numerators = [np.zeros_like(tile), np.zeros_like(tile)]
+            self.denominators = [np.zeros_like(tile), np.zeros_like(tile)]
+
+        half = self.frames % 2
+        self.numerators[half] += residual * weight
+        self.denominators[half] += weight * weight
+        self.frames += 1
+
+    def merge(self, other):
+        if other.numerators is not None:
+            if self.numerators is None:
+                self.numerators = [np.zeros_like(n) for n in other.numerators]
+                self.denominators = [np.zeros_like(d) for d in other.denominators]
+            # 뒤 구간의 짝/홀 절반은 앞 구간 프레임 수만큼 밀린 전역 짝/홀에 대응
+            for half in range(2):
+                target = (half + self.frames) % 2
+                self.numerators[target] += other.numerators[half]
+                self.denominators[target] += other.denominators[half]
+        self.frames += other.frames
+
+    def result(self):
+        if self.numerators is None:
+            return {'fingerprint': np.zeros((0, 0), np.float32), 'strength': 0.0, 'frames': 0}
+
+        eps = 1e-6
+        fingerprint = _zero_mean_prnu(
+            sum(self.numerators) / (sum(self.denominators) + eps)
+        ).astype(np.float32)
+
+        # 짝/홀 절반 지문 간 상관 = 프레임 간 일관된 센서 패턴의 강도 (0~1)
+        strength = 0.0
+        if self.frames >= 2:
+            halves = [_zero_mean_prnu(n / (d + eps)) for n, d in zip(self.numerators, self.denominators)]
+            strength = max(prnu_correlation(halves[0], halves[1]), 0.0)
+
+        return {'fingerprint': fingerprint, 'strength': strength, 'frames': self.frames}
+
+
+def prnu_correlation(a, b):
+    """두 PRNU 지문의 정규화 상호상관 (NCC, 같은 위치 기준)"""
+    rows = min(a.shape[0], b.shape[0])
+    cols = min(a.shape[1], b.shape[1])
+    if rows == 0 or cols == 0:
+        return 0.0
+    a = _center_crop(a, rows, cols)
+    b = _center_crop(b, rows, cols)
+    a = a - a.mean()
+    b = b - b.mean()
+    norm = np.sqrt(np.sum(a * a) * np.sum(b * b))
+    return float(np.sum(a * b) / norm) if norm > 0 else 0.0
+
+
+def _center_crop(x, rows, cols):
+    top = (x.shape[0] - rows) // 2
+    left = (x.shape[1] - cols) // 2
+    return x[top:top + rows, left:left + cols]
+
+
+def prnu_pce(a, b, exclude=11):
+    """PCE (Peak-to-Correlation Energy) - FFT 상호상관 피크 에너지 대비 주변 에너지
+
+    반환: {'ncc', 'pce', 'peak_offset'} - PCE 60 이상이면 통상 같은 센서로 본다.
+    """
+    rows = min(a.shape[0], b.shape[0])
+    cols = min(a.shape[1], b.shape[1])
+    if rows == 0 or cols == 0:
+        return {'ncc': 0.0, 'pce': 0.0, 'peak_offset': (0, 0)}
+
+    a = _center_crop(a, rows, cols).astype(np.float32)
+    b = _center_crop(b, rows, cols).astype(np.float32)
+    a = a - a.mean()
+    b = b - b.mean()
+
+    xcorr = np.real(np.fft.ifft2(np.fft.fft2(a) * np.conj(np.fft.fft2(b))))
+    peak_y, peak_x = np.unravel_index(np.argmax(np.abs(xcorr)), xcorr.shape)
+    peak = xcorr[peak_y, peak_x]
+
+    # 피크 주변 exclude x exclude 영역을 제외한 상관 에너지 (순환 좌표)
+    half = exclude // 2
+    mask = np.ones(xcorr.shape, dtype=bool)
+    ys = np.arange(peak_y - half, peak_y + half + 1) % rows
+    xs = np.arange(peak_x - half, peak_x + half + 1) % cols
+    mask[np.ix_(ys, xs)] = False
+    energy = np.mean(xcorr[mask] ** 2) if mask.any() else 0
+
+    # 순환 좌표를 부호 있는 이동량으로 변환
+    offset = (int(peak_y if peak_y <= rows // 2 else peak_y - rows),
+              int(peak_x if peak_x <= cols // 2 else peak_x - cols))
+
+    return {
+        'ncc': prnu_correlation(a, b),
+        'pce': float(np.sign(peak) * peak * peak / energy) if energy > 0 else 0.0,
+        'peak_offset': offset
+    }
+
+
+# 종합 유사도 가중치 (압축 패턴, PRNU, GOP)
+SIMILARITY_WEIGHTS = {'compression': 0.5, 'prnu': 0.3, 'gop': 0.2}
+
+
+def _pce_similarity(pce):
+    """PCE -> 0~1 유사도 (PCE 60에서 약 0.63)"""
+    return 1 - np.exp(-np.maximum(pce, 0) / 60)
+
+
+def similarity_matrix(analyses, fingerprints=None, refine_rows=(), refine_top=5):
+    """모든 영상 쌍의 유사도 행렬 (N x N, float32, 특징별 + 가중 합)
+
+    analyses: 종합 분석 결과 리스트, fingerprints: 같은 순서의 PRNU 지문 (없으면 None).
+    스칼라 특징은 (N, 3) float32 행렬로 모아 브로드캐스팅으로 한 번에 비교한다.
+    PRNU는 지문을 공통 크기로 중앙 크롭해 정규화한 (N, R*C) 행렬의 행렬곱으로 NCC를 구하고,
+    백색 잡음 가정의 영이동 PCE ≈ sign(ncc) * ncc² * R*C로 환산한다. 이 근사는 이동 탐색이
+    없어 후보 선별용이며, refine_rows(예: 타겟 행)는 NCC 상위 refine_top개 후보만
+    prnu_pce(FFT 상호상관 피크, 이동 탐색 포함)로 다시 계산해 덮어쓴다.
+    """
+    n = len(analyses)
+    values = np.full((n, 3), np.nan, dtype=np.float32)
+    for i, analysis in enumerate(analyses):
+        if 'compression_artifacts' in analysis:
+            values[i, 0] = analysis['compression_artifacts']['block_score']
+        if 'prnu_strength' in analysis:
+            values[i, 1] = analysis['prnu_strength']
+        if 'gop_structure' in analysis:
+            values[i, 2] = analysis['gop_structure']['avg_gop_length']
+    present = ~np.isnan(values)
+    both = present[:, None, :] & present[None, :, :]
+    diff = np.abs(values[:, None, :] - values[None, :, :])
+    
+    # 압축 패턴: 1 / (1 + |블록 점수 차|)
+    compression = np.where(both[..., 0], 1 / (1 + diff[..., 0]), 0)
+    
+    # GOP: 평균 GOP 길이 비율 (min / max)
+    gop_len = np.where(present[:, 2] & (values[:, 2] > 0), values[:, 2], np.nan)
+    ratio = np.fmin(gop_len[:, None], gop_len[None, :]) / np.fmax(gop_len[:, None], gop_len[None, :])
+    gop = np.nan_to_num(ratio, nan=0.0)
+    
+    # PRNU: 지문이 둘 다 있으면 PCE, 아니면 지문 강도 차
+    prnu = np.where(both[..., 1], 1 / (1 + diff[..., 1] * 10), 0)
+    fingerprints = fingerprints or [None] * n
+    has_fp = np.array([fp is not None and fp.size > 0 for fp in fingerprints])
+    if has_fp.sum() >= 2:
+        idx = np.nonzero(has_fp)[0]
+        rows = min(fingerprints[i].shape[0] for i in idx)
+        cols = min(fingerprints[i].shape[1] for i in idx)
+        stack = np.stack([_center_crop(fingerprints[i], rows, cols).ravel() for i in idx]).astype(np.float32)
+        stack -= stack.mean(axis=1, keepdims=True)
+        stack /= np.linalg.norm(stack, axis=1, keepdims=True) + 1e-12
+        ncc = stack @ stack.T
+        pce = np.sign(ncc) * ncc * ncc * (rows * cols)
+        prnu[np.ix_(idx, idx)] = _pce_similarity(pce)
+        
+        position = {i: k for k, i in enumerate(idx)}
+        for row in refine_rows:
+            if row not in position:
+                continue
+            k = position[row]
+            candidates = [c for c in np.argsort(-ncc[k], kind='stable') if c != k][:refine_top]
+            for c in candidates:
+                j = idx[c]
+                value = _pce_similarity(prnu_pce(fingerprints[row], fingerprints[j])['pce'])
+                prnu[row, j] = prnu[j, row] = value
+    
+    features = {
+        'compression': compression.astype(np.float32),
+        'prnu': prnu.astype(np.float32),
+        'gop': gop.astype(np.float32)
+    }
+    weighted = sum(features[name] * weight for name, weight in SIMILARITY_WEIGHTS.items())
+    return {'features': features, 'weighted': weighted.astype(np.float32)}
+
+
+def cluster_similar(matrix, threshold=0.8):
+    """가중 유사도가 threshold 이상인 쌍을 연결한 연결 요소 (근접 중복 군집, 인덱스 리스트)"""
+    n = matrix.shape[0]
+    parent = np.arange(n)
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    for i, j in zip(*np.nonzero(np.triu(matrix >= threshold, k=1))):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    
+    clusters = defaultdict(list)
+    for i in range(n):
+        clusters[find(i)].append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def _motion_result(motion_series, method):
+    """프레임별 평균 움직임 크기 시퀀스 -> 움직임 통계"""
+    if motion_series:
+        return {
+            'motion_consistency': 1 / (1 + np.std(motion_series)),
+            'avg_motion': np.mean(motion_series),
+            'method': method
+        }
+    return {'motion_consistency': 0, 'avg_motion': 0, 'method': method}
+
+
+class MotionAnalyzer(FrameAnalyzer):
+    """움직임 벡터 분석 (코덱 움직임 벡터 우선, 없으면 Optical Flow)
+
+    PyAV 디코드 백엔드는 프레임과 함께 코덱 움직임 벡터를 넘겨주므로(codec_motion) 그 값을
+    그대로 쓴다. 코덱 벡터가 하나도 오지 않으면(다른 백엔드, 벡터를 내보내지 않는 코덱)
+    Farneback을 pyramid_level만큼 pyrDown한 저해상도 영상에서 계산하고,
+    움직임 크기는 원본 픽셀 단위로 환산한다.
+    """
+
+    name = "motion_vectors"
+    label = "움직임 벡터"
+    mergeable = True
+    frames_per_sample = 2  # 샘플 위치마다 연속 두 프레임으로 움직임 계산
+
+    def __init__(self, max_frames=60, pyramid_level=2):
+        self.max_frames = max_frames
+        self.pyramid_level = pyramid_level
+        self.prev_gray = None
+        self.motion_vectors = []
+        self.codec_vectors = []
+
+    def begin(self, info):
+        # 첫 프레임은 기준 프레임으로만 사용
+        return self.max_frames + 1
+
+    def codec_motion(self, index, value):
+        self.codec_vectors.append(value)
+
+    def new_segment(self):
+        # 탐색 후에는 이전 프레임과 연속되지 않음
+        self.prev_gray = None
+
+    def process(self, index, frame, gray, timestamp=None):
+        if self.codec_vectors:
+            # 코덱 벡터를 받고 있으면 Optical Flow 생략
+            return
+        small = gray
+        for _ in range(self.pyramid_level):
+            small = cv2.pyrDown(small)
+
+        if self.prev_gray is not None:
+            # Optical Flow 계산
+            flow = cv2.calcOpticalFlowFarneback(
+                self.prev_gray, small, None, 0.5, 3, 15, 3, 5, 1.2, 0
+            )
+
+            # 움직임 크기 계산 (원본 해상도 픽셀 단위로 환산)
+            magnitude, angle = cv2.cartToPolar(flow[..., 0], flow[..., 1])
+            self.motion_vectors.append(np.mean(magnitude) * (2 ** self.pyramid_level))
+
+        # gray는 재사용 버퍼일 수 있으므로 축소하지 않았다면 복사해 보관
+        self.prev_gray = small if small is not gray else gray.copy()
+
+    def merge(self, other):
+        # 구간 경계에서는 흐름을 계산하지 않음 (샘플 위치마다 연속성이 끊기는 것과 같음)
+        self.motion_vectors.extend(other.motion_vectors)
+        self.codec_vectors.extend(other.codec_vectors)
+        self.prev_gray = other.prev_gray
+
+    def series(self):
+        """프레임별 움직임 크기 시퀀스 (코덱 벡터가 있으면 코덱 벡터)"""
+        return self.codec_vectors or self.motion_vectors
+
+    def result(self):
+        if self.codec_vectors:
+            return _motion_result(self.codec_vectors, 'codec_mv')
+        return _motion_result(self.motion_vectors, 'farneback')
+
+
+def _frame_motion(frame):
+    """PyAV 프레임의 코덱 움직임 벡터 -> 블록 면적 가중 평균 크기 (픽셀), 없으면 None"""
+    mvs = frame.side_data.get('MOTION_VECTORS')
+    if mvs is None or len(mvs) == 0:
+        return None
+    data = mvs.to_ndarray()
+    scale = np.maximum(data['motion_scale'], 1).astype(np.float32)
+    dx = data['motion_x'] / scale
+    dy = data['motion_y'] / scale
+    area = data['w'].astype(np.float32) * data['h']
+    return float(np.sum(np.hypot(dx, dy) * area) / np.sum(area))
+
+
+def _dct_matrix(n):
+    """DCT-II 변환 행렬 (scipy.fftpack.dct 기본 정규화와 동일)"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    return (2 * np.cos(np.pi * k * (2 * x + 1) / (2 * n))).astype(np.float32)
+
+
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def resize_stack(frames, size):
+    """(N, H, W) 프레임 스택을 (N, size[1], size[0])로 리사이즈
+
+    프레임마다 2차원 cv2.resize를 호출한다. 프레임을 채널 축으로 묶으면 OpenCV 5가
+    4채널을 넘는 배열을 N차원 Mat로 취급해 resize가 실패한다 (썸네일 크기라 호출 비용은 작음).
+    """
+    frames = np.asarray(frames)
+    if frames.ndim == 4:
+        frames = np.stack([cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames])
+    if frames.shape[1:] == (size[1], size[0]):
+        return frames.astype(np.float32)
+    return np.stack([cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                     for frame in frames]).astype(np.float32)
+
+
+def _pack_bits(bits):
+    """(N, 64) bool -> (N,) uint64 (행 우선, 첫 비트가 MSB - imagehash 16진 문자열과 같은 순서)"""
+    return np.packbits(bits.reshape(len(bits), -1), axis=1).view('>u8').ravel().astype(np.uint64)
+
+
+def batch_phash(frames, hash_size=8, highfreq_factor=4):
+    """프레임 스택의 pHash를 한 번에 계산 -> uint64 배열
+
+    32x32로 줄인 뒤 D @ X @ D.T 행렬곱으로 전체 스택을 한 번에 DCT하고,
+    저주파 8x8 계수를 프레임별 중앙값과 비교한다.
+    """
+    if len(frames) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    img_size = hash_size * highfreq_factor
+    pixels = resize_stack(frames, (img_size, img_size))
+    dct = _dct_matrix(img_size)
+    coeffs = np.einsum('ij,njk,lk->nil', dct, pixels, dct, optimize=True)
+    low = coeffs[:, :hash_size, :hash_size].reshape(len(pixels), -1)
+    median = np.median(low, axis=1, keepdims=True)
+    return _pack_bits(low > median)
+
+
+def batch_dhash(frames, hash_size=8):
+    """프레임 스택의 dHash (가로 인접 픽셀 밝기 차이) -> uint64 배열"""
+    if len(frames) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    pixels = resize_stack(frames, (hash_size + 1, hash_size))
+    return _pack_bits(pixels[:, :, 1:] > pixels[:, :, :-1])
+
+
+def hamming_distance(a, b):
+    """uint64 해시 간 해밍 거리 (브로드캐스팅 지원)"""
+    xor = np.bitwise_xor(np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64))
+    counts = _POPCOUNT8[np.ascontiguousarray(xor).view(np.uint8)]
+    return counts.reshape(xor.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+
+class FrameHashAnalyzer(FrameAnalyzer):
+    """프레임 해시 시퀀스 (pHash + dHash) - 영상 간 구간 매칭용
+
+    프레임마다 32x32 그레이 썸네일만 보관하고 result()에서 일괄 해시한다.
+    순차 모드 기본값(100프레임)은 PRNU/화면 녹화 분석기와 같은 디코드 범위 안에 머문다 -
+    더 긴 구간을 덮으려면 층화 샘플링(--sample-frames)을 쓴다.
+    """
+
+    name = "frame_hashes"
+    label = "프레임 해시"
+    mergeable = True
+
+    def __init__(self, max_frames=100, step=1):
+        self.max_frames = max_frames
+        self.step = step
+        self.thumbnails = []
+        self.timestamps = []
+
+    def begin(self, info):
+        return min(self.max_frames, info['frame_count'])
+
+    def wants(self, index):
+        return index % self.step == 0
+
+    def process(self, index, frame, gray, timestamp=None):
+        self.thumbnails.append(cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA))
+        self.timestamps.append(timestamp)
+
+    def merge(self, other):
+        self.thumbnails.extend(other.thumbnails)
+        self.timestamps.extend(other.timestamps)
+
+    def result(self):
+        return {
+            'phash': batch_phash(self.thumbnails),
+            'dhash': batch_dhash(self.thumbnails),
+            'timestamps': np.asarray(self.timestamps, dtype=np.float32)
+        }
+
+
+class FrameHashIndex:
+    """프레임 해시 시퀀스 인덱스 - 타겟의 어느 구간이 어느 레퍼런스에서 왔는지 찾기
+
+    다중 인덱스 해싱(MIH): 64비트 해시를 16비트 조각 4개로 나눠 조각별 정렬 배열을 만든다.
+    해밍 거리 radius 이하인 해시는 비둘기집 원리로 최소 한 조각이 radius // 4 이내이므로,
+    조각 이웃만 searchsorted로 조회한 뒤 후보를 전체 해밍 거리로 검증한다.
+    모든 조회가 NumPy 벡터 연산이라 수천 개 레퍼런스에서도 1초 이내로 동작한다.
+    """
+
+    SUBSTRINGS = 4
+    SUB_BITS = 16
+
+    def __init__(self):
+        self.names = []
+        self._chunks = []
+        self._built = None
+
+    def add(self, name, hashes, timestamps):
+        """레퍼런스 하나의 프레임 해시 시퀀스 추가"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        timestamps = np.asarray(timestamps, dtype=np.float32)
+        if hashes.size == 0:
+            return
+        ref_id = len(self.names)
+        self.names.append(name)
+        self._chunks.append((hashes, timestamps, np.full(hashes.size, ref_id, dtype=np.int32)))
+        self._built = None
+
+    def __len__(self):
+        return sum(chunk[0].size for chunk in self._chunks)
+
+    def _build(self):
+        hashes = np.concatenate([c[0] for c in self._chunks])
+        timestamps = np.concatenate([c[1] for c in self._chunks])
+        ref_ids = np.concatenate([c[2] for c in self._chunks])
+        
+        tables = []
+        for part in range(self.SUBSTRINGS):
+            sub = self._substring(hashes, part)
+            order = np.argsort(sub, kind='stable')
+            tables.append((sub[order], order))
+        
+        self._built = (hashes, timestamps, ref_ids, tables)
+
+    def _substring(self, hashes, part):
+        shift = np.uint64(part * self.SUB_BITS)
+        return ((hashes >> shift) & np.uint64((1 << self.SUB_BITS) - 1)).astype(np.uint32)
+
+    def _probe_masks(self, radius):
+        # 조각 해밍 반경 이내의 모든 비트 마스크
+        masks = [0]
+        frontier = [0]
+        for _ in range(radius):
+            frontier = sorted({m | (1 << b) for m in frontier for b in range(self.SUB_BITS)
+                               if not m & (1 << b)})
+            masks.extend(frontier)
+        return np.asarray(masks, dtype=np.uint32)
+
+    def candidates(self, query_hashes, radius=8):
+        """해밍 거리 radius 이하 (쿼리 인덱스, 인덱스 항목, 거리) 배열 반환"""
+        if not self._chunks:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        if self._built is None:
+            self._build()
+        hashes, _, _, tables = self._built
+        query_hashes = np.asarray(query_hashes, dtype=np.uint64)
+        masks = self._probe_masks(radius // self.SUBSTRINGS)
+        
+        q_parts = []
+        e_parts = []
+        for part, (sorted_sub, order) in enumerate(tables):
+            probes = (self._substring(query_hashes, part)[:, None] ^ masks[None, :]).ravel()
+            lo = np.searchsorted(sorted_sub, probes, 'left')
+            hi = np.searchsorted(sorted_sub, probes, 'right')
+            # 구간 [lo, hi)를 펼쳐 후보 위치 생성
+            positions, probe_idx = _expand_ranges(lo, hi)
+            if not positions.size:
+                continue
+            q_parts.append(probe_idx // masks.size)
+            e_parts.append(order[positions])
+        
+        if not q_parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        
+        # 여러 조각에서 중복 발견된 쌍 제거 후 전체 해밍 거리 검증
+        pairs = np.unique(np.stack([np.concatenate(q_parts), np.concatenate(e_parts)], axis=1), axis=0)
+        q_idx, e_idx = pairs[:, 0], pairs[:, 1]
+        distances = hamming_distance(query_hashes[q_idx], hashes[e_idx])
+        keep = distances <= radius
+        return q_idx[keep], e_idx[keep], distances[keep]
+
+    def query(self, query_hashes, query_timestamps, radius=8, offset_tolerance=0.5,
+              max_gap=None, min_frames=3):
+        """타겟 해시 시퀀스로 재사용 구간 검색
+
+        반환: [{'target_start', 'target_end', 'reference', 'offset', 'frames', 'similarity'}, ...]
+        offset은 (레퍼런스 시각 - 타겟 시각, 초). 매칭 프레임 수 내림차순.
+        max_gap을 주지 않으면 타겟 해시 간격 중앙값의 3배 (한두 프레임 누락은 같은 구간).
+        """
+        q_idx, e_idx, distances = self.candidates(query_hashes, radius)
+        if q_idx.size == 0:
+            return []
+        
+        _, timestamps, ref_ids, _ = self._built
+        query_timestamps = np.asarray(query_timestamps, dtype=np.float32)
+        if max_gap is None:
+            spacing = np.diff(np.unique(query_timestamps))
+            max_gap = 3 * float(np.median(spacing)) if spacing.size else offset_tolerance
+        t_target = query_timestamps[q_idx]
+        offsets = timestamps[e_idx] - t_target
+        refs = ref_ids[e_idx]
+        
+        # (레퍼런스, 오프셋 구간)별 투표
+        bins = np.round(offsets / offset_tolerance).astype(np.int64)
+        groups = np.stack([refs.astype(np.int64), bins], axis=1)
+        keys, inverse = np.unique(groups, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        votes = np.bincount(inverse)
+        grouped = np.argsort(inverse, kind='stable')
+        group_starts = np.concatenate([[0], np.cumsum(votes)])
+        
+        matches = []
+        for group in np.argsort(-votes, kind='stable'):
+            if votes[group] < min_frames:
+                break
+            members = grouped[group_starts[group]:group_starts[group + 1]]
+            # 같은 타겟 프레임은 가장 가까운 후보 하나만 - (시각, 거리) 순 정렬 후 첫 항목
+            members = members[np.lexsort((distances[members], t_target[members]))]
+            times, first = np.unique(t_target[members], return_index=True)
+            member_dist = distances[members][first]
+            member_offsets = offsets[members][first]
+            
+            # 연속 구간으로 분할
+            splits = np.where(np.diff(times) > max_gap)[0] + 1
+            for run in np.split(np.arange(times.size), splits):
+                if run.size < min_frames:
+                    continue
+                matches.append({
+                    'target_start': float(times[run[0]]),
+                    'target_end': float(times[run[-1]]),
+                    'reference': self.names[keys[group][0]],
+                    'offset': float(np.median(member_offsets[run])),
+                    'frames': int(run.size),
+                    'similarity': float(1 - np.mean(member_dist[run]) / 64)
+                })
+        
+        matches.sort(key=lambda m: (-m['frames'], m['target_start']))
+        return matches
+
+    def save(self, path):
+        """인덱스를 npz로 저장"""
+        if not self._chunks:
+            return
+        np.savez(path,
+                 names=np.asarray(self.names),
+                 hashes=np.concatenate([c[0] for c in self._chunks]),
+                 timestamps=np.concatenate([c[1] for c in self._chunks]),
+                 ref_ids=np.concatenate([c[2] for c in self._chunks]))
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            index.names = [str(name) for name in data['names']]
+            ref_ids = data['ref_ids']
+            for ref_id in range(len(index.names)):
+                members = ref_ids == ref_id
+                index._chunks.append((data['hashes'][members], data['timestamps'][members],
+                                      ref_ids[members]))
+        return index
+
+
+class ScreenRecordingAnalyzer(FrameAnalyzer):
+    """화면 녹화 감지 (커서, UI 요소, 정적 프레임)"""
+
+    name = "screen_recording"
+    label = "화면 녹화"
+    mergeable = True
+
+    def __init__(self, max_frames=100, step=20):
+        self.max_frames = max_frames
+        self.step = step
+        self.fps = 0
+        self.thumbnails = []
+        self.frame_hashes = np.zeros(0, dtype=np.uint64)
+        self.cursor_detected = False
+        self.ui_elements = False
+
+    def begin(self, info):
+        self.fps = info['fps']
+        return min(self.max_frames, info['frame_count'])
+
+    def wants(self, index):
+        return index % self.step == 0
+
+    def process(self, index, frame, gray, timestamp=None):
+        # 마우스 커서 감지 (작은 움직이는 객체)
+        circles = cv2.HoughCircles(
+            gray, cv2.HOUGH_GRADIENT, 1, 20,
+            param1=50, param2=30, minRadius=5, maxRadius=15
+        )
+        if circles is not None:
+            self.cursor_detected = True
+
+        # UI 요소 감지 (직사각형 영역)
+        edges = cv2.Canny(gray, 50, 150)
+        contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        rect_count = 0
+        for contour in contours:
+            approx = cv2.approxPolyDP(contour, 0.01 * cv2.arcLength(contour, True), True)
+            if len(approx) == 4:  # 사각형
+                rect_count += 1
+
+        if rect_count > 10:
+            self.ui_elements = True
+
+        # 프레임 해시용 썸네일 (해시는 result()에서 일괄 계산)
+        self.thumbnails.append(cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA))
+
+    def merge(self, other):
+        self.thumbnails.extend(other.thumbnails)
+        self.cursor_detected = self.cursor_detected or other.cursor_detected
+        self.ui_elements = self.ui_elements or other.ui_elements
+
+    def result(self):
+        indicators = {
+            'is_screen_recording': False,
+            'confidence': 0,
+            'reasons': []
+        }
+
+        # 1. FPS 체크 (화면 녹화는 보통 30/60 FPS)
+        if self.fps in [30.0, 60.0, 25.0, 24.0]:
+            indicators['confidence'] += 0.2
+            indicators['reasons'].append(f"표준 화면 녹화 FPS: {self.fps}")
+
+        if self.cursor_detected:
+            indicators['confidence'] += 0.3
+            indicators['reasons'].append("마우스 커서 패턴 감지")
+
+        if self.ui_elements:
+            indicators['confidence'] += 0.2
+            indicators['reasons'].append("UI 요소 패턴 감지")
+
+        # 3. 반복 프레임 체크 (화면 녹화는 정적 화면이 많음)
+        self.frame_hashes = batch_phash(self.thumbnails)
+        if len(self.frame_hashes):
+            unique_ratio = len(np.unique(self.frame_hashes)) / len(self.frame_hashes)
+            if unique_ratio < 0.7:  # 30% 이상 중복
+                indicators['confidence'] += 0.3
+                indicators['reasons'].append(f"정적 프레임 비율: {(1-unique_ratio)*100:.1f}%")
+
+        # 최종 판정
+        if indicators['confidence'] >= 0.5:
+            indicators['is_screen_recording'] = True
+
+        return indicators
+
+
+def _expand_ranges(lo, hi):
+    """[lo, hi) 구간들을 펼친 위치 배열과 각 위치의 구간 번호"""
+    counts = hi - lo
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+    return starts + np.arange(total), np.repeat(np.arange(len(lo)), counts)
+
+
+class AudioLandmarkHasher:
+    """스펙트로그램 피크 쌍(컨스텔레이션) 오디오 해시
+
+    로그 스펙트로그램의 국소 최대점을 피크로 잡고, 각 앵커 피크에서 뒤따르는
+    fan_out개 피크와 (f1, f2, dt)를 묶어 24비트 해시를 만든다.
+    STFT는 PCM 청크 단위로 계산하고, 피크 탐지/쌍 생성에 필요한 여유 프레임만
+    버퍼에 남기므로 입력 길이와 무관하게 메모리 사용량이 고정된다.
+    """
+
+    def __init__(self, sr=8000, n_fft=1024, hop=256, peak_size=(15, 15), threshold_db=10,
+                 fan_out=5, min_dt=1, max_dt=63):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop = hop
+        self.n_bins = min(n_fft // 2, 512)  # 주파수 9비트
+        self.peak_size = peak_size
+        self.threshold_db = threshold_db
+        self.fan_out = fan_out
+        self.min_dt = min_dt
+        self.max_dt = min(max_dt, 63)  # 시간차 6비트
+
+    @property
+    def frame_seconds(self):
+        return self.hop / self.sr
+
+    def _pair(self, peak_t, peak_f, anchors):
+        """앵커 피크마다 시간순 다음 fan_out개 피크와 해시 생성 (벡터화)"""
+        anchor_t = peak_t[anchors]
+        anchor_f = peak_f[anchors]
+        lo = np.searchsorted(peak_t, anchor_t + self.min_dt, 'left')
+        hashes = []
+        times = []
+        for k in range(self.fan_out):
+            idx = lo + k
+            valid = idx < peak_t.size
+            idx = np.where(valid, idx, 0)
+            dt = peak_t[idx] - anchor_t
+            valid &= dt <= self.max_dt
+            h = ((anchor_f[valid].astype(np.uint32) << 15)
+                 | (peak_f[idx[valid]].astype(np.uint32) << 6)
+                 | dt[valid].astype(np.uint32))
+            hashes.append(h)
+            times.append(anchor_t[valid])
+        return np.concatenate(hashes), np.concatenate(times).astype(np.int32)
+
+    def hash_stream(self, chunks):
+        """PCM 청크 이터레이터 -> (hashes, anchor_frames) 청크 단위 yield"""
+        window = np.hanning(self.n_fft).astype(np.float32)
+        margin = self.peak_size[0] // 2
+        leftover = np.zeros(0, dtype=np.float32)
+        spec = np.zeros((0, self.n_bins), dtype=np.float32)
+        spec_start = 0   # spec[0]의 전역 프레임 번호
+        scan_from = 0    # 아직 피크 탐지하지 않은 spec 내 위치
+        peak_t = np.zeros(0, dtype=np.int64)
+        peak_f = np.zeros(0, dtype=np.int64)
+        
+        for chunk in _with_sentinel(chunks):
+            final = chunk is None
+            if not final:
+                samples = np.concatenate([leftover, chunk])
+                n_frames = (samples.size - self.n_fft) // self.hop + 1 if samples.size >= self.n_fft else 0
+                if n_frames > 0:
+                    frames = np.lib.stride_tricks.sliding_window_view(samples, self.n_fft)[::self.hop][:n_frames]
+                    magnitude = np.abs(np.fft.rfft(frames * window, axis=1))[:, :self.n_bins]
+                    spec = np.concatenate([spec, 20 * np.log10(magnitude + 1e-10).astype(np.float32)])
+                    leftover = samples[n_frames * self.hop:]
+                else:
+                    leftover = samples
+            
+            if spec.shape[0] == 0:
+                continue
+            
+            # 피크 탐지 (경계 margin 프레임은 다음 청크와 함께 확정)
+            limit = spec.shape[0] if final else spec.shape[0] - margin
+            if limit > scan_from:
+                region = spec[max(scan_from - margin, 0):min(limit + margin, spec.shape[0])]
+                local_max = ndimage.maximum_filter(region, size=self.peak_size) == region
+                loud = region > region.mean() + self.threshold_db
+                t, f = np.nonzero(local_max & loud)
+                t = t + max(scan_from - margin, 0)
+                keep = (t >= scan_from) & (t < limit)
+                peak_t = np.concatenate([peak_t, t[keep] + spec_start])
+                peak_f = np.concatenate([peak_f, f[keep]])
+                scan_from = limit
+            
+            # 모든 짝 후보가 확정된 앵커만 해시 생성
+            scanned_upto = spec_start + scan_from
+            ready = np.ones(peak_t.size, bool) if final else peak_t + self.max_dt < scanned_upto
+            if ready.any():
+                hashes, times = self._pair(peak_t, peak_f, np.nonzero(ready)[0])
+                if hashes.size:
+                    yield hashes, times
+                peak_t = peak_t[~ready]
+                peak_f = peak_f[~ready]
+            
+            # 피크 탐지 문맥(margin)만 남기고 스펙트로그램 버퍼 정리
+            drop = max(scan_from - margin, 0)
+            if drop:
+                spec = spec[drop:]
+                spec_start += drop
+                scan_from -= drop
+
+
+def _with_sentinel(iterable):
+    """이터레이터 끝에 None을 붙여 마지막 처리(flush) 신호로 사용"""
+    yield from iterable
+    yield None
+
+
+class AudioFingerprintIndex:
+    """오디오 랜드마크 역색인 - 해시 -> (레퍼런스, 앵커 시각)
+
+    해시 기준 정렬 배열을 searchsorted로 조회하고, (레퍼런스, 시각 차이)별로
+    투표해 부분 클립도 레퍼런스 내 위치(오프셋)와 함께 찾는다.
+    """
+
+    def __init__(self, frame_seconds=256 / 8000):
+        self.frame_seconds = frame_seconds
+        self.names = []
+        self._chunks = []
+        self._built = None
+
+    def add(self, name, hashes, times):
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        if hashes.size == 0:
+            return
+        ref_id = len(self.names)
+        self.names.append(name)
+        self._chunks.append((hashes, np.asarray(times, dtype=np.int32),
+                             np.full(hashes.size, ref_id, dtype=np.int32)))
+        self._built = None
+
+    def _build(self):
+        hashes = np.concatenate([c[0] for c in self._chunks])
+        order = np.argsort(hashes, kind='stable')
+        self._built = (hashes[order],
+                       np.concatenate([c[1] for c in self._chunks])[order],
+                       np.concatenate([c[2] for c in self._chunks])[order])
+
+    def query(self, hashes, times, min_votes=5, top_k=10):
+        """타겟 랜드마크로 검색 -> [{'reference', 'offset', 'votes', 'score'}, ...]
+
+        offset은 (레퍼런스 시각 - 타겟 시각, 초), score는 투표 수 / 타겟 해시 수.
+        """
+        if not self._chunks:
+            return []
+        if self._built is None:
+            self._build()
+        index_hashes, index_times, index_refs = self._built
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        times = np.asarray(times, dtype=np.int64)
+        if hashes.size == 0:
+            return []
+        
+        lo = np.searchsorted(index_hashes, hashes, 'left')
+        hi = np.searchsorted(index_hashes, hashes, 'right')
+        positions, query_idx = _expand_ranges(lo, hi)
+        if positions.size == 0:
+            return []
+        
+        offsets = index_times[positions].astype(np.int64) - times[query_idx]
+        refs = index_refs[positions].astype(np.int64)
+        keys, votes = np.unique(np.stack([refs, offsets], axis=1), axis=0, return_counts=True)
+        
+        # 레퍼런스별 최다 득표 오프셋
+        best = {}
+        for (ref_id, offset), count in zip(keys.tolist(), votes.tolist()):
+            if count >= min_votes and count > best.get(ref_id, (0, 0))[0]:
+                best[ref_id] = (count, offset)
+        
+        matches = [{
+            'reference': self.names[ref_id],
+            'offset': offset * self.frame_seconds,
+            'votes': count,
+            'score': count / hashes.size
+        } for ref_id, (count, offset) in best.items()]
+        matches.sort(key=lambda m: (-m['votes'], m['reference']))
+        return matches[:top_k]
+
+
+def content_descriptor(features):
+    """콘텐츠 기술자 벡터 (float32, 길이 88) - 라이브러리 근사 검색용
+
+    pHash 비트 빈도 프로파일(64) + 크로마 평균(12) + MFCC 평균(1~12번, 12).
+    블록마다 중심화 후 L2 정규화해 랜덤 초평면 LSH에 적합하게 만든다.
+    """
+    blocks = []
+    
+    hashes = np.asarray(features.get('frame_phash', features.get('phash', [])), dtype=np.uint64)
+    if hashes.size:
+        bits = np.unpackbits(hashes.astype('>u8').view(np.uint8).reshape(-1, 8), axis=1)
+        blocks.append(bits.mean(axis=0) * 2 - 1)
+    else:
+        blocks.append(np.zeros(64))
+    
+    chroma = np.asarray(features.get('audio_chroma', np.zeros(12)), dtype=np.float64)
+    blocks.append(chroma - chroma.mean() if chroma.size == 12 else np.zeros(12))
+    
+    mfcc = np.asarray(features.get('audio_mfcc', np.zeros(13)), dtype=np.float64)
+    blocks.append(mfcc[1:13] if mfcc.size >= 13 else np.zeros(12))
+    
+    normalized = []
+    for block in blocks:
+        norm = np.linalg.norm(block)
+        normalized.append(block / norm if norm > 0 else block)
+    vector = np.concatenate(normalized)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm > 0 else vector).astype(np.float32)
+
+
+def _reflink(src, dst):
+    """Copy-on-write 복제 (Linux FICLONE - Btrfs/XFS 등). 실패 시 OSError"""
+    import fcntl
+    FICLONE = 0x40049409
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+        except OSError:
+            fout.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def copy_with_progress(src, dst, chunk_size=8 * 1024 * 1024):
+    """청크 단위 복사 + 진행률 표시, 복사하면서 SHA-256 계산 -> hexdigest"""
+    total = os.path.getsize(src)
+    digest = hashlib.sha256()
+    copied = 0
+    next_report = 0.1
+    tmp_path = dst + f'.{os.getpid()}.tmp'
+    try:
+        with open(src, 'rb') as fin, open(tmp_path, 'wb') as fout:
+            while True:
+                chunk = fin.read(chunk_size)
+                if not chunk:
+                    break
+                fout.write(chunk)
+                digest.update(chunk)
+                copied += len(chunk)
+                if total and copied / total >= next_report:
+                    print(f"   📦 복사 {copied / total * 100:.0f}% ({copied / 1024 ** 2:.0f}/{total / 1024 ** 2:.0f}MB)")
+                    next_report = int(copied / total * 10) / 10 + 0.1
+        shutil.copystat(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return digest.hexdigest()
+
+
+def file_sha256(path, chunk_size=8 * 1024 * 1024):
+    """파일 전체 SHA-256 (증거 보존 기록용)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CaseCheckpoint:
+    """사건 분석 체크포인트 - 완료된 단계를 사건 디렉터리에 즉시 기록하고 재실행 시 건너뜀
+
+    <case_dir>/checkpoint/ 아래에 입력별 준비(다운로드) 결과, 영상별 종합 분석 결과,
+    매칭 단계별 결과를 JSON 파일 하나씩 원자적으로(임시 파일 + os.replace) 저장한다.
+    각 기록은 입력값/경로/분석 설정 버전을 함께 저장해, 달라졌으면 무시하고 다시 계산한다.
+    """
+
+    def __init__(self, case_dir, version=ANALYZER_VERSION):
+        self.case_dir = case_dir
+        self.dir = os.path.join(case_dir, "checkpoint")
+        self.version = version
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.dir, f"{name}.json")
+
+    def _read(self, name):
+        try:
+            with open(self._path(name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name, data):
+        path = self._path(name)
+        tmp_path = path + f'.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=_to_json_value)
+        os.replace(tmp_path, path)
+
+    def prepared(self, key, input_data):
+        """이전에 준비(다운로드/복사)한 파일 -> {'path', 'partial'}, 없거나 입력이 다르면 None"""
+        record = self._read(f"input_{key}")
+        if (not record or record['input'] != list(input_data)
+                or not os.path.exists(record['path'])):
+            return None
+        return record
+
+    def save_prepared(self, key, input_data, path, partial=None):
+        self._write(f"input_{key}", {'input': list(input_data), 'path': path, 'partial': partial})
+
+    def analysis(self, key, path):
+        """이전에 완료한 종합 분석 결과, 없거나 경로/설정이 다르면 None"""
+        record = self._read(f"analysis_{key}")
+        if not record or record['path'] != path or record['version'] != self.version:
+            return None
+        return record['analysis']
+
+    def features(self, key):
+        """save_analysis와 함께 저장한 원시 특징 벡터 (없으면 빈 dict)"""
+        try:
+            with np.load(os.path.join(self.dir, f"analysis_{key}.npz"), allow_pickle=False) as data:
+                return {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            return {}
+
+    def save_analysis(self, key, path, analysis, features=None):
+        if features:
+            npz_path = os.path.join(self.dir, f"analysis_{key}.npz")
+            tmp_npz = npz_path + f'.{os.getpid()}.tmp.npz'
+            np.savez(tmp_npz, **{name: np.asarray(value) for name, value in features.items()})
+            os.replace(tmp_npz, npz_path)
+        self._write(f"analysis_{key}", {'path': path, 'version': self.version, 'analysis': analysis})
+
+    @staticmethod
+    def _fingerprint(all_analyses):
+        return sorted([name, data.get('path')] for name, data in all_analyses.items())
+
+    def stage(self, name, all_analyses):
+        """매칭 단계 결과 (같은 분석 대상 집합에서 계산한 경우만) -> (있음 여부, 값)"""
+        record = self._read(f"stage_{name}")
+        if (not record or record['version'] != self.version
+                or record['inputs'] != self._fingerprint(all_analyses)):
+            return False, None
+        return True, record['value']
+
+    def save_stage(self, name, all_analyses, value):
+        self._write(f"stage_{name}", {
+            'version': self.version, 'inputs': self._fingerprint(all_analyses), 'value': value
+        })
+
+    @staticmethod
+    def case_inputs(case, analysis_window=None):
+        """사건 완료 기록의 비교 기준 - 타겟/레퍼런스 입력과 실제 적용할 분석 구간"""
+        return {
+            'target': list(case['target']),
+            'references': [list(ref) for ref in case['references']],
+            'analysis_window': case.get('analysis_window', analysis_window)
+        }
+
+    def case_summary(self, inputs):
+        """이전에 완료한 사건 요약, 없거나 사건 입력/분석 설정이 다르면 None"""
+        record = self._read("case_summary")
+        if not record or record['version'] != self.version or record['inputs'] != inputs:
+            return None
+        return record['value']
+
+    def save_case_summary(self, inputs, value):
+        self._write("case_summary", {'version': self.version, 'inputs': inputs, 'value': value})
+
+    def clear(self):
+        for name in os.listdir(self.dir):
+            try:
+                os.remove(os.path.join(self.dir, name))
+            except OSError:
+                pass
+
+
+class ReferenceLibrary:
+    """사건 간 공유되는 레퍼런스 지문 라이브러리
+
+    영상을 한 번만 분석해 저장하고, 이후에는 디코딩 없이 검색한다.
+    - library.db (SQLite): 영상 메타데이터, 분석 결과 JSON, 특징 행 번호/해시 구간
+    - vectors.f32: 콘텐츠 기술자 (행 x DIM) - np.memmap으로 읽음
+    - signatures.u16: LSH 서명 (행 x TABLES) - 랜덤 초평면 16비트 x 8 테이블
+    - frame_hashes.u64 / frame_times.f32: 프레임 해시 시퀀스 (구간 매칭용)
+    파일은 추가 전용이며 한 번에 한 프로세스만 수집(ingest)한다고 가정한다.
+    행 번호/오프셋은 SQLite에 커밋된 행에서 계산하고, 열 때와 수집 전에 특징 파일을
+    커밋된 길이로 잘라 중단된 수집이 남긴 꼬리가 이후 행을 어긋나게 하지 않도록 한다.
+    """
+
+    DIM = 88
+    TABLES = 8
+    BITS = 16
+
+    def __init__(self, library_dir):
+        self.library_dir = library_dir
+        os.makedirs(library_dir, exist_ok=True)
+        self.db_path = os.path.join(library_dir, "library.db")
+        self.vectors_path = os.path.join(library_dir, "vectors.f32")
+        self.signatures_path = os.path.join(library_dir, "signatures.u16")
+        self.hashes_path = os.path.join(library_dir, "frame_hashes.u64")
+        self.times_path = os.path.join(library_dir, "frame_times.f32")
+        
+        # 고정 시드 초평면 (라이브러리 수명 동안 불변이어야 서명이 유효)
+        rng = np.random.default_rng(20250301)
+        self.planes = rng.standard_normal((self.TABLES * self.BITS, self.DIM)).astype(np.float32)
+        
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS videos (
+                    id INTEGER PRIMARY KEY,
+                    content_hash TEXT UNIQUE NOT NULL,
+                    path TEXT,
+                    title TEXT,
+                    source TEXT,
+                    analyzer_version TEXT,
+                    ingested_at TEXT,
+                    analysis_json TEXT,
+                    vector_row INTEGER,
+                    hash_offset INTEGER,
+                    hash_count INTEGER
+                )
+            """)
+            conn.commit()
+        
+        self._truncate_uncommitted()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _truncate_uncommitted(self):
+        """특징 파일을 SQLite에 커밋된 길이로 자름 -> (다음 벡터 행, 다음 해시 오프셋)"""
+        with closing(self._connect()) as conn:
+            vector_rows, hash_count = conn.execute(
+                "SELECT COALESCE(MAX(vector_row) + 1, 0), COALESCE(MAX(hash_offset + hash_count), 0) "
+                "FROM videos"
+            ).fetchone()
+        lengths = [
+            (self.vectors_path, vector_rows * self.DIM * np.dtype(np.float32).itemsize),
+            (self.signatures_path, vector_rows * self.TABLES * np.dtype(np.uint16).itemsize),
+            (self.hashes_path, hash_count * np.dtype(np.uint64).itemsize),
+            (self.times_path, hash_count * np.dtype(np.float32).itemsize),
+        ]
+        for path, length in lengths:
+            if os.path.exists(path) and os.path.getsize(path) > length:
+                try:
+                    with open(path, 'r+b') as f:
+                        f.truncate(length)
+                except OSError as e:
+                    print(f"   ⚠️ 라이브러리 파일 정리 실패: {os.path.basename(path)} - {str(e)}")
+        return vector_rows, hash_count
+
+    def __len__(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def _memmap(self, path, dtype, cols=None):
+        """추가 전용 파일을 읽기 전용 memmap으로 (비어 있으면 빈 배열)"""
+        itemsize = np.dtype(dtype).itemsize * (cols or 1)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        rows = size // itemsize
+        if rows == 0:
+            return np.zeros((0, cols) if cols else 0, dtype=dtype)
+        shape = (rows, cols) if cols else (rows,)
+        return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+    def signature(self, vectors):
+        """랜덤 초평면 LSH 서명 (테이블별 16비트)"""
+        vectors = np.atleast_2d(vectors)
+        bits = (vectors @ self.planes.T > 0).reshape(len(vectors), self.TABLES, self.BITS)
+        weights = (1 << np.arange(self.BITS)).astype(np.uint32)
+        return (bits * weights).sum(axis=2).astype(np.uint16)
+
+    def contains(self, content_hash):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT id FROM videos WHERE content_hash = ?", (content_hash,)).fetchone()
+        return row is not None
+
+    def ingest(self, forensics, video_path, title=None, source=None):
+        """영상 하나를 분석해 라이브러리에 추가 (이미 있으면 건너뜀) -> 라이브러리 id"""
+        content_hash = quick_content_hash(video_path)
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT id FROM videos WHERE content_hash = ?", (content_hash,)).fetchone()
+        if row:
+            print(f"   📚 라이브러리에 이미 있음: {os.path.basename(video_path)}")
+            return row[0]
+        
+        analysis, features = forensics.analyze_with_features(video_path)
+        vector = content_descriptor(features)
+        hashes = np.asarray(features.get('frame_phash', []), dtype=np.uint64)
+        times = np.asarray(features.get('frame_phash_times', []), dtype=np.float32)
+        
+        # 커밋된 행 기준 위치 (이전에 중단된 수집의 꼬리는 잘라내고 그 자리에 씀)
+        vector_row, hash_offset = self._truncate_uncommitted()
+        
+        # 특징 파일에 먼저 추가하고 메타데이터는 마지막에 커밋 - 커밋 전에 중단되면
+        # 추가한 바이트는 다음 열기/수집 때 잘려 나감
+        with open(self.vectors_path, 'ab') as f:
+            f.write(vector.tobytes())
+        with open(self.signatures_path, 'ab') as f:
+            f.write(self.signature(vector).tobytes())
+        with open(self.hashes_path, 'ab') as f:
+            f.write(hashes.tobytes())
+        with open(self.times_path, 'ab') as f:
+            f.write(times.tobytes())
+        
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                """INSERT INTO videos (content_hash, path, title, source, analyzer_version, ingested_at,
+                                       analysis_json, vector_row, hash_offset, hash_count)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (content_hash, os.path.abspath(video_path), title or os.path.basename(video_path),
+                 source, ANALYZER_VERSION, datetime.now().isoformat(),
+                 json.dumps(analysis, ensure_ascii=False, default=_to_json_value),
+                 vector_row, hash_offset, int(hashes.size))
+            )
+            conn.commit()
+            library_id = cursor.lastrowid
+        
+        print(f"   📚 라이브러리 추가: {os.path.basename(video_path)} (id {library_id})")
+        return library_id
+
+    def query(self, features, top_k=10, min_candidates=200, exclude_hash=None):
+        """타겟 특징으로 라이브러리 검색 (LSH 후보 -> 코사인 재정렬)
+
+        반환: [{'id', 'content_hash', 'path', 'title', 'similarity', 'analysis', 'features'}, ...]
+        features에는 저장된 프레임 해시 시퀀스가 들어 있어 재디코딩 없이 구간 매칭에 쓸 수 있다.
+        """
+        vectors = self._memmap(self.vectors_path, np.float32, self.DIM)
+        signatures = self._memmap(self.signatures_path, np.uint16, self.TABLES)
+        rows = min(len(vectors), len(signatures))
+        if rows == 0:
+            return []
+        
+        query = content_descriptor(features)
+        query_sig = self.signature(query)[0]
+        
+        # 같은 버킷 (어느 한 테이블이라도 서명 일치)
+        candidates = np.nonzero((signatures[:rows] == query_sig).any(axis=1))[0]
+        if candidates.size < min_candidates:
+            # 후보가 부족하면 서명 해밍 거리 합이 작은 순으로 보충 (멀티 프로브)
+            xor = np.bitwise_xor(signatures[:rows], query_sig)
+            distance = _POPCOUNT8[xor.view(np.uint8)].reshape(rows, -1).sum(axis=1)
+            nearest = np.argsort(distance, kind='stable')[:min_candidates]
+            candidates = np.union1d(candidates, nearest)
+        
+        scores = np.asarray(vectors[candidates]) @ query
+        order = np.argsort(-scores, kind='stable')
+        
+        rows_by_score = {int(candidates[i]): float(scores[i]) for i in order[:top_k * 2]}
+        placeholders = ','.join('?' * len(rows_by_score))
+        with closing(self._connect()) as conn:
+            records = conn.execute(
+                f"""SELECT id, content_hash, path, title, analysis_json, vector_row, hash_offset, hash_count
+                    FROM videos WHERE vector_row IN ({placeholders})""",
+                list(rows_by_score)
+            ).fetchall()
+        
+        hashes = self._memmap(self.hashes_path, np.uint64)
+        times = self._memmap(self.times_path, np.float32)
+        results = []
+        for library_id, content_hash, path, title, analysis_json, vector_row, offset, count in records:
+            if content_hash == exclude_hash:
+                continue
+            results.append({
+                'id': library_id,
+                'content_hash': content_hash,
+                'path': path,
+                'title': title,
+                'similarity': rows_by_score[vector_row],
+                'analysis': json.loads(analysis_json),
+                'features': {
+                    'frame_phash': np.array(hashes[offset:offset + count]),
+                    'frame_phash_times': np.array(times[offset:offset + count])
+                }
+            })
+        
+        results.sort(key=lambda r: (-r['similarity'], r['id']))
+        return results[:top_k]
+
+
 class AdvancedVideoForensics:
     """완전한 영상 포렌식 분석 도구"""
     
-    def __init__(self, base_dir=None):
+    def __init__(self, base_dir=None, use_cache=True, cache_max_bytes=2 * 1024 ** 3,
+                 sample_count=None, library_dir=None, profile=True, frame_height=None,
+                 frame_cache_max_bytes=None, decode_backend="auto", decode_threads=None,
+                 segment_workers=1, local_ingest="link"):
         if base_dir is None:
             base_dir = r"D:\Work\00.개발\클로드아티팩트\영상유사도분석"
         
@@ -41,12 +2072,90 @@ class AdvancedVideoForensics:
         self.frame_dir = os.path.join(self.output_dir, "frames")
         self.evidence_dir = os.path.join(self.output_dir, "evidence")
         self.report_dir = os.path.join(self.output_dir, "reports")
+        self.cache_dir = os.path.join(self.output_dir, "cache")
+        self.frame_cache_dir = os.path.join(self.output_dir, "frame_cache")
         
         for dir_path in [self.video_dir, self.frame_dir, self.evidence_dir, self.report_dir]:
             os.makedirs(dir_path, exist_ok=True)
+        
+        # 구간 다운로드 파일 -> 전체 다운로드에 필요한 정보
+        self.partial_downloads = {}
+        
+        # 경로별 ffprobe 결과 (키프레임 목록, 길이) - 같은 영상을 분석기마다 다시 훑지 않음
+        self._probe_memo = {}
+        
+        # 전체 영상 층화 샘플링 프레임 수 (None이면 앞부분 연속 프레임 분석)
+        self.sample_count = sample_count
+        
+        # 특징 캐시 (같은 레퍼런스 재분석 방지, 샘플링 설정별로 분리)
+        self.use_cache = use_cache
+        self.cache_max_bytes = cache_max_bytes
+        # 분석 해상도 (None이면 원본 해상도, 예: 720이면 세로 720 이하로 축소 후 분석)
+        self.frame_height = frame_height
+        
+        # 프레임 디코드 백엔드 ("pyav": 프레임 + 코덱 움직임 벡터 한 번에, "opencv",
+        # "ffmpeg": rawvideo 파이프, "auto": PyAV가 있으면 pyav 아니면 opencv)
+        if decode_backend == "auto":
+            decode_backend = "pyav" if av is not None else "opencv"
+        elif decode_backend == "pyav" and av is None:
+            print("⚠️ PyAV가 없어 OpenCV 디코드를 사용합니다")
+            decode_backend = "opencv"
+        self.decode_backend = decode_backend
+        self.decode_threads = decode_threads
+        
+        cache_version = ANALYZER_VERSION + (f"-s{sample_count}" if sample_count else "")
+        if frame_height:
+            cache_version += f"-h{frame_height}"
+        # 백엔드마다 움직임 방식/타임스탬프/축소 방식이 달라 결과가 다르므로 캐시를 분리
+        cache_version += f"-{decode_backend}"
+        self.analysis_version = cache_version
+        self.feature_cache = (FeatureCache(self.cache_dir, cache_max_bytes, cache_version)
+                              if use_cache else None)
+        
+        # 레퍼런스 라이브러리 (사건 간 공유 지문 DB, 매칭 시 자동 검색)
+        self.library = ReferenceLibrary(library_dir) if library_dir else None
+        
+        # 로컬 파일 준비 방식 ("link": 리플링크/하드링크, "inplace": 원본 위치, "copy": 복사)
+        self.local_ingest = local_ingest
+        
+        # 긴 영상 하나를 시간 구간으로 나눠 병렬 디코드할 프로세스 수 (층화 샘플링 모드 전용)
+        self.segment_workers = segment_workers
+        
+        # 디코딩 프레임 캐시 (같은 영상 재분석/병렬 워커가 디코딩 결과 공유, None이면 끔)
+        self.frame_cache_max_bytes = frame_cache_max_bytes
+        self.frame_cache = (DecodedFrameCache(self.frame_cache_dir, frame_cache_max_bytes, frame_height,
+                                              codec_motion=decode_backend == "pyav")
+                            if frame_cache_max_bytes else None)
+        
+        # 단계별 계측 (Chrome trace + 보고서 요약 표)
+        self.profile = profile
+        self.profiler = StageProfiler(profile)
+    
+    def worker_options(self, pool_workers=1):
+        """워커 프로세스에서 같은 설정으로 분석기를 만들기 위한 생성자 인자
+
+        pool_workers개 영상을 동시에 분석하는 풀의 워커라면 구간 병렬 디코드 프로세스 수를
+        나눠 가져, 전체 프로세스 수가 segment_workers(또는 pool_workers)를 넘지 않게 한다.
+        """
+        return {
+            'base_dir': self.base_dir,
+            'use_cache': self.use_cache,
+            'cache_max_bytes': self.cache_max_bytes,
+            'sample_count': self.sample_count,
+            'profile': self.profile,
+            'frame_height': self.frame_height,
+            'frame_cache_max_bytes': self.frame_cache_max_bytes,
+            'decode_backend': self.decode_backend,
+            'decode_threads': self.decode_threads,
+            'segment_workers': max(1, self.segment_workers // max(1, pool_workers))
+        }
     
     def select_video_file(self, title="영상 파일 선택"):
-        """파일 선택 대화상자"""
+        """파일 선택 대화상자 (tkinter가 없으면 경로 직접 입력)"""
+        if Tk is None:
+            path = input(f"{title} - 파일 경로: ").strip().strip('"')
+            return path or None
+        
         root = Tk()
         root.withdraw()
         root.attributes('-topmost', True)
@@ -89,22 +2198,21 @@ class AdvancedVideoForensics:
         
         return ('skip', None)
     
-    def process_video_input(self, input_data, name_prefix="video"):
-        """URL 다운로드 또는 로컬 파일 복사"""
+    def process_video_input(self, input_data, name_prefix="video", analysis_window=None):
+        """URL 다운로드 또는 로컬 파일 준비 (local_ingest 방식: link / inplace / copy)
+
+        analysis_window(초)가 주어지면 URL은 분석에 필요한 앞부분 구간만 다운로드
+        """
         input_type, input_value = input_data
         
         if input_type == 'url':
-            return self.download_video(input_value, name_prefix)
+            with self.profiler.stage('download', name_prefix):
+                return self.download_video(input_value, name_prefix, analysis_window=analysis_window)
         
         elif input_type == 'file':
             if os.path.exists(input_value):
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                ext = os.path.splitext(input_value)[1]
-                new_filename = f"{name_prefix}_{timestamp}{ext}"
-                new_path = os.path.join(self.video_dir, new_filename)
-                
-                print(f"📂 파일 복사 중: {os.path.basename(input_value)}")
-                shutil.copy2(input_value, new_path)
+                with self.profiler.stage('file_ingest', input_value, mode=self.local_ingest):
+                    new_path, method, sha256 = self.ingest_local_file(input_value, name_prefix)
                 
                 metadata = {
                     'url': f"file:///{input_value}",
@@ -113,10 +2221,12 @@ class AdvancedVideoForensics:
                     'upload_date': datetime.fromtimestamp(os.path.getctime(input_value)).strftime('%Y%m%d'),
                     'duration': 0,
                     'fps': 0,
-                    'filename': new_path
+                    'filename': new_path,
+                    'ingest_method': method,
+                    'sha256': sha256
                 }
                 
-                print(f"✅ 파일 준비 완료")
+                print(f"✅ 파일 준비 완료 ({method})")
                 return new_path, metadata
             else:
                 print(f"❌ 파일을 찾을 수 없습니다: {input_value}")
@@ -124,9 +2234,71 @@ class AdvancedVideoForensics:
         
         return None, None
     
-    def download_video(self, url, name_prefix="video"):
-        """고화질 영상 다운로드 (원본 해상도 유지)"""
-        print(f"\n📥 고화질 다운로드 중: {url}")
+    def ingest_local_file(self, source_path, name_prefix="video"):
+        """로컬 파일을 복사 없이 분석 대상으로 준비 -> (분석 경로, 방식, SHA-256)
+
+        local_ingest="link": 리플링크(CoW) -> 하드링크 순으로 시도하고, 파일 시스템이 달라
+                              링크할 수 없을 때만 청크 복사
+        local_ingest="inplace": 원본 경로 그대로 분석
+        local_ingest="copy": 항상 청크 복사 (기존 방식)
+        어느 방식이든 원본 경로와 SHA-256을 evidence/ingest_log.jsonl에 기록한다 (증거 연속성).
+        """
+        source_path = os.path.abspath(source_path)
+        sha256 = None
+        
+        if self.local_ingest == "inplace":
+            new_path, method = source_path, "inplace"
+            print(f"📂 원본 위치에서 분석: {os.path.basename(source_path)}")
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            ext = os.path.splitext(source_path)[1]
+            new_path = os.path.join(self.video_dir, f"{name_prefix}_{timestamp}{ext}")
+            method = None
+            
+            if self.local_ingest == "link":
+                try:
+                    _reflink(source_path, new_path)
+                    method = "reflink"
+                except (OSError, ImportError):
+                    try:
+                        os.link(source_path, new_path)
+                        method = "hardlink"
+                    except OSError as e:
+                        if e.errno != errno.EXDEV:
+                            print(f"   ⚠️ 링크 실패 ({str(e)}) - 복사로 대체")
+            
+            if method is None:
+                print(f"📂 파일 복사 중: {os.path.basename(source_path)}")
+                sha256 = copy_with_progress(source_path, new_path)
+                method = "copy"
+            else:
+                print(f"🔗 파일 연결 ({method}): {os.path.basename(source_path)}")
+        
+        if sha256 is None:
+            sha256 = file_sha256(new_path)
+        
+        record = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'source': source_path,
+            'path': new_path,
+            'method': method,
+            'size': os.path.getsize(new_path),
+            'sha256': sha256
+        }
+        with open(os.path.join(self.evidence_dir, "ingest_log.jsonl"), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return new_path, method, sha256
+    
+    def download_video(self, url, name_prefix="video", analysis_window=None):
+        """고화질 영상 다운로드 (원본 해상도 유지)
+
+        analysis_window(초)가 주어지면 0~analysis_window 구간만 받는 분석 전용 모드.
+        분석기가 구간보다 긴 범위를 요구하면 ensure_full_video()로 전체 다운로드로 전환한다.
+        """
+        if analysis_window:
+            print(f"\n📥 분석 구간 다운로드 중 (앞 {analysis_window}초): {url}")
+        else:
+            print(f"\n📥 고화질 다운로드 중: {url}")
         
         # URL 자동 변환
         if not any(domain in url for domain in ['youtube.com', 'youtu.be', 'tiktok.com', 'instagram.com']):
@@ -193,6 +2365,14 @@ class AdvancedVideoForensics:
             'ignoreerrors': False
         }
         
+        if analysis_window:
+            # 필요한 시간 구간만 다운로드 (전체 파일과 구분되는 파일명 사용)
+            ydl_opts['outtmpl'] = os.path.join(self.video_dir, f'{name_prefix}_%(title)s.window.%(ext)s')
+            ydl_opts['download_ranges'] = yt_dlp.utils.download_range_func(None, [(0, analysis_window)])
+            # 구간 시작(0초)은 이미 키프레임이므로 재인코딩 없이 스트림 복사로 자름
+            # (force_keyframes_at_cuts를 켜면 yt-dlp가 재인코딩해 압축/GOP/PRNU 흔적이 바뀜)
+            ydl_opts['force_keyframes_at_cuts'] = False
+        
         try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 # 먼저 정보만 추출해서 사용 가능한 포맷 확인
@@ -219,8 +2399,8 @@ class AdvancedVideoForensics:
                         best_audio = max(audio_formats, key=lambda x: (x.get('abr', 0), x.get('asr', 0)))
                         print(f"   🎵 최고 오디오: {best_audio.get('abr')}kbps @ {best_audio.get('asr')}Hz")
                 
-                # 실제 다운로드
-                info = ydl.extract_info(url, download=True)
+                # 실제 다운로드 (첫 extract_info 결과 재사용 - 메타데이터 재추출 없음)
+                info = ydl.process_ie_result(info, download=True)
                 
                 metadata = {
                     'url': url,
@@ -235,7 +2415,9 @@ class AdvancedVideoForensics:
                     'abr': info.get('abr', 0),
                     'filesize': info.get('filesize', 0),
                     'format_id': info.get('format_id', 'Unknown'),
-                    'filename': ydl.prepare_filename(info)
+                    'filename': ydl.prepare_filename(info),
+                    'partial': bool(analysis_window),
+                    'analysis_window': analysis_window or 0
                 }
                 
                 downloaded_file = metadata['filename']
@@ -286,6 +2468,14 @@ class AdvancedVideoForensics:
                 else:
                     print(f"⚠️ 파일을 찾을 수 없음: {downloaded_file}")
                 
+                if analysis_window:
+                    self.partial_downloads[downloaded_file] = {
+                        'url': url,
+                        'name_prefix': name_prefix,
+                        'window': analysis_window,
+                        'full_path': None
+                    }
+                
                 return downloaded_file, metadata
                 
         except Exception as e:
@@ -293,53 +2483,677 @@ class AdvancedVideoForensics:
             print("💡 다른 도구와 품질 차이가 없다면, 이미 최상위 품질입니다.")
             return None, None
     
-    def extract_prnu(self, video_path):
-        """PRNU (Photo Response Non-Uniformity) 추출 - 카메라 센서 지문"""
-        print("   🔬 PRNU 분석 중...")
+    def ensure_full_video(self, video_path):
+        """구간 다운로드 파일이면 전체 영상을 받아 그 경로를 반환 (한 번만 다운로드)"""
+        partial = self.partial_downloads.get(video_path)
+        if not partial:
+            return video_path
+        
+        if not partial['full_path']:
+            print(f"   📥 분석 구간({partial['window']}초) 초과 - 전체 영상 다운로드로 전환")
+            full_path, _ = self.download_video(partial['url'], partial['name_prefix'])
+            if not full_path:
+                return video_path
+            partial['full_path'] = full_path
+        
+        return partial['full_path']
+    
+    def resolve_analysis_path(self, video_path, seconds_needed):
+        """분석에 필요한 길이가 다운로드 구간을 넘으면 전체 영상 경로로 전환"""
+        partial = self.partial_downloads.get(video_path)
+        if partial and seconds_needed > partial['window']:
+            return self.ensure_full_video(video_path)
+        return video_path
+    
+    def sample_timestamps(self, video_path, duration, sample_count):
+        """층화 샘플링 위치 - 전체 길이를 sample_count 구간으로 나눠 각 구간 중앙에 가장 가까운 키프레임"""
+        if duration <= 0 or sample_count <= 0:
+            return []
+        
+        centers = (np.arange(sample_count) + 0.5) * duration / sample_count
+        keyframes = np.asarray(self.list_keyframe_times(video_path))
+        if keyframes.size == 0:
+            # 키프레임 정보가 없으면 구간 중앙으로 직접 탐색
+            return centers.tolist()
+        
+        # 각 구간 중앙의 좌우 키프레임 중 가까운 쪽 선택 (벡터화)
+        right = np.clip(np.searchsorted(keyframes, centers), 0, keyframes.size - 1)
+        left = np.clip(right - 1, 0, keyframes.size - 1)
+        use_left = np.abs(keyframes[left] - centers) <= np.abs(keyframes[right] - centers)
+        picks = np.where(use_left, keyframes[left], keyframes[right])
+        
+        # 키프레임이 드문 영상은 여러 구간이 같은 키프레임을 가리킬 수 있음
+        return np.unique(picks).tolist()
+    
+    def run_frame_pipeline(self, video_path, analyzers, sample_count=None):
+        """단일 디코드 파이프라인 - 영상을 한 번만 디코딩해 모든 분석기에 전달
+
+        sample_count가 주어지면 앞부분 연속 프레임 대신 전체 길이에 고르게 퍼진
+        키프레임 위치로 탐색해 분석한다 (디코딩 비용은 샘플 수에 비례).
+        결과 dict의 'frame_timestamps'에 분석한 프레임의 타임스탬프(초)가 들어간다.
+        """
+        if sample_count is None:
+            sample_count = self.sample_count
+        
+        print(f"   🎞️ 단일 디코드 파이프라인: {', '.join(a.label for a in analyzers)}")
+
+        if video_path in self.partial_downloads:
+            if sample_count:
+                # 전체 길이 샘플링은 전체 영상이 필요
+                video_path = self.resolve_analysis_path(video_path, float('inf'))
+            else:
+                # 분석기가 요구하는 프레임 범위가 다운로드 구간을 넘는지 확인
+                cap = cv2.VideoCapture(video_path)
+                fps = cap.get(cv2.CAP_PROP_FPS) or 30
+                cap.release()
+                frames_needed = max(getattr(a, 'max_frames', 0) for a in analyzers) + 1
+                video_path = self.resolve_analysis_path(video_path, frames_needed / fps)
+
+        with self.profiler.stage('frame_pipeline', video_path,
+                                 analyzers=[a.name for a in analyzers]) as counters:
+            return self._run_frame_pipeline(video_path, analyzers, sample_count, counters)
+
+    def _run_frame_pipeline(self, video_path, analyzers, sample_count, counters):
+        mode = f"s{sample_count}" if sample_count else "seq"
+        cached = self.frame_cache.lookup(video_path, mode) if self.frame_cache else None
+        
+        if cached:
+            info = dict(cached['info'], sampled=bool(sample_count))
+        else:
+            cap = cv2.VideoCapture(video_path)
+            info = {
+                'fps': cap.get(cv2.CAP_PROP_FPS),
+                'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+                'sampled': bool(sample_count)
+            }
+            cap.release()
+        
+        # 분석기별 필요 프레임 수
+        limits = [analyzer.begin(info) for analyzer in analyzers]
+        burst = max(analyzer.frames_per_sample for analyzer in analyzers)
+        max_frames = max(limits) if limits else 0
+        started = time.time()
+        
+        timestamps = None
+        source = None
+        if cached and self.frame_cache.covers(cached, max_frames, burst):
+            print(f"   ♻️ 프레임 캐시 사용 ({cached['count']}프레임, {cached['shape'][1]}x{cached['shape'][0]})")
+            source = self.frame_cache.replay(cached, max_frames, burst)
+        elif sample_count and self.segment_workers > 1 and all(a.mergeable for a in analyzers):
+            timestamps = self._run_segments(video_path, analyzers, info, sample_count, burst, counters)
+        
+        if timestamps is None:
+            if source is None:
+                source = self._decode_frames(video_path, info, sample_count, max_frames, burst, counters)
+            timestamps, costs = self._feed_analyzers(source, analyzers, limits, bool(sample_count))
+        else:
+            # 분석기별 처리 시간은 세그먼트 워커가 기록
+            costs = {analyzer.name: [0.0, 0.0, 0] for analyzer in analyzers}
+
+        results = {}
+        for analyzer in analyzers:
+            wall = time.perf_counter()
+            cpu = time.thread_time()
+            results[analyzer.name] = analyzer.result()
+            self._record_analyzer_cost(video_path, analyzer, started, costs[analyzer.name],
+                                       time.perf_counter() - wall, time.thread_time() - cpu)
+        results['frame_timestamps'] = timestamps
+        return results
+
+    def _record_analyzer_cost(self, video_path, analyzer, started, cost, extra_wall=0.0, extra_cpu=0.0):
+        wall_s, cpu_s, frames = cost
+        # 프레임별 처리 시간을 합산한 집계 이벤트 (파이프라인 시작 시각 기준)
+        self.profiler.record(f"analyzer:{analyzer.name}", video_path, started,
+                             wall_s + extra_wall, cpu_s + extra_cpu,
+                             frames=frames, aggregated=True)
+
+    def _feed_analyzers(self, source, analyzers, limits, sampled):
+        """프레임 소스를 분석기에 전달 -> (타임스탬프 리스트, 분석기별 [벽시계, CPU, 프레임])
+
+        소스는 (index, offset, frame, gray, timestamp, native, motion)을, 샘플 위치가 바뀔 때
+        None을 보낸다. native는 frame_height로 축소했을 때의 원본 해상도 중앙 타일 (축소하지
+        않았으면 None)로, native_resolution 분석기에는 gray 대신 이 타일이 전달된다.
+        motion은 디코더가 내보낸 코덱 움직임 벡터 크기 (PyAV 백엔드, 없으면 None).
+        """
+        timestamps = []
+        costs = {analyzer.name: [0.0, 0.0, 0] for analyzer in analyzers}
+        
+        for item in source:
+            if item is None:
+                for analyzer in analyzers:
+                    analyzer.new_segment()
+                continue
+            index, offset, frame, gray, timestamp, native, motion = item
+            if sampled:
+                selected = [a for a in analyzers if offset < a.frames_per_sample]
+            else:
+                selected = [
+                    analyzer for analyzer, limit in zip(analyzers, limits)
+                    if index < limit and analyzer.wants(index)
+                ]
+            if not selected:
+                continue
+            
+            for analyzer in selected:
+                # 그레이스케일 변환은 프레임당 한 번만
+                if gray is None:
+                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                view = gray
+                if analyzer.native_resolution and native is not None:
+                    if native.ndim == 3:
+                        native = cv2.cvtColor(native, cv2.COLOR_BGR2GRAY)
+                    view = native
+                wall = time.perf_counter()
+                cpu = time.thread_time()
+                if motion is not None:
+                    analyzer.codec_motion(index, motion)
+                analyzer.process(index, frame, view, timestamp)
+                cost = costs[analyzer.name]
+                cost[0] += time.perf_counter() - wall
+                cost[1] += time.thread_time() - cpu
+                cost[2] += 1
+            timestamps.append(timestamp)
+        return timestamps, costs
+
+    def _run_segments(self, video_path, analyzers, info, sample_count, burst, counters):
+        """긴 영상 하나를 키프레임 정렬 시간 구간으로 나눠 여러 프로세스에서 분석
+
+        층화 샘플링 위치(키프레임)를 연속 구간 segment_workers개로 나누고, 워커마다
+        분석기 사본을 받아 자기 구간으로 탐색해 처리한 뒤 (result() 전 상태로) 돌려준다.
+        부모는 구간 순서대로 FrameAnalyzer.merge()로 합쳐 순차 실행과 같은 상태를 만든다.
+        실패 시 None을 반환해 순차 디코드로 대체한다.
+        """
+        positions = self.sample_timestamps(video_path, self.video_duration(video_path, info), sample_count)
+        count = min(self.segment_workers, len(positions))
+        if count < 2:
+            return None
+        
+        groups = [list(group) for group in np.array_split(np.asarray(positions, dtype=np.float64), count)]
+        bases = np.cumsum([0] + [len(group) * burst for group in groups[:-1]])
+        print(f"   🧩 구간 병렬 디코드: {len(positions)}개 위치 -> {count}개 구간")
+        
+        options = dict(self.worker_options(), segment_workers=1, frame_cache_max_bytes=None)
+        try:
+            with ProcessPoolExecutor(max_workers=count, initializer=_init_analysis_worker) as executor:
+                futures = [
+                    executor.submit(_frame_segment_worker, options, video_path, analyzers, info,
+                                    group, int(base), burst)
+                    for group, base in zip(groups, bases)
+                ]
+                parts = [future.result() for future in futures]
+        except Exception as e:
+            print(f"   ⚠️ 구간 병렬 디코드 실패, 순차 디코드로 대체: {str(e)}")
+            return None
+        
+        # 구간 순서대로 병합 (결합 법칙만 필요 - 합계/연결/OR)
+        timestamps = []
+        for i, (segment_analyzers, segment_timestamps, frames, events) in enumerate(parts):
+            for analyzer, segment in zip(analyzers, segment_analyzers):
+                if i == 0:
+                    analyzer.__dict__.update(segment.__dict__)
+                else:
+                    analyzer.merge(segment)
+            timestamps.extend(segment_timestamps)
+            counters['frames'] += frames
+            self.profiler.extend(events)
+        return timestamps
+
+    def analyze_frame_segment(self, video_path, analyzers, info, positions, index_base, burst):
+        """세그먼트 워커 본체 - 주어진 샘플 위치만 디코딩해 분석기 상태 누적 (result() 호출 안 함)"""
+        started = time.time()
+        with self.profiler.stage('frame_segment', video_path, positions=len(positions)) as counters:
+            limits = [analyzer.begin(info) for analyzer in analyzers]
+            source = self._decode_frames(video_path, info, len(positions), max(limits, default=0), burst,
+                                         counters, positions=positions, index_base=index_base)
+            timestamps, costs = self._feed_analyzers(source, analyzers, limits, True)
+        for analyzer in analyzers:
+            self._record_analyzer_cost(video_path, analyzer, started, costs[analyzer.name])
+        return analyzers, timestamps, counters['frames'], self.profiler.events
+
+    def _analysis_frame(self, frame):
+        """분석 해상도(frame_height)로 축소 -> (축소 프레임, 원본 해상도 중앙 타일 뷰)
+
+        축소하지 않으면 (원본 프레임, None).
+        """
+        if self.frame_height and frame.shape[0] > self.frame_height:
+            width = int(round(frame.shape[1] * self.frame_height / frame.shape[0] / 2)) * 2
+            native = _center_crop(frame, min(NATIVE_TILE, frame.shape[0]), min(NATIVE_TILE, frame.shape[1]))
+            return cv2.resize(frame, (width, self.frame_height), interpolation=cv2.INTER_AREA), native
+        return frame, None
+
+    def _decode_frames(self, video_path, info, sample_count, max_frames, burst, counters,
+                       positions=None, index_base=0):
+        """디코드 프레임 소스 (decode_backend 선택, 프레임 캐시가 켜져 있으면 디코딩하면서 기록)
+
+        positions를 주면 해당 샘플 위치만 디코딩한다 (구간 병렬 워커, 프레임 캐시 기록 안 함).
+        """
+        mode = f"s{sample_count}" if sample_count else "seq"
+        external = positions is not None
+        if not external and sample_count:
+            positions = self.sample_timestamps(video_path, self.video_duration(video_path, info), sample_count)
+            print(f"   🎯 층화 샘플링: {len(positions)}개 위치 (키프레임 탐색, 위치당 최대 {burst}프레임)")
+        
+        writer = None
+        if self.frame_cache and not external:
+            capacity = len(positions) * burst if sample_count else max_frames
+            writer = self.frame_cache.writer(video_path, mode, info, capacity,
+                                             max_frames=0 if sample_count else max_frames,
+                                             burst=burst if sample_count else 0)
         
+        if self.decode_backend == "pyav":
+            frames = self._pyav_frames(video_path, info, positions, max_frames, burst)
+        elif self.decode_backend == "ffmpeg":
+            frames = self._ffmpeg_frames(video_path, info, positions, max_frames, burst)
+        else:
+            frames = self._opencv_frames(video_path, info, positions, max_frames, burst)
+        
+        produced = 0
+        try:
+            for item in frames:
+                if item is None:
+                    if writer:
+                        writer.new_segment()
+                    yield None
+                    continue
+                counters['frames'] += 1
+                produced += 1
+                index, offset, frame, gray, timestamp, native, motion = item
+                index += index_base
+                if writer:
+                    if gray is None:
+                        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                    if native is not None and native.ndim == 3:
+                        native = cv2.cvtColor(native, cv2.COLOR_BGR2GRAY)
+                    writer.append(index, offset, gray, timestamp, native, motion)
+                yield index, offset, frame, gray, timestamp, native, motion
+            
+            if writer:
+                writer.eof = not sample_count and produced < max_frames
+                writer.commit()
+                writer = None
+        finally:
+            frames.close()
+            if writer:
+                writer.abort()
+
+    def _opencv_frames(self, video_path, info, positions, max_frames, burst):
+        """OpenCV 디코드 (BGR 프레임, 그레이스케일은 파이프라인이 필요할 때 변환)
+
+        회전 메타데이터는 적용하지 않는다 (코딩 방향 - ffmpeg 백엔드의 -noautorotate와 동일).
+        """
         cap = cv2.VideoCapture(video_path)
-        prnu_patterns = []
+        if hasattr(cv2, 'CAP_PROP_ORIENTATION_AUTO'):
+            cap.set(cv2.CAP_PROP_ORIENTATION_AUTO, 0)
+        try:
+            if positions is not None:
+                index = 0
+                for position in positions:
+                    cap.set(cv2.CAP_PROP_POS_MSEC, position * 1000)
+                    yield None
+                    
+                    for offset in range(burst):
+                        ret, frame = cap.read()
+                        if not ret:
+                            break
+                        timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                        frame, native = self._analysis_frame(frame)
+                        yield index, offset, frame, None, timestamp, native, None
+                        index += 1
+            else:
+                fps = info['fps'] or 30
+                index = 0
+                while index < max_frames:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    frame, native = self._analysis_frame(frame)
+                    yield index, 0, frame, None, index / fps, native, None
+                    index += 1
+        finally:
+            cap.release()
+
+    def _ffmpeg_frames(self, video_path, info, positions, max_frames, burst):
+        """ffmpeg rawvideo 디코드 - 디코더 안에서 축소 + 그레이스케일 변환
+
+        ffmpeg가 scale/format=gray 필터를 거친 고정 크기 8비트 프레임을 파이프로 보내고,
+        이를 재사용 버퍼 하나에 readinto로 읽는다 (프레임당 할당/BGR 변환 없음).
+        층화 샘플링에서 위치당 1프레임이면 -skip_frame nokey로 키프레임만 디코딩한다.
+        -noautorotate로 회전 메타데이터를 적용하지 않아 프레임이 ffprobe 코딩 크기와 일치한다
+        (OpenCV 백엔드도 CAP_PROP_ORIENTATION_AUTO를 꺼서 두 백엔드가 같은 방향을 본다).
+        frame_height로 축소하면 원본 해상도 중앙 타일을 split/crop으로 잘라 축소 프레임 아래에
+        vstack해 같은 파이프로 받는다 (PRNU용, 추가 디코드 없음).
+        """
+        width, height = self._video_dimensions(video_path)
+        if not width or not height:
+            # 스트림 정보를 못 읽으면 OpenCV로 대체
+            yield from self._opencv_frames(video_path, info, positions, max_frames, burst)
+            return
         
-        frame_count = 0
-        while frame_count < 30:  # 처음 30프레임 분석
-            ret, frame = cap.read()
-            if not ret:
-                break
+        tile_h = tile_w = 0
+        video_filter = "format=gray"
+        if self.frame_height and height > self.frame_height:
+            tile_h, tile_w = min(NATIVE_TILE, height), min(NATIVE_TILE, width)
+            width = int(round(width * self.frame_height / height / 2)) * 2
+            height = self.frame_height
+            out_w = max(width, tile_w)
+            video_filter = (f"format=gray,split=2[a][b];"
+                            f"[a]scale={width}:{height}:flags=area,pad={out_w}:{height}[s];"
+                            f"[b]crop={tile_w}:{tile_h},pad={out_w}:{tile_h}[t];[s][t]vstack")
+        
+        buffer = np.empty((height + tile_h, max(width, tile_w)), dtype=np.uint8)
+        view = memoryview(buffer.reshape(-1))
+        gray_view = buffer[:height, :width]
+        native_view = buffer[height:, :tile_w] if tile_h else None
+        fps = info['fps'] or 30
+        
+        def command(count, start=None, keyframes_only=False):
+            cmd = ['ffmpeg', '-v', 'error', '-nostdin', '-threads', str(self.decode_threads or 0)]
+            if keyframes_only:
+                cmd += ['-skip_frame', 'nokey']
+            if start is not None:
+                cmd += ['-ss', f"{start:.3f}"]
+            cmd += ['-noautorotate', '-i', video_path, '-an', '-sn', '-vf', video_filter,
+                    '-frames:v', str(count), '-vsync', 'passthrough',
+                    '-f', 'rawvideo', '-pix_fmt', 'gray', '-']
+            return cmd
+        
+        def read_frames(cmd):
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    bufsize=buffer.nbytes)
+            try:
+                while True:
+                    filled = 0
+                    while filled < buffer.nbytes:
+                        n = proc.stdout.readinto(view[filled:])
+                        if not n:
+                            break
+                        filled += n
+                    if filled < buffer.nbytes:
+                        break
+                    yield gray_view
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                proc.stdout.close()
+                proc.wait()
+        
+        if positions is not None:
+            index = 0
+            for position in positions:
+                yield None
+                frames = read_frames(command(burst, position, keyframes_only=burst == 1))
+                try:
+                    for offset, gray in enumerate(frames):
+                        yield index, offset, None, gray, position + offset / fps, native_view, None
+                        index += 1
+                finally:
+                    frames.close()
+        else:
+            frames = read_frames(command(max_frames))
+            try:
+                for index, gray in enumerate(frames):
+                    yield index, 0, None, gray, index / fps, native_view, None
+            finally:
+                frames.close()
+
+    def _pyav_frames(self, video_path, info, positions, max_frames, burst):
+        """PyAV 디코드 - 그레이스케일 프레임과 코덱 움직임 벡터를 한 번의 디코딩으로
+
+        디코더에 export_mvs를 켜 프레임마다 비트스트림의 움직임 벡터를 함께 내보내므로
+        움직임 분석을 위한 별도 디코드 패스가 없다. 회전 메타데이터는 적용하지 않는다 (코딩 방향).
+        """
+        fps = info['fps'] or 30
+        with av.open(video_path) as container:
+            stream = container.streams.video[0]
+            stream.thread_type = 'AUTO'
+            stream.codec_context.options = {'flags2': '+export_mvs'}
             
-            if frame_count % 10 == 0:
-                # 고주파 노이즈 추출
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            def item(index, offset, frame, fallback_time):
+                gray, native = self._analysis_frame(frame.to_ndarray(format='gray'))
+                timestamp = float(frame.time) if frame.time is not None else fallback_time
+                return index, offset, None, gray, timestamp, native, _frame_motion(frame)
+            
+            if positions is not None:
+                index = 0
+                for position in positions:
+                    container.seek(int(position / stream.time_base), stream=stream)
+                    yield None
+                    for offset, frame in enumerate(container.decode(stream)):
+                        if offset >= burst:
+                            break
+                        yield item(index, offset, frame, position + offset / fps)
+                        index += 1
+            else:
+                for index, frame in enumerate(container.decode(stream)):
+                    if index >= max_frames:
+                        break
+                    yield item(index, 0, frame, index / fps)
+
+    def _video_dimensions(self, video_path):
+        """첫 비디오 스트림의 (width, height) - 회전 메타데이터 반영 전 코딩 크기"""
+        try:
+            result = subprocess.run(
+                ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+                 '-show_entries', 'stream=width,height', '-of', 'csv=p=0:s=x', video_path],
+                capture_output=True, text=True, timeout=30
+            )
+            width, height = result.stdout.strip().splitlines()[0].split('x')[:2]
+            return int(width), int(height)
+        except Exception:
+            return 0, 0
+
+    def extract_prnu(self, video_path):
+        """PRNU (Photo Response Non-Uniformity) 추출 - 카메라 센서 지문 (2D float32 타일)"""
+        print("   🔬 PRNU 분석 중...")
+        return self.run_frame_pipeline(video_path, [PRNUAnalyzer()])['prnu']['fingerprint']
+    
+    def compare_prnu(self, path_a, path_b):
+        """두 영상의 PRNU 지문 비교 (NCC + PCE)"""
+        fp_a = self.load_features(path_a).get('prnu')
+        if fp_a is None:
+            fp_a = self.extract_prnu(path_a)
+        fp_b = self.load_features(path_b).get('prnu')
+        if fp_b is None:
+            fp_b = self.extract_prnu(path_b)
+        return prnu_pce(fp_a, fp_b)
+    
+    def analyze_gop_structure(self, video_path, mode="packet"):
+        """GOP (Group of Pictures) 구조 분석
+
+        mode="packet": 패킷 헤더만 읽는 빠른 분석 (디코딩 없음, 기본값)
+        mode="frame": 전체 프레임 디코딩 기반 분석 (pict_type, 기존 방식)
+        """
+        if mode == "frame":
+            return self.analyze_gop_structure_frames(video_path)
+        return self.analyze_gop_packets(video_path)
+    
+    def iter_video_packets(self, video_path, entries="pts,dts,size,flags"):
+        """ffprobe 패킷 헤더를 한 줄씩 스트리밍 (디코딩 없음)
+
+        각 패킷을 {필드: 값} dict로 yield한다. 패킷이 하나도 없으면
+        ffprobe 오류 메시지와 함께 RuntimeError를 발생시킨다.
+        """
+        cmd = [
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', f'packet={entries}',
+            '-of', 'compact=p=0', video_path
+        ]
+        
+        # stderr는 임시 파일로 받음 - 파이프로 받으면 stdout만 읽는 동안 경고가 쌓여
+        # 파이프 버퍼가 차는 순간 ffprobe가 멈추고 stdout 읽기도 영원히 대기한다
+        errors = tempfile.TemporaryFile(mode='w+')
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors,
+                                text=True, bufsize=1)
+        count = 0
+        try:
+            # ffprobe 출력을 한 줄씩 스트리밍 처리 (전체 결과를 메모리에 쌓지 않음)
+            for line in proc.stdout:
+                fields = dict(
+                    item.split('=', 1) for item in line.strip().split('|') if '=' in item
+                )
+                if fields:
+                    count += 1
+                    yield fields
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+            if count == 0:
+                errors.seek(0)
+                error = errors.read().strip()
+            errors.close()
+        
+        if count == 0:
+            raise RuntimeError(error or '비디오 스트림을 찾을 수 없음')
+    
+    def _probe_key(self, video_path, kind):
+        """ffprobe 결과 메모 키 - 같은 경로라도 파일이 바뀌면 다시 읽음"""
+        try:
+            stat = os.stat(video_path)
+            return (kind, os.path.abspath(video_path), stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def list_keyframe_times(self, video_path):
+        """키프레임 타임스탬프(초) 목록 - 패킷 플래그만 읽음 (경로별로 한 번만 스캔)"""
+        key = self._probe_key(video_path, 'keyframes')
+        if key in self._probe_memo:
+            return self._probe_memo[key]
+        
+        times = []
+        try:
+            for fields in self.iter_video_packets(video_path, "pts_time,flags"):
+                if 'K' in fields.get('flags', '') and fields.get('pts_time', 'N/A') != 'N/A':
+                    times.append(float(fields['pts_time']))
+        except Exception as e:
+            print(f"   ⚠️ 키프레임 목록 추출 실패: {str(e)}")
+            return sorted(times)
+        
+        times.sort()
+        if key is not None:
+            self._probe_memo[key] = times
+        return times
+    
+    def video_duration(self, video_path, info=None):
+        """영상 길이(초) - ffprobe 컨테이너 길이 (경로별로 한 번만 조회)
+
+        CAP_PROP_FRAME_COUNT는 컨테이너 헤더 추정값이라 VFR·잘린 파일에서 틀리기 쉬우므로
+        샘플링 위치 계산에는 쓰지 않는다. ffprobe가 길이를 주지 못할 때만 info의
+        frame_count / fps로 대체한다.
+        """
+        key = self._probe_key(video_path, 'duration')
+        if key in self._probe_memo:
+            return self._probe_memo[key]
+        
+        duration = 0.0
+        try:
+            result = subprocess.run(
+                ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+                 '-of', 'default=noprint_wrappers=1:nokey=1', video_path],
+                capture_output=True, text=True, timeout=30
+            )
+            duration = float(result.stdout.strip().splitlines()[0])
+        except Exception:
+            duration = 0.0
+        
+        if not duration > 0 and info and info.get('frame_count', 0) > 0:
+            duration = info['frame_count'] / (info['fps'] or 30)
+            return duration
+        if key is not None and duration > 0:
+            self._probe_memo[key] = duration
+        return duration
+    
+    def analyze_gop_packets(self, video_path, max_packets=None):
+        """패킷 헤더 기반 GOP 분석 - 키프레임 플래그와 패킷 크기만 스트리밍으로 읽음"""
+        print("   🔬 GOP 구조 분석 중 (패킷 헤더)...")
+        
+        gop_lengths = []
+        gop_sizes = []
+        packet_count = 0
+        key_count = 0
+        b_count = 0
+        current_length = 0
+        current_size = 0
+        seen_key = False
+        max_pts = None
+        
+        try:
+            for fields in self.iter_video_packets(video_path):
+                if 'flags' not in fields:
+                    continue
                 
-                # Wiener 필터로 신호 분리
-                denoised = cv2.GaussianBlur(gray, (5, 5), 0)
-                noise = gray.astype(np.float32) - denoised.astype(np.float32)
+                size = int(fields['size']) if fields.get('size', '').isdigit() else 0
+                is_key = 'K' in fields['flags']
                 
-                # 센서 패턴 노이즈 추정
-                fft = np.fft.fft2(noise)
-                fft_shift = np.fft.fftshift(fft)
+                # 디코드 순서에서 pts가 이전 최대 pts보다 작으면 재정렬된 B 프레임
+                pts = fields.get('pts', 'N/A')
+                if pts.lstrip('-').isdigit():
+                    pts = int(pts)
+                    if max_pts is not None and pts < max_pts and not is_key:
+                        b_count += 1
+                    max_pts = pts if max_pts is None else max(max_pts, pts)
                 
-                # 고주파 성분만 추출
-                rows, cols = gray.shape
-                crow, ccol = rows//2, cols//2
-                mask = np.ones((rows, cols), np.uint8)
-                r = 30
-                center = (ccol, crow)
-                cv2.circle(mask, center, r, 0, -1)
+                if is_key:
+                    key_count += 1
+                    # 첫 키프레임 이전의 불완전한 GOP는 제외
+                    if seen_key:
+                        gop_lengths.append(current_length)
+                        gop_sizes.append(current_size)
+                    seen_key = True
+                    current_length = 0
+                    current_size = 0
                 
-                fft_shift = fft_shift * mask
-                prnu_pattern = np.abs(fft_shift)
-                prnu_patterns.append(prnu_pattern.flatten()[:100])  # 상위 100개 특징
-            
-            frame_count += 1
+                current_length += 1
+                current_size += size
+                packet_count += 1
+                
+                if max_packets and packet_count >= max_packets:
+                    break
+        except Exception as e:
+            print(f"   ⚠️ GOP 패킷 분석 실패: {str(e)}")
+            return self._empty_gop_result(str(e))
+        
+        if packet_count == 0:
+            print("   ⚠️ GOP 패킷 정보 없음")
+            return self._empty_gop_result('no video packets')
         
-        cap.release()
+        # 마지막 GOP (다음 키프레임 없이 끝난 구간)
+        if seen_key and current_length:
+            gop_lengths.append(current_length)
+            gop_sizes.append(current_size)
         
-        if prnu_patterns:
-            return np.mean(prnu_patterns, axis=0)
-        return np.zeros(100)
+        p_count = packet_count - key_count - b_count
+        
+        return {
+            'avg_gop_length': np.mean(gop_lengths) if gop_lengths else 0,
+            'gop_variance': np.var(gop_lengths) if gop_lengths else 0,
+            'i_frame_ratio': key_count / packet_count,
+            'p_frame_ratio': p_count / packet_count,
+            'b_frame_ratio': b_count / packet_count,
+            'gop_count': len(gop_lengths),
+            'gop_sizes': gop_sizes,
+            'avg_gop_bytes': np.mean(gop_sizes) if gop_sizes else 0,
+            'gop_bytes_variance': np.var(gop_sizes) if gop_sizes else 0,
+            'packet_count': packet_count,
+            'method': 'packet'
+        }
+    
+    def _empty_gop_result(self, error=None):
+        """GOP 분석 실패 시 기본값 (실패 원인 포함)"""
+        result = {
+            'avg_gop_length': 0,
+            'gop_variance': 0,
+            'i_frame_ratio': 0,
+            'p_frame_ratio': 0,
+            'b_frame_ratio': 0
+        }
+        if error:
+            result['error'] = error
+        return result
     
-    def analyze_gop_structure(self, video_path):
-        """GOP (Group of Pictures) 구조 분석"""
+    def analyze_gop_structure_frames(self, video_path):
+        """GOP 구조 분석 (프레임 디코딩 기반, pict_type)"""
         print("   🔬 GOP 구조 분석 중...")
         
         try:
@@ -379,23 +3193,213 @@ class AdvancedVideoForensics:
                 'b_frame_ratio': 0
             }
     
-    def extract_audio_fingerprint(self, video_path):
-        """오디오 지문 추출 (Content ID 방식)"""
+    def _pcm_command(self, video_path, sr, duration=None, offset=0):
+        """float32 모노 PCM을 stdout으로 보내는 ffmpeg 명령"""
+        cmd = ['ffmpeg', '-v', 'error', '-nostdin']
+        if offset:
+            cmd += ['-ss', str(offset)]
+        cmd += ['-i', video_path]
+        if duration:
+            cmd += ['-t', str(duration)]
+        cmd += ['-vn', '-ac', '1', '-ar', str(sr), '-f', 'f32le', '-acodec', 'pcm_f32le', '-']
+        return cmd
+    
+    def iter_audio_pcm(self, video_path, sr=8000, chunk_seconds=10, duration=None, offset=0):
+        """ffmpeg 파이프에서 모노 PCM을 chunk_seconds 단위로 스트리밍 (메모리 사용량 고정)"""
+        chunk_bytes = int(sr * chunk_seconds) * 4
+        proc = subprocess.Popen(self._pcm_command(video_path, sr, duration, offset),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            while True:
+                data = proc.stdout.read(chunk_bytes)
+                if not data:
+                    break
+                data = data[:len(data) - len(data) % 4]
+                if data:
+                    yield np.frombuffer(data, dtype=np.float32)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+    
+    def extract_audio_landmarks(self, video_path, hasher=None):
+        """전체 오디오의 랜드마크 해시 (스트리밍 STFT) -> (hashes uint32, 앵커 프레임 int32)
+
+        analyze_with_features에서 영상마다 호출되므로 --workers 프로세스 풀에서 파일 단위로
+        병렬 추출되고, 역색인은 find_audio_matches가 저장된 특징으로 만든다.
+        구간 다운로드 파일은 전체 영상으로 전환하지 않고 받은 구간만 색인한다 (레퍼런스 전체를
+        받으면 구간 다운로드의 의미가 없어짐) - 대신 매칭 결과에 window_limited로 표시된다.
+        """
+        hasher = hasher or AudioLandmarkHasher()
+        hashes = []
+        times = []
+        try:
+            for chunk_hashes, chunk_times in hasher.hash_stream(
+                    self.iter_audio_pcm(video_path, sr=hasher.sr)):
+                hashes.append(chunk_hashes)
+                times.append(chunk_times)
+        except Exception as e:
+            print(f"   ⚠️ 오디오 랜드마크 추출 실패: {str(e)}")
+        if not hashes:
+            return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.int32)
+        return np.concatenate(hashes), np.concatenate(times)
+    
+    def audio_onset_envelope(self, video_path, sr=4000, env_rate=100):
+        """저역 PCM을 스트리밍하며 env_rate Hz 온셋 포락선 계산 (전체 파형을 보관하지 않음)"""
+        hop = sr // env_rate
+        leftover = np.zeros(0, dtype=np.float32)
+        frames = []
+        for chunk in self.iter_audio_pcm(video_path, sr=sr):
+            samples = np.concatenate([leftover, chunk])
+            n = samples.size // hop
+            frames.append(np.sqrt(np.mean(samples[:n * hop].reshape(n, hop) ** 2, axis=1)))
+            leftover = samples[n * hop:]
+        if not frames:
+            return np.zeros(0, dtype=np.float32)
+        envelope = np.log1p(np.concatenate(frames) * 100)
+        # 에너지 증가분만 남겨 음량 차이에 덜 민감하게
+        onset = np.maximum(np.diff(envelope, prepend=envelope[:1]), 0)
+        return ((onset - onset.mean()) / (onset.std() + 1e-10)).astype(np.float32)
+    
+    def align_audio(self, target_path, reference_path, sr=4000, chunk_seconds=20,
+                    n_chunks=8, search_seconds=2.0, env_rate=100):
+        """FFT 상호상관으로 타겟-레퍼런스 오디오 오프셋과 드리프트 추정
+
+        1) 100Hz 온셋 포락선 전체를 상호상관해 대략적인 오프셋을 구하고,
+        2) 타겟 전 구간에 고르게 놓인 chunk_seconds 길이 조각을 레퍼런스의
+           예상 위치 ±search_seconds 안에서 정규화 상호상관해 정밀 오프셋을 구한 뒤,
+        3) 조각별 오프셋을 직선 적합해 드리프트를 얻는다.
+        오디오는 sr(기본 4kHz)로 데시메이션된 조각만 읽으므로 긴 영상도 메모리 부담이 없다.
+        offset은 (레퍼런스 시각 - 타겟 시각, 초)이며 레퍼런스 시각 = t + offset + drift * t.
+        """
+        print("\n⏱️ 오디오 정렬 (FFT 상호상관)...")
+        try:
+            env_t = self.audio_onset_envelope(target_path, sr, env_rate)
+            env_r = self.audio_onset_envelope(reference_path, sr, env_rate)
+            if env_t.size < env_rate or env_r.size < env_rate:
+                return {'offset': 0, 'drift_ppm': 0, 'confidence': 0, 'chunks': []}
+            
+            corr = signal.correlate(env_r, env_t, mode='full', method='fft')
+            coarse_offset = (int(np.argmax(corr)) - (env_t.size - 1)) / env_rate
+            
+            duration = env_t.size / env_rate
+            chunk_seconds = min(chunk_seconds, duration)
+            starts = np.linspace(0, max(duration - chunk_seconds, 0), n_chunks if duration > chunk_seconds else 1)
+            
+            chunks = []
+            for start in starts:
+                a = self.read_audio_pcm(target_path, sr, chunk_seconds, start)
+                ref_start = max(start + coarse_offset - search_seconds, 0)
+                b = self.read_audio_pcm(reference_path, sr, chunk_seconds + 2 * search_seconds, ref_start)
+                if a.size < sr or b.size < a.size:
+                    continue
+                a = a - a.mean()
+                norm_a = np.linalg.norm(a)
+                if norm_a < 1e-6:
+                    continue  # 무음 구간
+                
+                c = signal.correlate(b, a, mode='valid', method='fft')
+                # 레퍼런스 창별 에너지로 정규화 (누적합으로 슬라이딩 합)
+                csum = np.concatenate([[0], np.cumsum(b.astype(np.float64) ** 2)])
+                window_energy = csum[a.size:] - csum[:-a.size]
+                ncc = c / (norm_a * np.sqrt(np.maximum(window_energy, 1e-12)))
+                peak = int(np.argmax(ncc))
+                chunks.append({
+                    'target_time': float(start),
+                    'offset': float(ref_start + peak / sr - start),
+                    'correlation': float(ncc[peak])
+                })
+            
+            good = [c for c in chunks if c['correlation'] > 0.3]
+            if len(good) >= 2:
+                t = np.array([c['target_time'] for c in good])
+                o = np.array([c['offset'] for c in good])
+                w = np.array([c['correlation'] for c in good])
+                drift, offset = np.polyfit(t, o, 1, w=w)
+            elif good:
+                drift, offset = 0.0, good[0]['offset']
+            else:
+                drift, offset = 0.0, coarse_offset
+            
+            result = {
+                'offset': float(offset),
+                'drift_ppm': float(drift * 1e6),
+                'coarse_offset': float(coarse_offset),
+                'confidence': float(np.mean([c['correlation'] for c in good])) if good else 0.0,
+                'chunks': chunks
+            }
+            print(f"   오프셋 {result['offset']:+.3f}초, 드리프트 {result['drift_ppm']:+.1f}ppm, "
+                  f"신뢰도 {result['confidence']:.2f} ({len(good)}/{len(chunks)} 구간)")
+            return result
+            
+        except Exception as e:
+            print(f"   ⚠️ 오디오 정렬 실패: {str(e)}")
+            return {'offset': 0, 'drift_ppm': 0, 'confidence': 0, 'chunks': []}
+    
+    @staticmethod
+    def aligned_time(alignment, target_time):
+        """타겟 시각을 정렬 결과에 따라 레퍼런스 시각으로 변환"""
+        return target_time + alignment['offset'] + alignment['drift_ppm'] * 1e-6 * target_time
+    
+    def read_audio_pcm(self, video_path, sr=22050, duration=30, offset=0):
+        """ffmpeg 파이프로 모노 PCM을 직접 읽기 (임시 WAV 파일 없음)
+
+        ffmpeg가 목표 샘플레이트로 리샘플링한 float32 모노 PCM을 stdout으로 보내고,
+        필요한 길이(duration초)만큼 NumPy 버퍼에 채운 뒤 바로 종료한다.
+        duration=None이면 끝까지 읽는다.
+        """
+        cmd = self._pcm_command(video_path, sr, duration, offset)
+        
+        bytes_per_sample = 4
+        chunk_size = 1 << 16
+        
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            if duration:
+                # 필요한 길이만큼 미리 할당한 버퍼에 직접 채움
+                buffer = bytearray(int(sr * duration) * bytes_per_sample)
+                view = memoryview(buffer)
+                filled = 0
+                while filled < len(buffer):
+                    n = proc.stdout.readinto(view[filled:filled + chunk_size])
+                    if not n:
+                        break
+                    filled += n
+                data = buffer[:filled - filled % bytes_per_sample]
+            else:
+                chunks = []
+                while True:
+                    chunk = proc.stdout.read(chunk_size)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                data = b''.join(chunks)
+                data = data[:len(data) - len(data) % bytes_per_sample]
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+        
+        return np.frombuffer(data, dtype=np.float32)
+    
+    def extract_audio_fingerprint(self, video_path, duration=30, features=None):
+        """오디오 지문 추출 (Content ID 방식)
+
+        features dict가 주어지면 원시 특징 벡터(크로마/MFCC 평균)를 함께 기록
+        """
         print("   🔬 오디오 지문 추출 중...")
         
         try:
-            # 오디오 추출
-            audio_path = video_path.replace('.mp4', '_audio.wav')
-            cmd = [
-                'ffmpeg', '-i', video_path, '-vn', '-acodec', 'pcm_s16le',
-                '-ar', '44100', '-ac', '2', audio_path, '-y'
-            ]
-            subprocess.run(cmd, capture_output=True, timeout=30)
+            # 구간 다운로드 파일이 요구 길이보다 짧으면 전체 영상으로 전환
+            video_path = self.resolve_analysis_path(video_path, duration or float('inf'))
             
-            if os.path.exists(audio_path):
-                # librosa로 오디오 분석
-                y, sr = librosa.load(audio_path, sr=22050, duration=30)
-                
+            # 오디오 추출 (22050Hz 모노 PCM 파이프, 임시 파일 없음)
+            sr = 22050
+            y = self.read_audio_pcm(video_path, sr=sr, duration=duration)
+            
+            if y.size:
                 # Chromagram 추출 (음악 지문)
                 chroma = librosa.feature.chroma_stft(y=y, sr=sr)
                 
@@ -405,8 +3409,9 @@ class AdvancedVideoForensics:
                 # 스펙트럴 센트로이드 (음색 특징)
                 spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)
                 
-                # 임시 파일 삭제
-                os.remove(audio_path)
+                if features is not None:
+                    features['audio_chroma'] = np.mean(chroma, axis=1).astype(np.float32)
+                    features['audio_mfcc'] = np.mean(mfcc, axis=1).astype(np.float32)
                 
                 return {
                     'chroma_mean': np.mean(chroma),
@@ -416,133 +3421,85 @@ class AdvancedVideoForensics:
                     'spectral_centroid_mean': np.mean(spectral_centroids)
                 }
         except:
-            return {
-                'chroma_mean': 0,
-                'chroma_std': 0,
-                'mfcc_mean': 0,
-                'mfcc_std': 0,
-                'spectral_centroid_mean': 0
-            }
-    
-    def analyze_motion_vectors(self, video_path):
-        """움직임 벡터 분석"""
-        print("   🔬 움직임 벡터 분석 중...")
-        
-        cap = cv2.VideoCapture(video_path)
+            pass
         
-        ret, prev_frame = cap.read()
-        if not ret:
-            cap.release()
-            return {'motion_consistency': 0, 'avg_motion': 0}
-        
-        prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-        motion_vectors = []
-        
-        frame_count = 0
-        while frame_count < 60:  # 60프레임 분석
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Optical Flow 계산
-            flow = cv2.calcOpticalFlowFarneback(
-                prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0
-            )
-            
-            # 움직임 크기 계산
-            magnitude, angle = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-            motion_vectors.append(np.mean(magnitude))
-            
-            prev_gray = gray
-            frame_count += 1
+        return {
+            'chroma_mean': 0,
+            'chroma_std': 0,
+            'mfcc_mean': 0,
+            'mfcc_std': 0,
+            'spectral_centroid_mean': 0
+        }
+    
+    def extract_codec_motion_vectors(self, video_path, max_frames=60, positions=None, counters=None):
+        """코덱 움직임 벡터 추출 (ffmpeg export_mvs 부가 데이터, PyAV 사용)
+
+        인코더가 비트스트림에 저장한 움직임 벡터를 그대로 읽으므로 Optical Flow 계산이 없다.
+        프레임별 블록 면적 가중 평균 움직임 크기(픽셀) 리스트를 반환하고,
+        PyAV가 없거나 움직임 벡터를 얻지 못하면 None을 반환한다.
+        positions(초)가 주어지면 각 위치로 탐색해 첫 인터 프레임의 벡터를 읽는다.
+        프레임 파이프라인과 별개의 디코드 패스이므로 counters['frames']에 디코딩한 프레임 수를 더한다
+        (PyAV 디코드 백엔드에서는 파이프라인이 벡터를 함께 내보내 이 패스를 쓰지 않는다).
+        """
+        if av is None:
+            return None
         
-        cap.release()
+        counters = counters if counters is not None else {'frames': 0}
+        motion_series = []
+        try:
+            with av.open(video_path) as container:
+                stream = container.streams.video[0]
+                stream.thread_type = 'AUTO'
+                stream.codec_context.options = {'flags2': '+export_mvs'}
+                
+                if positions:
+                    for position in positions:
+                        container.seek(int(position / stream.time_base), stream=stream)
+                        # 키프레임 다음 첫 인터 프레임까지 디코딩
+                        for count, frame in enumerate(container.decode(stream)):
+                            counters['frames'] += 1
+                            value = _frame_motion(frame)
+                            if value is not None:
+                                motion_series.append(value)
+                                break
+                            if count >= 3:
+                                break
+                else:
+                    for count, frame in enumerate(container.decode(stream)):
+                        if count > max_frames:
+                            break
+                        counters['frames'] += 1
+                        value = _frame_motion(frame)
+                        if value is not None:
+                            motion_series.append(value)
+        except Exception as e:
+            print(f"   ⚠️ 코덱 움직임 벡터 추출 실패: {str(e)}")
+            return None
         
-        if motion_vectors:
-            return {
-                'motion_consistency': 1 / (1 + np.std(motion_vectors)),
-                'avg_motion': np.mean(motion_vectors)
-            }
-        return {'motion_consistency': 0, 'avg_motion': 0}
+        return motion_series or None
+    
+    def _codec_motion_series(self, video_path, counters=None):
+        """현재 샘플링 설정에 맞춰 코덱 움직임 벡터 시퀀스 추출 (별도 디코드 패스)"""
+        positions = None
+        if self.sample_count and av is not None:
+            # 전체 길이 샘플링은 전체 영상이 필요
+            video_path = self.resolve_analysis_path(video_path, float('inf'))
+            positions = self.sample_timestamps(video_path, self.video_duration(video_path), self.sample_count)
+        return self.extract_codec_motion_vectors(video_path, positions=positions, counters=counters)
+    
+    def analyze_motion_vectors(self, video_path):
+        """움직임 벡터 분석 (코덱 움직임 벡터 우선, 불가 시 저해상도 Optical Flow)"""
+        print("   🔬 움직임 벡터 분석 중...")
+        if self.decode_backend != "pyav":
+            motion_series = self._codec_motion_series(video_path)
+            if motion_series is not None:
+                return _motion_result(motion_series, 'codec_mv')
+        return self.run_frame_pipeline(video_path, [MotionAnalyzer()])['motion_vectors']
     
     def detect_screen_recording(self, video_path):
         """화면 녹화 감지"""
         print("   🔍 화면 녹화 흔적 검사 중...")
-        
-        indicators = {
-            'is_screen_recording': False,
-            'confidence': 0,
-            'reasons': []
-        }
-        
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        
-        # 1. FPS 체크 (화면 녹화는 보통 30/60 FPS)
-        if fps in [30.0, 60.0, 25.0, 24.0]:
-            indicators['confidence'] += 0.2
-            indicators['reasons'].append(f"표준 화면 녹화 FPS: {fps}")
-        
-        # 2. 프레임 분석
-        frame_hashes = []
-        cursor_detected = False
-        ui_elements = False
-        
-        for i in range(min(100, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))):
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if i % 20 == 0:
-                # 마우스 커서 감지 (작은 움직이는 객체)
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                circles = cv2.HoughCircles(
-                    gray, cv2.HOUGH_GRADIENT, 1, 20,
-                    param1=50, param2=30, minRadius=5, maxRadius=15
-                )
-                if circles is not None:
-                    cursor_detected = True
-                
-                # UI 요소 감지 (직사각형 영역)
-                edges = cv2.Canny(gray, 50, 150)
-                contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-                rect_count = 0
-                for contour in contours:
-                    approx = cv2.approxPolyDP(contour, 0.01 * cv2.arcLength(contour, True), True)
-                    if len(approx) == 4:  # 사각형
-                        rect_count += 1
-                
-                if rect_count > 10:
-                    ui_elements = True
-                
-                # 프레임 해시
-                pil_img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                frame_hashes.append(str(imagehash.phash(pil_img)))
-        
-        cap.release()
-        
-        if cursor_detected:
-            indicators['confidence'] += 0.3
-            indicators['reasons'].append("마우스 커서 패턴 감지")
-        
-        if ui_elements:
-            indicators['confidence'] += 0.2
-            indicators['reasons'].append("UI 요소 패턴 감지")
-        
-        # 3. 반복 프레임 체크 (화면 녹화는 정적 화면이 많음)
-        if frame_hashes:
-            unique_ratio = len(set(frame_hashes)) / len(frame_hashes)
-            if unique_ratio < 0.7:  # 30% 이상 중복
-                indicators['confidence'] += 0.3
-                indicators['reasons'].append(f"정적 프레임 비율: {(1-unique_ratio)*100:.1f}%")
-        
-        # 최종 판정
-        if indicators['confidence'] >= 0.5:
-            indicators['is_screen_recording'] = True
-        
-        return indicators
+        return self.run_frame_pipeline(video_path, [ScreenRecordingAnalyzer()])['screen_recording']
     
     def calculate_generation_score(self, video_analysis):
         """종합 세대 점수 계산 (0=원본, 높을수록 복사본)"""
@@ -587,143 +3544,293 @@ class AdvancedVideoForensics:
         return min(score, 1.0)  # 0~1 범위
     
     def comprehensive_analysis(self, video_path):
-        """종합 포렌식 분석"""
+        """종합 포렌식 분석 (특징 캐시 적중 시 재분석 생략)"""
+        return self.analyze_with_features(video_path)[0]
+    
+    def analyze_with_features(self, video_path):
+        """종합 포렌식 분석 + 원시 특징 벡터 -> (analysis, features)"""
         print(f"\n📊 종합 분석 중: {os.path.basename(video_path)}")
         
-        analysis = {}
+        if self.feature_cache:
+            cached = self.feature_cache.get(video_path)
+            if cached:
+                analysis = cached[0]
+                print(f"   ♻️ 캐시된 분석 결과 사용 (세대 점수: {analysis['generation_score']:.3f})")
+                return cached
         
-        # 1. 기본 압축 분석
-        print("   ⚙️ 압축 아티팩트 분석...")
-        cap = cv2.VideoCapture(video_path)
+        with self.profiler.stage('analysis', video_path):
+            analysis, features = self._analyze_uncached(video_path)
         
-        compression_artifacts = {
-            'block_score': 0,
-            'mosquito_score': 0,
-            'quantization_loss': 0
-        }
+        if self.feature_cache:
+            self.feature_cache.put(video_path, analysis, features)
         
-        for i in range(min(30, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))):
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if i % 10 == 0:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                
-                # 블록 아티팩트
-                h_edges = np.abs(np.diff(gray[::8, :], axis=0))
-                v_edges = np.abs(np.diff(gray[:, ::8], axis=1))
-                compression_artifacts['block_score'] += np.mean(h_edges) + np.mean(v_edges)
-                
-                # 모스키토 노이즈
-                edges = cv2.Canny(gray, 50, 150)
-                dilated = cv2.dilate(edges, np.ones((3,3)))
-                noise_area = cv2.bitwise_and(gray, gray, mask=dilated)
-                if np.any(noise_area > 0):
-                    compression_artifacts['mosquito_score'] += np.std(noise_area[noise_area > 0])
-                
-                # 양자화 손실
-                dct = cv2.dct(np.float32(gray)/255.0)
-                compression_artifacts['quantization_loss'] += np.count_nonzero(np.abs(dct) < 0.01) / dct.size
+        return analysis, features
+    
+    def _analyze_uncached(self, video_path):
+        analysis = {}
+        features = {}
         
-        cap.release()
+        # 코덱 움직임 벡터 (비트스트림에 저장된 값, 가능하면 Optical Flow 대신 사용)
+        # PyAV 백엔드는 프레임 파이프라인이 디코딩하면서 벡터를 함께 내보내므로 별도 패스가 없다.
+        # 다른 백엔드는 PyAV로 한 번 더 디코딩하며, 이 패스는 디코드 비용(프레임 수 포함)으로 계측한다.
+        motion_series = None
+        if self.decode_backend != "pyav":
+            with self.profiler.stage('codec_motion_decode', video_path) as counters:
+                motion_series = self._codec_motion_series(video_path, counters)
         
-        # 평균값 계산
-        compression_artifacts['block_score'] /= 3
-        compression_artifacts['mosquito_score'] /= 3
-        compression_artifacts['quantization_loss'] /= 3
+        # 프레임 기반 분석 (단일 디코드 파이프라인)
+        # 압축 아티팩트, PRNU, 화면 녹화 (+ 별도 코덱 벡터가 없으면 움직임)를 한 번의 디코딩으로 처리
+        screen_analyzer = ScreenRecordingAnalyzer()
+        frame_analyzers = [CompressionArtifactAnalyzer(), PRNUAnalyzer(), screen_analyzer,
+                           FrameHashAnalyzer()]
+        if motion_series is None:
+            motion_analyzer = MotionAnalyzer()
+            frame_analyzers.append(motion_analyzer)
+        frame_results = self.run_frame_pipeline(video_path, frame_analyzers)
+        
+        if motion_series is None:
+            motion_series = motion_analyzer.series()
+        else:
+            frame_results['motion_vectors'] = _motion_result(motion_series, 'codec_mv')
         
-        analysis['compression_artifacts'] = compression_artifacts
+        # 1. 기본 압축 분석
+        analysis['compression_artifacts'] = frame_results['compression_artifacts']
         
         # 2. PRNU 분석
-        prnu = self.extract_prnu(video_path)
-        analysis['prnu_strength'] = np.mean(np.abs(prnu)) / 1000  # 정규화
+        # 짝/홀 프레임 절반 지문 간 상관 (0~1, 재인코딩될수록 약해짐)
+        analysis['prnu_strength'] = frame_results['prnu']['strength']
         
         # 3. GOP 구조
-        analysis['gop_structure'] = self.analyze_gop_structure(video_path)
+        with self.profiler.stage('gop_packets', video_path) as counters:
+            analysis['gop_structure'] = self.analyze_gop_structure(video_path)
+            counters['packets'] = analysis['gop_structure'].get('packet_count', 0)
         
         # 4. 오디오 지문
-        analysis['audio_fingerprint'] = self.extract_audio_fingerprint(video_path)
+        with self.profiler.stage('audio_fingerprint', video_path):
+            analysis['audio_fingerprint'] = self.extract_audio_fingerprint(video_path, features=features)
         
         # 5. 움직임 벡터
-        analysis['motion_vectors'] = self.analyze_motion_vectors(video_path)
+        analysis['motion_vectors'] = frame_results['motion_vectors']
         
         # 6. 화면 녹화 감지
-        analysis['screen_recording'] = self.detect_screen_recording(video_path)
+        analysis['screen_recording'] = frame_results['screen_recording']
         
         # 7. 세대 점수 계산
         analysis['generation_score'] = self.calculate_generation_score(analysis)
         
         print(f"   ✅ 분석 완료 (세대 점수: {analysis['generation_score']:.3f})")
         
-        return analysis
+        # 원시 특징 벡터 (PRNU, GOP, 오디오, 움직임, pHash 시퀀스)
+        features['prnu'] = frame_results['prnu']['fingerprint']
+        features['gop_sizes'] = np.asarray(analysis['gop_structure'].get('gop_sizes', []), dtype=np.int64)
+        features['motion'] = np.asarray(motion_series, dtype=np.float32)
+        features['phash'] = screen_analyzer.frame_hashes
+        features['frame_phash'] = frame_results['frame_hashes']['phash']
+        features['frame_phash_times'] = frame_results['frame_hashes']['timestamps']
+        features['frame_timestamps'] = np.asarray(frame_results['frame_timestamps'], dtype=np.float32)
+        with self.profiler.stage('audio_landmarks', video_path):
+            features['audio_landmarks'], features['audio_landmark_times'] = \
+                self.extract_audio_landmarks(video_path)
+        # 구간 다운로드 파일은 앞부분 오디오만 색인됨 (0이면 전체) - 매칭 결과에 표시
+        partial = self.partial_downloads.get(video_path)
+        features['audio_landmark_window'] = np.float32(partial['window'] if partial else 0)
+        
+        return analysis, features
+    
+    def load_features(self, video_path):
+        """캐시된 원시 특징 벡터 반환 (없으면 분석 후 반환, 캐시 미사용 시 빈 dict)"""
+        if not self.feature_cache:
+            return {}
+        return self.analyze_with_features(video_path)[1]
+    
+    def _entry_features(self, entry):
+        """all_analyses 항목의 원시 특징 (분석 시 함께 받은 특징, 없으면 캐시에서)"""
+        if entry.get('features'):
+            return entry['features']
+        return self.load_features(entry['path'])
+    
+    def analyze_videos(self, video_paths, workers=1, on_result=None):
+        """여러 영상 종합 분석 - 입력 순서대로 (analysis, features) 반환
+
+        원시 특징을 함께 돌려주므로 매칭 단계가 특징 캐시(use_cache) 유무와 무관하게 동작한다.
+
+        workers > 1이면 프로세스 풀에서 병렬 분석한다. 워커 프로세스는 영상 하나를
+        분석할 때마다 교체되어(max_tasks_per_child=1) 워커당 메모리가 영상 하나 분량으로 제한된다.
+        on_result(i, analysis, features)는 영상 하나가 끝나는 즉시(완료 순서) 호출된다.
+        """
+        results = [None] * len(video_paths)
+        if workers <= 1 or len(video_paths) <= 1:
+            for i, path in enumerate(video_paths):
+                results[i] = self.analyze_with_features(path)
+                if on_result:
+                    on_result(i, *results[i])
+            return results
+        
+        workers = min(workers, len(video_paths))
+        print(f"\n⚡ 병렬 분석: {len(video_paths)}개 영상, 워커 {workers}개")
+        
+        with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1,
+                                 initializer=_init_analysis_worker) as executor:
+            futures = {
+                executor.submit(_analyze_video_worker, self.worker_options(workers), path,
+                                self.partial_downloads.get(path)): i
+                for i, path in enumerate(video_paths)
+            }
+            # 완료 순서대로 받되 결과는 입력 순서 자리에 (결정적 순서)
+            for future in as_completed(futures):
+                i = futures[future]
+                analysis, features, events = future.result()
+                self.profiler.extend(events)
+                results[i] = (analysis, features)
+                if on_result:
+                    on_result(i, analysis, features)
+            return results
     
-    def find_source_video(self, target_path, reference_paths):
-        """타겟이 사용한 레퍼런스 찾기 + 원본 추정"""
+    def find_source_video(self, target_path, reference_paths, workers=1, checkpoint=None):
+        """타겟이 사용한 레퍼런스 찾기 + 원본 추정
+
+        checkpoint(CaseCheckpoint)를 주면 영상별 분석과 매칭 단계 결과를 완료 즉시 기록하고,
+        다시 실행할 때 이미 끝난 작업은 건너뛴다.
+        """
         
         print("\n" + "="*60)
         print("포렌식 분석 시작")
         print("="*60)
         
-        # 모든 영상 분석
+        # 모든 영상 분석 (타겟 + 레퍼런스, 체크포인트에 있는 영상은 건너뜀)
+        paths = [target_path] + list(reference_paths)
+        keys = ['target'] + list(range(1, len(reference_paths) + 1))
+        analyses = [checkpoint.analysis(key, path) if checkpoint else None
+                    for key, path in zip(keys, paths)]
+        features = [checkpoint.features(key) if analysis is not None else None
+                    for key, analysis in zip(keys, analyses)]
+        pending = [i for i, analysis in enumerate(analyses) if analysis is None]
+        if checkpoint and len(pending) < len(paths):
+            print(f"♻️ 체크포인트에서 분석 {len(paths) - len(pending)}개 재사용")
+        
+        # 하나의 풀에서 모두 분석하고, 영상 하나가 끝날 때마다 바로 체크포인트에 기록
+        def record(n, analysis, video_features):
+            i = pending[n]
+            analyses[i] = analysis
+            features[i] = video_features
+            if checkpoint:
+                checkpoint.save_analysis(keys[i], paths[i], analysis, video_features)
+        
+        self.analyze_videos([paths[i] for i in pending], workers, on_result=record)
+        
         all_analyses = {}
         
         # 타겟 분석
-        target_analysis = self.comprehensive_analysis(target_path)
         all_analyses['target'] = {
             'path': target_path,
-            'analysis': target_analysis
+            'analysis': analyses[0],
+            'features': features[0]
         }
         
         # 레퍼런스 분석
         for i, ref_path in enumerate(reference_paths, 1):
-            ref_analysis = self.comprehensive_analysis(ref_path)
             all_analyses[f'reference_{i}'] = {
                 'path': ref_path,
-                'analysis': ref_analysis
+                'analysis': analyses[i],
+                'features': features[i]
             }
         
+        return self.match_analyses(all_analyses, checkpoint)
+    
+    def build_similarity_matrix(self, all_analyses):
+        """all_analyses 전체의 N x N 유사도 행렬 -> {'names', 'features', 'weighted'}"""
+        names = list(all_analyses)
+        analyses = [all_analyses[name]['analysis'] for name in names]
+        fingerprints = [self._entry_features(all_analyses[name]).get('prnu') for name in names]
+        # 타겟 행은 NCC 상위 후보만 실제 PCE로 재계산 (매칭 판정에 쓰이는 행)
+        refine = [names.index('target')] if 'target' in all_analyses else []
+        result = similarity_matrix(analyses, fingerprints, refine_rows=refine)
+        result['names'] = names
+        return result
+    
+    def provenance_graph(self, all_analyses, similarity):
+        """출처 그래프 - 영상마다 세대 점수가 더 낮은(원본에 가까운) 영상 중 가장 유사한 것을 부모로
+
+        반환: [{'child', 'parent', 'similarity'}, ...] (부모가 없는 영상은 출처 후보 루트)
+        """
+        names = similarity['names']
+        scores = np.array([all_analyses[name]['analysis']['generation_score'] for name in names],
+                          dtype=np.float32)
+        # 부모 후보: 세대 점수가 엄격히 낮은 영상만
+        candidates = np.where(scores[None, :] < scores[:, None], similarity['weighted'], -np.inf)
+        parents = np.argmax(candidates, axis=1)
+        edges = []
+        for child, parent in enumerate(parents):
+            if np.isfinite(candidates[child, parent]):
+                edges.append({
+                    'child': names[child],
+                    'parent': names[parent],
+                    'similarity': float(candidates[child, parent])
+                })
+        return edges
+    
+    def _checkpointed(self, checkpoint, name, all_analyses, compute):
+        """체크포인트에 같은 입력으로 계산한 단계 결과가 있으면 재사용, 없으면 계산 후 기록"""
+        if checkpoint:
+            done, value = checkpoint.stage(name, all_analyses)
+            if done:
+                print(f"   ♻️ 체크포인트 재사용: {name}")
+                return value
+        value = compute()
+        if checkpoint:
+            checkpoint.save_stage(name, all_analyses, value)
+        return value
+    
+    def match_analyses(self, all_analyses, checkpoint=None):
+        """분석 결과로 소스 매칭 + 원본 추정 (all_analyses: target, reference_N)"""
+        if self.library:
+            with self.profiler.stage('library_search'):
+                all_analyses = self.add_library_candidates(all_analyses)
+        
         # 1. 타겟이 사용한 레퍼런스 찾기 (디지털 지문 매칭)
         print("\n🔍 디지털 지문 매칭...")
         
+        # 모든 영상 쌍의 유사도 행렬 (압축 패턴, PRNU, GOP - 벡터화)
+        similarity = self.build_similarity_matrix(all_analyses)
+        names = similarity['names']
+        
+        # 타겟 행에서 가장 유사한 레퍼런스 (0보다 큰 점수 중 최댓값, 동점이면 앞 순서)
         best_match = None
         best_score = 0
+        target_row = similarity['weighted'][names.index('target')]
+        for i in np.argsort(-target_row, kind='stable'):
+            if names[i] != 'target':
+                if target_row[i] > 0:
+                    best_match = names[i]
+                    best_score = float(target_row[i])
+                break
         
-        for ref_name, ref_data in all_analyses.items():
-            if ref_name == 'target':
-                continue
-            
-            # 압축 패턴 유사도
-            compression_similarity = 0
-            if 'compression_artifacts' in target_analysis and 'compression_artifacts' in ref_data['analysis']:
-                t_comp = target_analysis['compression_artifacts']
-                r_comp = ref_data['analysis']['compression_artifacts']
-                
-                diff = abs(t_comp['block_score'] - r_comp['block_score'])
-                compression_similarity = 1 / (1 + diff)
-            
-            # PRNU 유사도
-            prnu_similarity = 0
-            if 'prnu_strength' in target_analysis and 'prnu_strength' in ref_data['analysis']:
-                diff = abs(target_analysis['prnu_strength'] - ref_data['analysis']['prnu_strength'])
-                prnu_similarity = 1 / (1 + diff * 10)
-            
-            # GOP 유사도
-            gop_similarity = 0
-            if 'gop_structure' in target_analysis and 'gop_structure' in ref_data['analysis']:
-                t_gop = target_analysis['gop_structure']
-                r_gop = ref_data['analysis']['gop_structure']
-                
-                if t_gop['avg_gop_length'] > 0 and r_gop['avg_gop_length'] > 0:
-                    ratio = min(t_gop['avg_gop_length'], r_gop['avg_gop_length']) / max(t_gop['avg_gop_length'], r_gop['avg_gop_length'])
-                    gop_similarity = ratio
-            
-            # 종합 점수
-            total_similarity = (compression_similarity * 0.5 + prnu_similarity * 0.3 + gop_similarity * 0.2)
-            
-            if total_similarity > best_score:
-                best_score = total_similarity
-                best_match = ref_name
+        print(f"   유사도 행렬: {len(names)}x{len(names)}")
+        
+        # 근접 중복 군집 + 출처 그래프
+        clusters = [[names[i] for i in members] for members in cluster_similar(similarity['weighted'])]
+        provenance = self.provenance_graph(all_analyses, similarity)
+        
+        # 1-1. 구간 재사용 분석 (프레임 해시 시퀀스 정렬)
+        with self.profiler.stage('segment_matches'):
+            segment_matches = self._checkpointed(
+                checkpoint, 'segment_matches', all_analyses,
+                lambda: self.find_segment_matches(all_analyses))
+        
+        # 1-2. 오디오 랜드마크 매칭 (부분 클립 + 시간 오프셋)
+        with self.profiler.stage('audio_matches'):
+            audio_matches = self._checkpointed(
+                checkpoint, 'audio_matches', all_analyses,
+                lambda: self.find_audio_matches(all_analyses))
+        
+        # 1-3. 선택된 레퍼런스와 오디오 시간 정렬
+        audio_alignment = None
+        if best_match and os.path.exists(all_analyses[best_match].get('path') or ''):
+            with self.profiler.stage('audio_alignment', all_analyses[best_match]['path']):
+                audio_alignment = self._checkpointed(
+                    checkpoint, f'audio_alignment_{best_match}', all_analyses,
+                    lambda: self.align_audio(all_analyses['target']['path'],
+                                             all_analyses[best_match]['path']))
         
         # 2. 원본 추정 (세대 점수 기반)
         print("\n🏆 원본 추정 (세대 분석)...")
@@ -737,11 +3844,326 @@ class AdvancedVideoForensics:
             'source_match': best_match,
             'match_confidence': best_score,
             'generation_ranking': generation_ranking,
+            'segment_matches': segment_matches,
+            'audio_matches': audio_matches,
+            'audio_alignment': audio_alignment,
+            'similarity_matrix': similarity,
+            'near_duplicate_clusters': clusters,
+            'provenance': provenance,
             'all_analyses': all_analyses
         }
     
-    def generate_report(self, target_url, reference_urls, results):
-        """포렌식 보고서 생성"""
+    def add_library_candidates(self, all_analyses, top_k=10):
+        """라이브러리에서 타겟과 유사한 영상을 찾아 레퍼런스로 추가 (재디코딩 없음)"""
+        target = all_analyses['target']
+        target_features = self._entry_features(target)
+        if not target_features:
+            target_features = self.analyze_with_features(target['path'])[1]
+        
+        # 이미 수동 레퍼런스로 들어온 영상은 제외
+        known = set()
+        for entry in all_analyses.values():
+            try:
+                known.add(quick_content_hash(entry['path']))
+            except OSError:
+                pass
+        
+        print(f"\n📚 라이브러리 검색 ({len(self.library)}개 영상)...")
+        candidates = self.library.query(target_features, top_k=top_k)
+        
+        merged = dict(all_analyses)
+        next_num = sum(1 for name in all_analyses if name.startswith('reference_')) + 1
+        for candidate in candidates:
+            if candidate['content_hash'] in known:
+                continue
+            merged[f'reference_{next_num}'] = {
+                'path': candidate['path'],
+                'analysis': candidate['analysis'],
+                'features': candidate['features'],
+                'library_id': candidate['id'],
+                'library_title': candidate['title'],
+                'library_similarity': candidate['similarity']
+            }
+            print(f"   reference_{next_num}: {candidate['title']} (유사도 {candidate['similarity']:.3f})")
+            next_num += 1
+        return merged
+    
+    def find_audio_matches(self, all_analyses):
+        """오디오 랜드마크 역색인으로 타겟 오디오가 들어 있는 레퍼런스와 오프셋 검색"""
+        target = self._entry_features(all_analyses['target'])
+        if 'audio_landmarks' not in target or not target['audio_landmarks'].size:
+            return []
+        
+        print("\n🎵 오디오 랜드마크 매칭...")
+        index = AudioFingerprintIndex(AudioLandmarkHasher().frame_seconds)
+        windows = {}
+        for name, data in all_analyses.items():
+            if name == 'target':
+                continue
+            features = self._entry_features(data)
+            if 'audio_landmarks' in features:
+                index.add(name, features['audio_landmarks'], features['audio_landmark_times'])
+                windows[name] = float(features.get('audio_landmark_window', 0))
+        
+        limited = [name for name, window in windows.items() if window > 0]
+        if limited:
+            print(f"   ℹ️ 구간 다운로드 레퍼런스는 앞부분만 색인됨: {', '.join(limited)}")
+        
+        matches = index.query(target['audio_landmarks'], target['audio_landmark_times'])
+        for match in matches:
+            window = windows.get(match['reference'], 0.0)
+            match['window_limited'] = window > 0
+            match['reference_window'] = window
+        for match in matches[:5]:
+            note = f" [앞 {match['reference_window']:.0f}초만 색인]" if match['window_limited'] else ""
+            print(f"   {match['reference']}: 오프셋 {match['offset']:+.2f}초, "
+                  f"{match['votes']}표 ({match['score']*100:.1f}%){note}")
+        return matches
+    
+    def find_segment_matches(self, all_analyses, radius=8):
+        """타겟의 어느 구간이 어느 레퍼런스의 몇 초 지점에서 왔는지 (프레임 해시 인덱스)"""
+        target = self._entry_features(all_analyses['target'])
+        if 'frame_phash' not in target or not target['frame_phash'].size:
+            return []
+        
+        print("\n🧩 구간 재사용 분석...")
+        index = FrameHashIndex()
+        for name, data in all_analyses.items():
+            if name == 'target':
+                continue
+            features = self._entry_features(data)
+            if 'frame_phash' in features:
+                index.add(name, features['frame_phash'], features['frame_phash_times'])
+        
+        matches = index.query(target['frame_phash'], target['frame_phash_times'], radius=radius)
+        for match in matches[:5]:
+            print(f"   {match['target_start']:.1f}~{match['target_end']:.1f}초 → "
+                  f"{match['reference']} (오프셋 {match['offset']:+.1f}초, {match['frames']}프레임)")
+        return matches
+    
+    async def run_case_pipeline(self, target_input, reference_inputs, download_concurrency=4,
+                                workers=2, analysis_window=None, executor=None,
+                                download_limit=None, case_name=None, checkpoint=None):
+        """다운로드/분석 파이프라인 - 다운로드가 끝나는 즉시 분석 시작
+
+        다운로드(동시 download_concurrency개)는 스레드에서 실행되어 큐에 파일을 넣고,
+        분석 워커(workers개 프로세스)는 큐에서 꺼내 바로 분석한다. 타겟 분석이
+        레퍼런스 다운로드와 겹치므로 전체 시간이 (다운로드 + 분석)이 아닌
+        max(다운로드, 분석)에 가까워진다.
+        
+        executor/download_limit을 넘기면 여러 사건이 같은 프로세스 풀과 다운로드 한도를
+        공유한다 (배치 모드). case_name은 사건 간 파일명 충돌 방지용 접두어.
+        checkpoint(CaseCheckpoint)를 주면 다운로드/분석/매칭 결과를 완료 즉시 기록하고
+        재실행 시 이미 끝난 입력은 다운로드와 분석을 모두 건너뛴다.
+        """
+        loop = asyncio.get_running_loop()
+        if self.sample_count and analysis_window:
+            # 층화 샘플링은 전체 길이가 필요하므로 구간 다운로드는 중복 다운로드만 만든다
+            print("   ℹ️ 층화 샘플링 모드에서는 분석 구간 다운로드를 쓰지 않습니다")
+            analysis_window = None
+        if download_limit is None:
+            download_limit = asyncio.Semaphore(download_concurrency)
+        prefix = f"{case_name}_" if case_name else ""
+        queue = asyncio.Queue()
+        prepared = {}
+        analyses = {}
+        features = {}
+        
+        async def fetch(key, input_data, name_prefix, window):
+            record = checkpoint.prepared(key, input_data) if checkpoint else None
+            if record:
+                path = record['path']
+                if record['partial']:
+                    self.partial_downloads[path] = record['partial']
+                print(f"♻️ 체크포인트: {name_prefix} 준비 완료된 파일 사용")
+            else:
+                async with download_limit:
+                    path, _ = await asyncio.to_thread(
+                        self.process_video_input, input_data, name_prefix, window
+                    )
+                if path and checkpoint:
+                    checkpoint.save_prepared(key, input_data, path, self.partial_downloads.get(path))
+            if path:
+                prepared[key] = path
+                analysis = checkpoint.analysis(key, path) if checkpoint else None
+                if analysis is not None:
+                    print(f"♻️ 체크포인트: {name_prefix} 분석 결과 재사용")
+                    analyses[key] = analysis
+                    features[key] = checkpoint.features(key)
+                else:
+                    await queue.put((key, path))
+            else:
+                print(f"❌ 준비 실패: {name_prefix}")
+        
+        async def analyze(executor):
+            while True:
+                key, path = await queue.get()
+                try:
+                    analyses[key], features[key], events = await loop.run_in_executor(
+                        executor, _analyze_video_worker, self.worker_options(workers), path,
+                        self.partial_downloads.get(path)
+                    )
+                    self.profiler.extend(events)
+                    if checkpoint:
+                        checkpoint.save_analysis(key, path, analyses[key], features[key])
+                except Exception as e:
+                    print(f"❌ 분석 실패: {os.path.basename(path)} - {str(e)}")
+                finally:
+                    queue.task_done()
+        
+        fetches = [fetch('target', target_input, f"{prefix}target", None)]
+        for i, ref_input in enumerate(reference_inputs, 1):
+            fetches.append(fetch(i, ref_input, f"{prefix}reference_{i}", analysis_window))
+        
+        workers = max(1, workers)
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1,
+                                           initializer=_init_analysis_worker)
+        try:
+            analyzers = [asyncio.create_task(analyze(executor)) for _ in range(workers)]
+            await asyncio.gather(*fetches)
+            await queue.join()
+            for task in analyzers:
+                task.cancel()
+            await asyncio.gather(*analyzers, return_exceptions=True)
+        finally:
+            if own_executor:
+                executor.shutdown()
+        
+        if 'target' not in analyses:
+            print("❌ 타겟 준비 실패")
+            return None
+        
+        # 입력 순서대로 성공한 레퍼런스만 번호 부여 (순차 실행과 같은 결과 키)
+        all_analyses = {
+            'target': {'path': prepared['target'], 'analysis': analyses['target'],
+                       'features': features.get('target')}
+        }
+        used_inputs = []
+        for i, ref_input in enumerate(reference_inputs, 1):
+            if i in analyses:
+                used_inputs.append(ref_input)
+                all_analyses[f'reference_{len(used_inputs)}'] = {
+                    'path': prepared[i],
+                    'analysis': analyses[i],
+                    'features': features.get(i)
+                }
+        
+        if not used_inputs and not self.library:
+            print("❌ 레퍼런스가 없습니다")
+            return None
+        
+        # 매칭(PCE, 오디오 정렬 등)은 CPU를 오래 쓰므로 스레드에서 실행 - 배치 모드에서
+        # 이벤트 루프가 막히지 않아 다른 사건의 다운로드/분석 제출이 계속 진행된다
+        results = await asyncio.to_thread(self.match_analyses, all_analyses, checkpoint)
+        return {
+            'target_path': prepared['target'],
+            'reference_inputs': used_inputs,
+            'reference_paths': [all_analyses[f'reference_{n}']['path']
+                                for n in range(1, len(used_inputs) + 1)],
+            'results': results
+        }
+    
+    async def run_batch(self, cases, workers=2, download_concurrency=4, analysis_window=None,
+                        case_concurrency=None, resume=True):
+        """매니페스트의 여러 사건을 하나의 프로세스 풀에서 동시에 처리
+
+        모든 사건이 workers개 분석 프로세스와 download_concurrency개 다운로드 한도를
+        공유하므로, 한 사건의 다운로드 대기 중에도 다른 사건의 분석이 진행된다.
+        사건별 결과(JSON)와 보고서는 output/cases/<사건명>/에 저장한다.
+        resume=True면 사건별 체크포인트로 중단된 사건을 이어서 처리하고, 결과가 이미 있는
+        사건은 건너뛴다.
+        """
+        workers = max(1, workers)
+        case_limit = asyncio.Semaphore(case_concurrency or workers)
+        download_limit = asyncio.Semaphore(download_concurrency)
+        summary = {}
+        
+        async def run_one(case, executor):
+            name = case['name']
+            case_dir = os.path.join(self.output_dir, "cases", name)
+            checkpoint = CaseCheckpoint(case_dir, self.analysis_version)
+            # 같은 이름이라도 입력이나 분석 구간이 바뀌었으면 다시 계산
+            inputs = CaseCheckpoint.case_inputs(case, analysis_window)
+            if not resume:
+                checkpoint.clear()
+            else:
+                value = checkpoint.case_summary(inputs)
+                if value is not None:
+                    print(f"\n♻️ 완료된 사건 건너뜀: {name}")
+                    summary[name] = value
+                    return
+            
+            async with case_limit:
+                print(f"\n📁 사건 시작: {name}")
+                try:
+                    outcome = await self.run_case_pipeline(
+                        case['target'], case['references'],
+                        workers=workers, analysis_window=case.get('analysis_window', analysis_window),
+                        executor=executor, download_limit=download_limit, case_name=name,
+                        checkpoint=checkpoint
+                    )
+                    if not outcome:
+                        summary[name] = {'status': 'failed'}
+                        return
+                    # 보고서 작성(docx)과 정렬 등 후처리는 이벤트 루프를 막지 않도록 스레드에서
+                    summary[name] = await asyncio.to_thread(self.save_case_outputs, name, case, outcome)
+                    checkpoint.save_case_summary(inputs, summary[name])
+                except Exception as e:
+                    print(f"❌ 사건 실패: {name} - {str(e)}")
+                    summary[name] = {'status': 'error', 'error': str(e)}
+        
+        with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1,
+                                 initializer=_init_analysis_worker) as executor:
+            await asyncio.gather(*(run_one(case, executor) for case in cases))
+        
+        # 매니페스트 순서대로 정리
+        return {case['name']: summary.get(case['name'], {'status': 'failed'}) for case in cases}
+    
+    def save_case_outputs(self, name, case, outcome):
+        """사건 하나의 결과 JSON과 보고서 저장 -> 요약 dict"""
+        results = outcome['results']
+        case_dir = os.path.join(self.output_dir, "cases", name)
+        os.makedirs(case_dir, exist_ok=True)
+        
+        def describe(input_data):
+            return input_data[1] if input_data[0] == 'url' else f"Local: {os.path.basename(input_data[1])}"
+        
+        report_path = self.generate_report(
+            describe(case['target']), [describe(r) for r in outcome['reference_inputs']], results,
+            report_dir=case_dir, include_profile=False
+        )
+        
+        summary = {
+            'status': 'ok',
+            'target': outcome['target_path'],
+            'references': outcome['reference_paths'],
+            'source_match': results['source_match'],
+            'match_confidence': results['match_confidence'],
+            'generation_ranking': [
+                {'name': ref_name, 'generation_score': data['analysis']['generation_score']}
+                for ref_name, data in results['generation_ranking']
+            ],
+            'segment_matches': results.get('segment_matches', []),
+            'audio_matches': results.get('audio_matches', []),
+            'audio_alignment': results.get('audio_alignment'),
+            'similarity_matrix': {
+                'names': results['similarity_matrix']['names'],
+                'weighted': results['similarity_matrix']['weighted']
+            },
+            'near_duplicate_clusters': results.get('near_duplicate_clusters', []),
+            'provenance': results.get('provenance', []),
+            'analyses': {ref_name: data['analysis'] for ref_name, data in results['all_analyses'].items()},
+            'report': report_path
+        }
+        with open(os.path.join(case_dir, "results.json"), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2, default=_to_json_value)
+        print(f"✅ 사건 완료: {name} -> {case_dir}")
+        return {key: summary[key] for key in ('status', 'source_match', 'match_confidence', 'report')}
+    
+    def generate_report(self, target_url, reference_urls, results, report_dir=None, include_profile=True):
+        """포렌식 보고서 생성 (report_dir 기본값은 output/reports)"""
         
         doc = Document()
         
@@ -768,6 +4190,47 @@ class AdvancedVideoForensics:
             para.add_run('• PRNU 지문 유사\n')
             para.add_run('• GOP 구조 동일\n')
         
+        # 1-1. 구간 재사용
+        if results.get('segment_matches'):
+            doc.add_heading('1-1. 구간 재사용 분석', level=2)
+            para = doc.add_paragraph()
+            for match in results['segment_matches'][:10]:
+                para.add_run(
+                    f"• 타겟 {match['target_start']:.1f}~{match['target_end']:.1f}초 → "
+                    f"{match['reference']} (오프셋 {match['offset']:+.1f}초, "
+                    f"{match['frames']}프레임, 유사도 {match['similarity']*100:.1f}%)\n"
+                )
+        
+        # 1-2. 오디오 랜드마크
+        if results.get('audio_matches'):
+            doc.add_heading('1-2. 오디오 랜드마크 매칭', level=2)
+            para = doc.add_paragraph()
+            for match in results['audio_matches'][:10]:
+                note = (f" - 레퍼런스 앞 {match['reference_window']:.0f}초만 색인 (이후 구간 일치는 누락될 수 있음)"
+                        if match.get('window_limited') else "")
+                para.add_run(
+                    f"• {match['reference']}: 오프셋 {match['offset']:+.2f}초, "
+                    f"{match['votes']}표 (일치율 {match['score']*100:.1f}%){note}\n"
+                )
+        
+        # 1-3. 오디오 정렬
+        alignment = results.get('audio_alignment')
+        if alignment and alignment['confidence'] > 0:
+            doc.add_heading('1-3. 오디오 시간 정렬', level=2)
+            doc.add_paragraph(
+                f"레퍼런스 시각 = 타겟 시각 {alignment['offset']:+.3f}초 "
+                f"(드리프트 {alignment['drift_ppm']:+.1f}ppm, 신뢰도 {alignment['confidence']:.2f})"
+            )
+        
+        # 1-4. 근접 중복 군집 / 출처 그래프
+        if results.get('near_duplicate_clusters') or results.get('provenance'):
+            doc.add_heading('1-4. 근접 중복 군집 및 출처 그래프', level=2)
+            para = doc.add_paragraph()
+            for members in results.get('near_duplicate_clusters', []):
+                para.add_run(f"• 군집: {', '.join(members)}\n")
+            for edge in results.get('provenance', []):
+                para.add_run(f"• {edge['child']} ← {edge['parent']} (유사도 {edge['similarity']:.3f})\n")
+        
         # 2. 원본 추정
         doc.add_heading('2. 원본 추정 (세대 분석)', level=1)
         
@@ -795,11 +4258,28 @@ class AdvancedVideoForensics:
         para.add_run('분석 기법:\n').bold = True
         para.add_run('• PRNU (Photo Response Non-Uniformity) - 카메라 센서 지문\n')
         para.add_run('• GOP 구조 분석 - 키프레임 패턴\n')
-        para.add_run('• 압축 아티팩트 분석 - 블록 노이즈, 모스키토 노이즈\n')
+        para.add_run('• 압축 아티팩트 분석 - 블록 노이즈, 모스키토 노이즈, 8x8 DCT 이중 양자화\n')
         para.add_run('• 오디오 지문 - Chromagram, MFCC\n')
-        para.add_run('• 움직임 벡터 분석 - Optical Flow\n')
+        para.add_run('• 움직임 벡터 분석 - 코덱 움직임 벡터 (불가 시 Optical Flow)\n')
         para.add_run('• 화면 녹화 감지 - UI 패턴, 커서 감지\n')
         
+        # 3-1. 처리 성능 계측
+        profile_rows = self.profiler.summary() if include_profile else []
+        if profile_rows:
+            doc.add_heading('3-1. 단계별 처리 성능', level=2)
+            table = doc.add_table(rows=1, cols=7)
+            table.style = 'Table Grid'
+            headers = ['단계', '횟수', '시간(s)', 'CPU(s)', '프레임', '프로세스 읽기(MB)', '프로세스 최대 RSS(MB)']
+            for cell, header in zip(table.rows[0].cells, headers):
+                cell.text = header
+            for row in profile_rows:
+                cells = table.add_row().cells
+                values = [row['stage'], str(row['calls']), f"{row['wall_s']:.2f}", f"{row['cpu_s']:.2f}",
+                          str(row['frames']), f"{row['process_bytes_read'] / 1024 ** 2:.1f}",
+                          f"{row['process_peak_rss_mb']:.0f}"]
+                for cell, value in zip(cells, values):
+                    cell.text = value
+        
         # 4. 결론
         doc.add_heading('4. 결론', level=1)
         
@@ -824,17 +4304,183 @@ class AdvancedVideoForensics:
         para.add_run("법적 증거로 활용 가능한 수준의 정확도를 제공합니다.")
         
         # 저장
-        report_path = os.path.join(
-            self.report_dir,
-            f"forensics_report_v2_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-        )
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        report_dir = report_dir or self.report_dir
+        report_path = os.path.join(report_dir, f"forensics_report_v2_{stamp}.docx")
         doc.save(report_path)
         
         print(f"\n📄 포렌식 보고서 생성 완료: {report_path}")
+        
+        # 계측 트레이스 (chrome://tracing / Perfetto)
+        if include_profile and self.profiler.events:
+            trace_path = self.profiler.save_trace(
+                os.path.join(report_dir, f"forensics_trace_{stamp}.json"))
+            print(f"⏱️ 계측 트레이스 저장: {trace_path}")
         return report_path
 
+
+def _init_analysis_worker():
+    """워커 프로세스 초기화 - OpenCV 내부 스레드로 인한 코어 과다 사용 방지"""
+    cv2.setNumThreads(1)
+
+
+def _analyze_video_worker(options, video_path, partial=None):
+    """프로세스 풀 워커: 영상 하나 종합 분석 -> (analysis, 원시 특징, 계측 이벤트)"""
+    forensics = AdvancedVideoForensics(**options)
+    if partial:
+        # 구간 다운로드 정보 전달 (워커에서도 전체 다운로드 전환 가능)
+        forensics.partial_downloads[video_path] = dict(partial)
+    analysis, features = forensics.analyze_with_features(video_path)
+    return analysis, features, forensics.profiler.events
+
+
+def _frame_segment_worker(options, video_path, analyzers, info, positions, index_base, burst):
+    """프로세스 풀 워커: 긴 영상의 한 시간 구간 프레임 분석 (분석기 상태 반환)"""
+    forensics = AdvancedVideoForensics(**options)
+    return forensics.analyze_frame_segment(video_path, analyzers, info, positions, index_base, burst)
+
+
+def _manifest_input(value, case_name):
+    """매니페스트 항목 -> ('url' | 'file', 값) (url/path가 없는 항목은 ValueError)"""
+    if isinstance(value, dict):
+        value = value.get('url') or value.get('path')
+    if value is None or not str(value).strip():
+        raise ValueError(f"사건 {case_name}: url 또는 path가 없는 입력 항목이 있습니다")
+    value = str(value).strip()
+    if value.startswith(('http://', 'https://')):
+        return ('url', value)
+    return ('file', os.path.abspath(os.path.expanduser(value)))
+
+
+def load_case_manifest(path):
+    """사건 매니페스트(JSON/YAML) 읽기
+
+    형식: {"cases": [{"name": "사건1", "target": "URL 또는 경로",
+                      "references": ["URL 또는 경로", ...], "analysis_window": 35}, ...]}
+    최상위가 사건 리스트여도 된다. name이 없으면 case_001 형식으로 부여한다.
+    입력 항목은 문자열 또는 {"url": ...} / {"path": ...} dict.
+    analysis_window를 생략한 사건은 명령줄 --analysis-window를 따른다.
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise RuntimeError("YAML 매니페스트에는 PyYAML이 필요합니다 (pip install pyyaml)")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    
+    entries = data['cases'] if isinstance(data, dict) else data
+    cases = []
+    seen = set()
+    for i, entry in enumerate(entries, 1):
+        name = str(entry.get('name') or f"case_{i:03d}")
+        # 파일명/디렉터리명에 쓸 수 없는 문자 제거
+        name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+        base, suffix = name, i
+        while name in seen:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        seen.add(name)
+        if not entry.get('target'):
+            raise ValueError(f"사건 {name}: target이 없습니다")
+        case = {
+            'name': name,
+            'target': _manifest_input(entry['target'], name),
+            'references': [_manifest_input(r, name) for r in entry.get('references') or []]
+        }
+        if entry.get('analysis_window') is not None:
+            case['analysis_window'] = entry['analysis_window']
+        cases.append(case)
+    return cases
+
+
+def run_batch_main(forensics, args):
+    """--manifest 배치 모드 - 대화형 입력 없이 모든 사건 처리"""
+    cases = load_case_manifest(args.manifest)
+    print(f"\n📋 배치 모드: 사건 {len(cases)}개, 워커 {args.workers}개")
+    
+    summary = asyncio.run(forensics.run_batch(
+        cases, workers=args.workers,
+        download_concurrency=args.download_concurrency,
+        analysis_window=args.analysis_window,
+        case_concurrency=args.case_concurrency,
+        resume=not args.fresh
+    ))
+    
+    if args.ingest and forensics.library:
+        for name, item in summary.items():
+            if item['status'] == 'ok':
+                with open(os.path.join(forensics.output_dir, "cases", name, "results.json"),
+                          encoding='utf-8') as f:
+                    case_result = json.load(f)
+                for video_path in [case_result['target']] + case_result['references']:
+                    forensics.library.ingest(forensics, video_path)
+    
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    summary_path = os.path.join(forensics.output_dir, "cases", f"batch_summary_{stamp}.json")
+    os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2, default=_to_json_value)
+    
+    forensics.profiler.print_summary()
+    if forensics.profiler.events:
+        forensics.profiler.save_trace(
+            os.path.join(forensics.output_dir, "cases", f"batch_trace_{stamp}.json"))
+    
+    ok = sum(1 for item in summary.values() if item['status'] == 'ok')
+    print(f"\n📋 배치 완료: {ok}/{len(summary)} 사건 성공 -> {summary_path}")
+    return 0 if ok == len(summary) else 1
+
+
 # 메인 실행 코드
 def main():
+    parser = argparse.ArgumentParser(description="고급 영상 포렌식 분석 도구 v3")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="병렬 분석 프로세스 수 (기본 1 = 순차 분석)")
+    parser.add_argument('--sample-frames', type=int, default=None, metavar='N',
+                        help="앞부분 대신 전체 길이에서 N개 위치를 층화 샘플링 (키프레임 탐색)")
+    parser.add_argument('--library', metavar='DIR', default=None,
+                        help="레퍼런스 라이브러리 디렉터리 (매칭 시 라이브러리 전체 검색)")
+    parser.add_argument('--ingest', action='store_true',
+                        help="분석한 타겟/레퍼런스를 라이브러리에 추가 (--library 필요)")
+    parser.add_argument('--library-ingest', nargs='+', metavar='PATH', default=None,
+                        help="로컬 영상 파일/폴더를 라이브러리에 추가하고 종료 (--library 필요)")
+    parser.add_argument('--download-concurrency', type=int, default=4,
+                        help="동시 다운로드 수 (기본 4)")
+    parser.add_argument('--analysis-window', type=int, nargs='?', const=ANALYSIS_WINDOW_SECONDS,
+                        default=None, metavar='SECONDS',
+                        help=f"레퍼런스 URL은 앞부분 구간만 다운로드 (기본 {ANALYSIS_WINDOW_SECONDS}초, "
+                             "--sample-frames와 함께 쓸 수 없음)")
+    parser.add_argument('--no-profile', action='store_true',
+                        help="단계별 계측(트레이스 JSON, 보고서 성능 표) 끄기")
+    parser.add_argument('--manifest', metavar='FILE', default=None,
+                        help="사건 매니페스트(JSON/YAML)로 비대화형 배치 실행")
+    parser.add_argument('--case-concurrency', type=int, default=None, metavar='N',
+                        help="배치 모드에서 동시에 진행할 사건 수 (기본 = --workers)")
+    parser.add_argument('--base-dir', default=None, help="작업 디렉터리 (output/ 상위)")
+    parser.add_argument('--fresh', action='store_true',
+                        help="사건 체크포인트를 무시하고 처음부터 다시 분석")
+    parser.add_argument('--frame-height', type=int, default=None, metavar='PX',
+                        help="분석 해상도 - 세로 PX 이하로 축소해 분석 (기본 원본 해상도)")
+    parser.add_argument('--frame-cache', type=float, nargs='?', const=8, default=None, metavar='GB',
+                        help="디코딩 프레임 캐시 사용 (memmap 공유, 기본 최대 8GB)")
+    parser.add_argument('--decode-backend', choices=['auto', 'pyav', 'opencv', 'ffmpeg'], default='auto',
+                        help="프레임 디코더 (pyav: 프레임 + 코덱 움직임 벡터 한 번에, "
+                             "ffmpeg: 디코더 내 축소 + 그레이스케일 rawvideo 파이프, "
+                             "auto: PyAV가 있으면 pyav)")
+    parser.add_argument('--decode-threads', type=int, default=None, metavar='N',
+                        help="ffmpeg 디코드 스레드 수 (기본 자동)")
+    parser.add_argument('--local-ingest', choices=['link', 'inplace', 'copy'], default='link',
+                        help="로컬 파일 준비 방식 (link: 리플링크/하드링크, 다른 파일 시스템이면 복사 / "
+                             "inplace: 원본 위치에서 분석 / copy: 항상 복사)")
+    parser.add_argument('--segment-workers', type=int, default=1, metavar='N',
+                        help="영상 하나를 N개 시간 구간으로 나눠 병렬 디코드 (--sample-frames 필요, "
+                             "--workers와 함께 쓰면 분석 워커마다 N/workers개)")
+    args = parser.parse_args()
+    if args.analysis_window and args.sample_frames:
+        # 층화 샘플링은 전체 길이가 필요해 구간 다운로드 후 곧바로 전체를 다시 받게 됨
+        parser.error("--analysis-window는 --sample-frames와 함께 쓸 수 없습니다")
+    
     print("="*60)
     print("🔬 고급 영상 포렌식 분석 도구 v3 (최상위 품질 다운로드)")
     print("="*60)
@@ -855,7 +4501,36 @@ def main():
     print("="*60)
     
     # 분석기 초기화
-    forensics = AdvancedVideoForensics()
+    forensics = AdvancedVideoForensics(base_dir=args.base_dir, sample_count=args.sample_frames,
+                                       library_dir=args.library, profile=not args.no_profile,
+                                       frame_height=args.frame_height,
+                                       frame_cache_max_bytes=(int(args.frame_cache * 1024 ** 3)
+                                                              if args.frame_cache else None),
+                                       decode_backend=args.decode_backend,
+                                       decode_threads=args.decode_threads,
+                                       segment_workers=args.segment_workers,
+                                       local_ingest=args.local_ingest)
+    
+    # 배치 모드 (헤드리스 서버용)
+    if args.manifest:
+        sys.exit(run_batch_main(forensics, args))
+    
+    # 라이브러리 일괄 수집 모드
+    if args.library_ingest:
+        if not forensics.library:
+            print("❌ --library-ingest에는 --library 디렉터리가 필요합니다")
+            return
+        video_exts = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+        for path in args.library_ingest:
+            if os.path.isdir(path):
+                files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                               if name.lower().endswith(video_exts))
+            else:
+                files = [path]
+            for video_path in files:
+                forensics.library.ingest(forensics, video_path, source=f"file:///{video_path}")
+        print(f"\n📚 라이브러리: {len(forensics.library)}개 영상")
+        return
     
     # 타겟 영상 입력
     print("\n[타겟 영상]")
@@ -865,15 +4540,8 @@ def main():
         print("❌ 타겟 영상이 필요합니다")
         return
     
-    # 타겟 처리
-    target_path, target_meta = forensics.process_video_input(target_input, "target")
-    if not target_path:
-        print("❌ 타겟 준비 실패")
-        return
-    
-    # 레퍼런스 영상들 입력
-    reference_urls = []
-    reference_paths = []
+    # 레퍼런스 영상들 입력 (다운로드/분석은 입력이 끝난 뒤 파이프라인으로 실행)
+    reference_inputs = []
     
     print("\n[레퍼런스 영상들]")
     print("여러 개를 차례로 선택하세요")
@@ -883,28 +4551,49 @@ def main():
         ref_input = forensics.get_video_input(f"레퍼런스 {i}번:", f"레퍼런스{i}")
         
         if ref_input[0] == 'skip':
-            if i == 1:
+            if i == 1 and not forensics.library:
                 print("⚠️ 최소 1개의 레퍼런스가 필요합니다")
                 continue
             else:
                 break
         
-        ref_path, ref_meta = forensics.process_video_input(ref_input, f"reference_{i}")
-        if ref_path:
-            if ref_input[0] == 'url':
-                reference_urls.append(ref_input[1])
-            else:
-                reference_urls.append(f"Local: {os.path.basename(ref_input[1])}")
-            reference_paths.append(ref_path)
-            i += 1
+        reference_inputs.append(ref_input)
+        i += 1
     
-    if not reference_paths:
-        print("❌ 레퍼런스가 없습니다")
-        return
+    # 사건 체크포인트 (같은 입력으로 다시 실행하면 중단된 지점부터 재개)
+    case_key = hashlib.sha1(json.dumps(
+        [list(target_input)] + [list(r) for r in reference_inputs], ensure_ascii=False
+    ).encode('utf-8')).hexdigest()[:12]
+    checkpoint = CaseCheckpoint(os.path.join(forensics.output_dir, "cases", f"case_{case_key}"),
+                                forensics.analysis_version)
+    if args.fresh:
+        checkpoint.clear()
     
-    # 포렌식 분석 실행
+    # 포렌식 분석 실행 (다운로드와 분석을 겹쳐 실행)
     print("\n🔬 포렌식 분석 시작...")
-    results = forensics.find_source_video(target_path, reference_paths)
+    case = asyncio.run(forensics.run_case_pipeline(
+        target_input, reference_inputs,
+        download_concurrency=args.download_concurrency,
+        workers=args.workers,
+        analysis_window=args.analysis_window,
+        checkpoint=checkpoint
+    ))
+    if not case:
+        return
+    
+    results = case['results']
+    
+    # 분석한 영상을 라이브러리에 추가 (다음 사건부터 재분석 없이 검색)
+    if args.ingest and forensics.library:
+        for video_path in [case['target_path']] + case['reference_paths']:
+            forensics.library.ingest(forensics, video_path)
+    
+    reference_urls = []
+    for ref_input in case['reference_inputs']:
+        if ref_input[0] == 'url':
+            reference_urls.append(ref_input[1])
+        else:
+            reference_urls.append(f"Local: {os.path.basename(ref_input[1])}")
     
     # 결과 출력
     print("\n" + "="*60)
@@ -937,6 +4626,8 @@ def main():
         else:
             print(f"   {rank}위: {name} (세대점수: {score:.3f}){screen_rec}")
     
+    forensics.profiler.print_summary()
+    
     # 3. 보고서 생성
     # target_url 처리
     if target_input[0] == 'url':